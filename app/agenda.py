@@ -0,0 +1,583 @@
+"""
+Agenda - Turnos de la clínica en SQLite
+Genera los turnos de cada médico a partir de sus días y horarios de atención
+(ESPECIALIDADES) para los próximos días y los guarda en SQLite, con índices por
+especialidad, médico y fecha. Reservar, confirmar y cancelar son una sola
+sentencia UPDATE condicionada al estado del turno, así que aunque varios
+workers atiendan pacientes a la vez nunca se entrega el mismo turno a dos.
+Las consultas de turnos libres las responde el motor de disponibilidad, que
+cada operación mantiene al día, y sus resultados quedan en una cache que vence
+con el reloj (medianoche, comienzo de cada turno) y se invalida al reservar.
+Lo que reservan otros procesos se detecta con PRAGMA data_version antes de
+cada consulta, y entonces se relee la base.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import datos_clinica
+from app.disponibilidad import MINUTOS_DIA, Hueco, MotorDisponibilidad
+
+logger = logging.getLogger(__name__)
+
+RUTA_POR_DEFECTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "agenda.db")
+
+# Días que el asistente sabe nombrar, a partir de hoy
+DIAS_RELATIVOS = {"hoy": 0, "manana": 1, "pasado_manana": 2}
+
+# Un turno está libre si nadie lo tomó o si la reserva de otro paciente venció
+_LIBRE = "(estado = 'libre' OR (estado = 'reservado' AND vence < ?))"
+
+
+def formatear_fecha(fecha: str) -> str:
+    """Fecha ISO de la agenda ("2025-03-14") en el formato del asistente ("14/03/2025")."""
+    return datetime.strptime(fecha, "%Y-%m-%d").strftime("%d/%m/%Y")
+
+
+def fecha_iso(fecha: str) -> Optional[str]:
+    """Fecha en formato dd/mm/aaaa (o ya ISO) al formato de la agenda; None si no es válida."""
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(fecha.strip(), formato).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+@dataclass(slots=True, frozen=True)
+class Turno:
+    """Un turno de la agenda."""
+
+    id: int
+    especialidad: str
+    medico: str
+    fecha: str
+    hora: str
+
+    @property
+    def fecha_texto(self) -> str:
+        """Fecha en formato dd/mm/aaaa."""
+        return formatear_fecha(self.fecha)
+
+
+def crear_motor() -> MotorDisponibilidad:
+    """Motor de disponibilidad con los horarios y feriados actuales de la clínica."""
+    return MotorDisponibilidad(
+        datos_clinica.ESPECIALIDADES, datos_clinica.DURACION_TURNO_MINUTOS, datos_clinica.FERIADOS
+    )
+
+
+class CacheDisponibilidad:
+    """
+    Consultas de disponibilidad ya calculadas, con vencimiento por reloj.
+
+    Cada entrada vence en el momento en que su resultado deja de ser cierto
+    aunque nadie reserve: a la medianoche (cambian "hoy" y "mañana"), al
+    empezar el próximo turno de la grilla (los de hoy que ya pasaron) o al
+    vencer una reserva sin confirmar. Las reservas, confirmaciones y
+    cancelaciones la invalidan entera con invalidar().
+    """
+
+    def __init__(self):
+        # clave -> (valor, vencimiento en time.time())
+        self._entradas: Dict[Tuple, Tuple[Any, float]] = {}
+        # Cambia en cada invalidación: un cálculo que empezó antes no se guarda
+        self._generacion = 0
+        self._lock = Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave: Tuple, calcular: Callable[[], Any], vencimiento: Callable[[], float]) -> Any:
+        """
+        Retorna el valor vigente de la clave, o lo calcula y lo guarda.
+
+        Si calcular() lanza una excepción no se guarda nada.
+
+        Args:
+            clave: Clave de la consulta
+            calcular: Función que calcula el valor
+            vencimiento: Función que retorna el momento (time.time()) en que
+                el valor deja de valer; se evalúa antes de calcular
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] > time.time():
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+            generacion = self._generacion
+        vence = vencimiento()
+        valor = calcular()
+        with self._lock:
+            if self._generacion == generacion:
+                self._entradas[clave] = (valor, vence)
+        return valor
+
+    def invalidar(self):
+        """Descarta todo lo calculado (la agenda cambió)."""
+        with self._lock:
+            self._entradas.clear()
+            self._generacion += 1
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> Dict:
+        """Retorna entradas, aciertos, fallos, tasa de acierto e invalidaciones."""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_acierto": self.aciertos / total if total else 0.0,
+                "invalidaciones": self.invalidaciones
+            }
+
+
+class AgendaTurnos:
+    """Turnos en SQLite con reserva, confirmación y cancelación atómicas."""
+
+    def __init__(self, ruta: str = None, dias: int = None, minutos_reserva: float = None):
+        """
+        Inicializa la agenda.
+
+        Args:
+            ruta: Archivo SQLite (default: AGENDA_DB desde .env, o data/agenda.db;
+                ":memory:" para no persistir)
+            dias: Días hacia adelante con turnos generados (default: AGENDA_DIAS
+                desde .env, o 14)
+            minutos_reserva: Cuánto se le guarda un turno al paciente que lo eligió
+                hasta que lo confirma (default: AGENDA_RESERVA_MINUTOS desde .env, o 10)
+        """
+        self.ruta = ruta or os.getenv("AGENDA_DB") or RUTA_POR_DEFECTO
+        self.dias = dias if dias is not None else int(os.getenv("AGENDA_DIAS", "14"))
+        self.minutos_reserva = (
+            minutos_reserva if minutos_reserva is not None else float(os.getenv("AGENDA_RESERVA_MINUTOS", "10"))
+        )
+
+        if self.ruta != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+
+        # Una sola conexión por proceso con un lock; entre procesos (workers de
+        # gunicorn) serializa SQLite, esperando hasta 10 segundos el lock de escritura
+        self._conexion = sqlite3.connect(self.ruta, timeout=10, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        with self._conexion:
+            self._conexion.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS turnos (
+                    id INTEGER PRIMARY KEY,
+                    especialidad TEXT NOT NULL,
+                    medico TEXT NOT NULL,
+                    fecha TEXT NOT NULL,
+                    hora TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'libre',
+                    titular TEXT,
+                    paciente TEXT,
+                    vence REAL,
+                    UNIQUE (medico, fecha, hora)
+                );
+                CREATE INDEX IF NOT EXISTS turnos_especialidad ON turnos (especialidad, fecha, hora);
+                CREATE INDEX IF NOT EXISTS turnos_fecha ON turnos (fecha, hora);
+                CREATE INDEX IF NOT EXISTS turnos_titular ON turnos (titular);
+                """
+            )
+
+        self._lock = Lock()
+        # (primer día, versión de datos) con los que ya se generaron los turnos
+        self._generado: Optional[Tuple[date, int]] = None
+        # PRAGMA data_version de la última lectura: cambia cuando otro proceso escribe
+        self._version_base: Optional[int] = None
+        # Turnos libres en memoria; se reemplaza al cambiar el día o los horarios
+        self.motor = crear_motor()
+        # Consultas ya respondidas; se invalida con cada cambio del motor
+        self.cache = CacheDisponibilidad()
+        self.reservas = 0
+        self.confirmados = 0
+        self.cancelados = 0
+        self.conflictos = 0
+
+    # ==================== GENERACIÓN ====================
+
+    def generar(self, desde: date = None):
+        """
+        Agrega los turnos de los próximos días que todavía no están en la base.
+
+        Si cambiaron los horarios de los médicos (VERSION_DATOS), antes se
+        borran los turnos libres a futuro para regenerarlos; los tomados se
+        conservan. Es idempotente y se puede llamar desde varios procesos.
+        También rearma el motor de disponibilidad con los turnos tomados, y
+        lo vuelve a rearmar si otro proceso escribió en la base desde la
+        última lectura; por eso se llama antes de cada consulta.
+
+        Args:
+            desde: Primer día (default: hoy)
+        """
+        desde = desde or date.today()
+        clave = (desde, datos_clinica.VERSION_DATOS)
+        with self._lock:
+            if self._generado == clave:
+                # Las escrituras de esta conexión no cambian data_version
+                version = self._conexion.execute("PRAGMA data_version").fetchone()[0]
+                if version != self._version_base:
+                    self._rearmar_motor(desde)
+                return
+            with self._conexion:
+                if self._generado is not None and self._generado[1] != clave[1]:
+                    self._conexion.execute(
+                        "DELETE FROM turnos WHERE estado = 'libre' AND fecha >= ?", (desde.isoformat(),)
+                    )
+                self._conexion.executemany(
+                    "INSERT OR IGNORE INTO turnos (especialidad, medico, fecha, hora) VALUES (?, ?, ?, ?)",
+                    crear_motor().plantilla(desde, self.dias)
+                )
+            self._rearmar_motor(desde)
+            self._generado = clave
+
+    def _rearmar_motor(self, desde: date):
+        """Arma un motor nuevo con los turnos tomados desde el día (con el lock tomado)."""
+        self._version_base = self._conexion.execute("PRAGMA data_version").fetchone()[0]
+        motor = crear_motor()
+        for medico, fecha, hora, vence in self._tomados("fecha >= ?", (desde.isoformat(),)):
+            motor.ocupar(medico, fecha, hora, vence)
+        self.motor = motor
+        self.cache.invalidar()
+
+    def _tomados(self, condicion: str, parametros: Tuple) -> List[Tuple[str, str, str, Optional[float]]]:
+        """Turnos confirmados o con reserva vigente (con el lock tomado): (medico, fecha, hora, vence)."""
+        return self._conexion.execute(
+            "SELECT medico, fecha, hora, CASE WHEN estado = 'confirmado' THEN NULL ELSE vence END FROM turnos "
+            f"WHERE {condicion} AND (estado = 'confirmado' OR (estado = 'reservado' AND vence >= ?))",
+            (*parametros, time.time())
+        ).fetchall()
+
+    def sincronizar(self, fecha: str):
+        """
+        Relee de la base los turnos tomados de un día.
+
+        Otros procesos reservan en la misma base sin pasar por este motor:
+        generar() los detecta antes de cada consulta, pero entre la consulta y
+        la reserva pueden adelantarse; cuando una reserva falla porque el turno
+        ya no estaba libre, se relee el día.
+        """
+        with self._lock:
+            tomados = self._tomados("fecha = ?", (fecha,))
+        self.motor.reemplazar_dia(fecha, [(medico, hora, vence) for medico, _, hora, vence in tomados])
+        self.cache.invalidar()
+
+    # ==================== CONSULTAS ====================
+
+    def disponibles(self, fecha: str, especialidad: str = None, medico: str = None, desde_hora: str = None) -> List[Turno]:
+        """
+        Turnos libres de un día, ordenados por hora.
+
+        Args:
+            fecha: Fecha ISO
+            especialidad: Clave de ESPECIALIDADES (None: todas)
+            medico: Nombre del médico (None: todos)
+            desde_hora: Solo turnos posteriores a esta hora ("HH:MM")
+
+        Returns:
+            Lista de Turno
+        """
+        self.generar()
+        condiciones = ["fecha = ?", _LIBRE]
+        parametros: List = [fecha, time.time()]
+        if especialidad:
+            condiciones.append("especialidad = ?")
+            parametros.append(especialidad)
+        if medico:
+            condiciones.append("medico = ?")
+            parametros.append(medico)
+        if desde_hora:
+            condiciones.append("hora > ?")
+            parametros.append(desde_hora)
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT id, especialidad, medico, fecha, hora FROM turnos WHERE {' AND '.join(condiciones)} "
+                "ORDER BY hora, id",
+                parametros
+            ).fetchall()
+        return [Turno(*fila) for fila in filas]
+
+    def libres(self, fecha: str, especialidad: str = None, medico: str = None, desde_hora: str = None) -> List[Hueco]:
+        """Turnos libres de un día según el motor de disponibilidad (ver MotorDisponibilidad.libres)."""
+        self.generar()
+        return self.motor.libres(fecha, especialidad, medico, desde_hora)
+
+    def proximos(self, especialidad: str = None, cantidad: int = 5, desde: datetime = None,
+                 medico: str = None) -> List[Hueco]:
+        """Próximos turnos libres dentro de los días de la agenda (ver MotorDisponibilidad.proximos)."""
+        self.generar()
+        return self.motor.proximos(especialidad, cantidad, desde, self.dias, medico)
+
+    def vencimiento(self, ahora: datetime, por_turno: bool = False) -> float:
+        """
+        Hasta cuándo vale una consulta de disponibilidad hecha ahora (para la cache).
+
+        Args:
+            ahora: Momento de la consulta
+            por_turno: La consulta parte de ahora (turnos de hoy o próximos), así
+                que cambia al empezar el próximo turno de la grilla; si no, a la
+                medianoche
+
+        Returns:
+            Momento en time.time(), adelantado si antes vence una reserva
+        """
+        duracion = self.motor.duracion
+        minutos = ahora.hour * 60 + ahora.minute
+        siguiente = (minutos // duracion + 1) * duracion if por_turno else MINUTOS_DIA
+        limite = datetime.combine(ahora.date(), datetime.min.time()) + timedelta(minutes=min(siguiente, MINUTOS_DIA))
+        vence = limite.timestamp()
+        reserva = self.motor.proximo_vencimiento(ahora.timestamp())
+        return min(vence, reserva) if reserva is not None else vence
+
+    def obtener(self, turno_id: int) -> Optional[Dict]:
+        """Estado completo de un turno (para auditoría), o None si no existe."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT id, especialidad, medico, fecha, hora, estado, titular, paciente, vence FROM turnos WHERE id = ?",
+                (turno_id,)
+            ).fetchone()
+        if fila is None:
+            return None
+        columnas = ("id", "especialidad", "medico", "fecha", "hora", "estado", "titular", "paciente", "vence")
+        return dict(zip(columnas, fila))
+
+    # ==================== OPERACIONES ====================
+
+    def reservar(self, titular: str, fecha: str, hora: str, especialidad: str = None, medico: str = None,
+                 confirmar: bool = False, paciente: str = None) -> Optional[Turno]:
+        """
+        Toma un turno libre que coincida con fecha y hora.
+
+        La reserva vence a los minutos_reserva si no se confirma. Cada titular
+        tiene a lo sumo una reserva sin confirmar: la anterior se libera.
+
+        Args:
+            titular: Identificador de la sesión que reserva
+            fecha: Fecha ISO
+            hora: Hora "HH:MM"
+            especialidad: Clave de ESPECIALIDADES (None: cualquiera)
+            medico: Nombre del médico (None: el primero libre)
+            confirmar: Confirmarlo en el mismo paso
+            paciente: Datos del paciente para la recepción (al confirmar)
+
+        Returns:
+            El Turno reservado, o None si no hay ninguno libre
+        """
+        self.generar()
+        ahora = time.time()
+        condiciones = ["fecha = ?", "hora = ?", _LIBRE]
+        parametros: List = [fecha, hora, ahora]
+        if especialidad:
+            condiciones.append("especialidad = ?")
+            parametros.append(especialidad)
+        if medico:
+            condiciones.append("medico = ?")
+            parametros.append(medico)
+        estado = "confirmado" if confirmar else "reservado"
+        vence = None if confirmar else ahora + self.minutos_reserva * 60
+
+        with self._lock:
+            with self._conexion:
+                liberados = self._conexion.execute(
+                    "UPDATE turnos SET estado = 'libre', titular = NULL, vence = NULL "
+                    "WHERE titular = ? AND estado = 'reservado' RETURNING medico, fecha, hora",
+                    (titular,)
+                ).fetchall()
+                # La subconsulta y la actualización corren bajo el mismo lock de
+                # escritura de SQLite: el turno no puede cambiar de manos en el medio
+                fila = self._conexion.execute(
+                    f"""
+                    UPDATE turnos SET estado = ?, titular = ?, paciente = ?, vence = ?
+                    WHERE id = (
+                        SELECT id FROM turnos WHERE {' AND '.join(condiciones)} ORDER BY id LIMIT 1
+                    )
+                    RETURNING id, especialidad, medico, fecha, hora
+                    """,
+                    [estado, titular, paciente, vence, *parametros]
+                ).fetchall()
+            if fila:
+                self.reservas += 1
+                if confirmar:
+                    self.confirmados += 1
+            else:
+                self.conflictos += 1
+
+        for liberado in liberados:
+            self.motor.liberar(*liberado)
+        if not fila:
+            self.sincronizar(fecha)
+            return None
+        turno = Turno(*fila[0])
+        self.motor.ocupar(turno.medico, turno.fecha, turno.hora, vence)
+        self.cache.invalidar()
+        return turno
+
+    def confirmar(self, turno_id: int, titular: str, paciente: str = None) -> bool:
+        """
+        Confirma un turno reservado por el titular.
+
+        Una reserva vencida todavía se puede confirmar si nadie más tomó el turno.
+
+        Returns:
+            True si quedó confirmado
+        """
+        with self._lock:
+            with self._conexion:
+                fila = self._conexion.execute(
+                    "UPDATE turnos SET estado = 'confirmado', paciente = ?, vence = NULL "
+                    "WHERE id = ? AND titular = ? AND estado = 'reservado' RETURNING medico, fecha, hora",
+                    (paciente, turno_id, titular)
+                ).fetchall()
+            if fila:
+                self.confirmados += 1
+            else:
+                self.conflictos += 1
+        if fila:
+            self.motor.ocupar(*fila[0])
+            self.cache.invalidar()
+        return bool(fila)
+
+    def cancelar(self, turno_id: int, titular: str) -> bool:
+        """
+        Libera un turno reservado o confirmado por el titular.
+
+        Returns:
+            True si se liberó
+        """
+        with self._lock:
+            with self._conexion:
+                fila = self._conexion.execute(
+                    "UPDATE turnos SET estado = 'libre', titular = NULL, paciente = NULL, vence = NULL "
+                    "WHERE id = ? AND titular = ? AND estado IN ('reservado', 'confirmado') "
+                    "RETURNING medico, fecha, hora",
+                    (turno_id, titular)
+                ).fetchall()
+            if fila:
+                self.cancelados += 1
+        if fila:
+            self.motor.liberar(*fila[0])
+            self.cache.invalidar()
+        return bool(fila)
+
+    def estadisticas(self) -> Dict:
+        """
+        Retorna el uso de la agenda en este proceso.
+
+        Returns:
+            Diccionario con turnos (en la base, por estado), reservas,
+            confirmados, cancelados, conflictos (turnos que ya no estaban libres)
+            y cache (aciertos de la cache de disponibilidad)
+        """
+        with self._lock:
+            por_estado = dict(self._conexion.execute("SELECT estado, COUNT(*) FROM turnos GROUP BY estado").fetchall())
+            return {
+                "turnos": por_estado,
+                "reservas": self.reservas,
+                "confirmados": self.confirmados,
+                "cancelados": self.cancelados,
+                "conflictos": self.conflictos,
+                "cache": self.cache.estadisticas()
+            }
+
+
+_agenda: Optional[AgendaTurnos] = None
+_lock_agenda = Lock()
+
+
+def obtener_agenda() -> AgendaTurnos:
+    """Retorna la agenda del proceso (se configura desde .env)."""
+    global _agenda
+    if _agenda is None:
+        with _lock_agenda:
+            if _agenda is None:
+                _agenda = AgendaTurnos()
+    return _agenda
+
+
+def obtener_turnos_disponibles(cuando: str = "manana", especialidad: str = None) -> Optional[Dict]:
+    """
+    Horarios libres de un día.
+
+    Sale de la cache de la agenda: todas las sesiones comparten el resultado
+    hasta que alguien reserva o cambia el reloj. No modificar lo devuelto.
+
+    Args:
+        cuando: "hoy", "manana" o "pasado_manana"
+        especialidad: Clave de ESPECIALIDADES (None: cualquier especialidad)
+
+    Returns:
+        Diccionario con "fecha" (dd/mm/aaaa), "disponibles" (horas sin
+        repetir, ordenadas), "abierto" (la clínica atiende ese día) y
+        "atiende" (la especialidad atiende ese día), o None si el día no es válido
+    """
+    if cuando not in DIAS_RELATIVOS:
+        return None
+    ahora = datetime.now()
+    dia = ahora.date() + timedelta(days=DIAS_RELATIVOS[cuando])
+    # Hoy solo se ofrecen los horarios que todavía no pasaron
+    desde_hora = ahora.strftime("%H:%M") if cuando == "hoy" else None
+
+    def _calcular() -> Dict:
+        turnos = agenda.libres(dia.isoformat(), especialidad, desde_hora=desde_hora)
+        return {
+            "fecha": dia.strftime("%d/%m/%Y"),
+            "disponibles": sorted({turno.hora for turno in turnos}),
+            "abierto": agenda.motor.atiende(dia.isoformat()),
+            "atiende": agenda.motor.atiende(dia.isoformat(), especialidad)
+        }
+
+    try:
+        agenda = obtener_agenda()
+        agenda.generar()
+        return agenda.cache.obtener(
+            ("dia", dia, especialidad), _calcular, lambda: agenda.vencimiento(ahora, por_turno=cuando == "hoy")
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Error consultando la agenda: {e}")
+        return {"fecha": dia.strftime("%d/%m/%Y"), "disponibles": [], "abierto": True, "atiende": True}
+
+
+def proximos_turnos(especialidad: str = None, cantidad: int = 5) -> List[Dict]:
+    """
+    Próximos turnos libres desde ahora, aunque sean de otras semanas.
+
+    Sale de la cache de la agenda, como obtener_turnos_disponibles. No
+    modificar lo devuelto.
+
+    Args:
+        especialidad: Clave de ESPECIALIDADES (None: cualquier especialidad)
+        cantidad: Cantidad máxima de turnos
+
+    Returns:
+        Lista de diccionarios con fecha (dd/mm/aaaa), hora y medico, en orden cronológico
+    """
+    ahora = datetime.now()
+
+    def _calcular() -> List[Dict]:
+        return [
+            {"fecha": formatear_fecha(hueco.fecha), "hora": hueco.hora, "medico": hueco.medico}
+            for hueco in agenda.proximos(especialidad, cantidad, ahora)
+        ]
+
+    try:
+        agenda = obtener_agenda()
+        agenda.generar()
+        return agenda.cache.obtener(
+            ("proximos", ahora.date(), especialidad, cantidad), _calcular,
+            lambda: agenda.vencimiento(ahora, por_turno=True)
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Error consultando la agenda: {e}")
+        return []
@@ -4,148 +4,511 @@ Este módulo maneja la inteligencia del asistente telefónico.
 """
 
 import os
+import re
 import json
+import time
+import uuid
+import random
+import sqlite3
 import logging
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Event, Lock
+from typing import List, Dict, Iterator, Optional, Tuple, Union
 from datetime import datetime
-from openai import OpenAI
 from dotenv import load_dotenv
 
 # Importar configuración
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import prompts, datos_clinica
+from config.texto import normalizar_texto
+from app import extractor_local
+from app.openai_client import hilos_llamadas, obtener_cliente
+from app.historial import GestorHistorial
+from app.cache_respuestas import cache_respuestas
+from app.sesion import DatosPaciente, Mensaje, crear_mensaje, mensaje_para_api
+from app.consumo import RegistroConsumo, obtener_consumo_global
+from app import herramientas
+from app import latencia
+from app import detector_urgencias
+from app import motor_dialogo
+from app import agenda
+from app.latencia import PresupuestoAgotado
 
 logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Respuesta cuando falla la llamada al modelo (nunca se guarda en cache)
+RESPUESTA_ERROR_TECNICO = "Disculpe, estoy teniendo problemas técnicos. ¿Podría intentar nuevamente?"
+
+# Pool compartido para ejecutar en paralelo las etapas de cada turno (del tamaño
+# del pool de conexiones salvo que AI_PIPELINE_WORKERS diga otra cosa)
+_EJECUTOR_TURNOS = ThreadPoolExecutor(
+    max_workers=hilos_llamadas("AI_PIPELINE_WORKERS"),
+    thread_name_prefix="ai-turno"
+)
+
+# Palabras con las que empieza una pregunta independiente del contexto
+INTERROGATIVOS = {
+    "que", "como", "cuando", "donde", "cual", "cuales", "cuanto", "cuanta",
+    "atienden", "tienen", "aceptan", "trabajan", "hay", "hacen"
+}
+
+
+# ==================== PROMPT DEL SISTEMA COMPARTIDO ====================
+
+# Prompts compilados una vez por proceso (uno con herramientas y otro sin);
+# se recompilan solo si cambian los datos de la clínica
+# (datos_clinica.VERSION_DATOS). No llevan nada que dependa de la fecha o de la
+# sesión, así el prefijo es idéntico byte a byte entre llamadas y el proveedor
+# puede servirlo desde su cache de prompts. Lo variable va en el contexto del turno.
+_prompt_sistema: Dict[bool, Dict] = {
+    False: {"clave": None, "mensaje": None},
+    True: {"clave": None, "mensaje": None}
+}
+_lock_prompt = Lock()
+
+# Instrucciones fijas de la extracción (prefijo estable del pedido)
+_PROMPT_SISTEMA_EXTRACCION = (
+    "Eres un experto en extracción de información estructurada.\n" + prompts.PROMPT_EXTRACCION_DATOS
+)
+
+
+def _generar_contexto_clinica(completo: bool = True) -> str:
+    """
+    Genera un resumen de la información de la clínica para el contexto.
+
+    Args:
+        completo: Incluir médicos y coberturas. Con herramientas el modelo
+            los consulta a demanda y solo se envían los datos fijos.
+    """
+    lineas = [
+        "",
+        f"CLÍNICA: {datos_clinica.CLINICA['nombre']}",
+        f"DIRECCIÓN: {datos_clinica.CLINICA['direccion']}",
+        f"TELÉFONO: {datos_clinica.CLINICA['telefono']}",
+        "",
+        "HORARIOS:",
+        f"- Lunes a Viernes: {datos_clinica.HORARIOS['lunes_viernes']}",
+        f"- Sábados: {datos_clinica.HORARIOS['sabados']}",
+        f"- Domingos y Feriados: {datos_clinica.HORARIOS['domingos']}",
+        "",
+        "ESPECIALIDADES DISPONIBLES:",
+    ]
+    if not completo:
+        lineas.append(", ".join(datos_clinica.obtener_especialidades_disponibles()))
+        lineas.append(f"\nPRECIO CONSULTA PARTICULAR: ${datos_clinica.PRECIOS['consulta_particular']}")
+        return "\n".join(lineas)
+
+    for esp in datos_clinica.ESPECIALIDADES.values():
+        lineas.append(f"- {esp['nombre']}:")
+        for medico in esp['medicos']:
+            lineas.append(f"  * {medico['nombre']} - {', '.join(medico['dias'])} ({medico['horario']})")
+
+    lineas.append(f"\nOBRAS SOCIALES ACEPTADAS: {', '.join(datos_clinica.OBRAS_SOCIALES)}")
+    lineas.append(f"\nPREPAGAS ACEPTADAS: {', '.join(datos_clinica.PREPAGAS)}")
+    lineas.append(f"\nPRECIO CONSULTA PARTICULAR: ${datos_clinica.PRECIOS['consulta_particular']}")
+
+    return "\n".join(lineas)
+
+
+# Horarios libres por día que se listan en el contexto (sesiones sin herramientas)
+MAX_TURNOS_CONTEXTO = 8
+
+
+def generar_contexto_turno(con_herramientas: bool = False) -> str:
+    """
+    Genera la parte variable del contexto: fecha, hora y turnos disponibles.
+
+    Se envía al final de la ventana, después del prefijo estable, para no
+    invalidar la cache de prompts del proveedor. Los horarios salen de la cache
+    de disponibilidad de la agenda, compartida por todas las sesiones.
+
+    Args:
+        con_herramientas: Sin turnos disponibles (el modelo los consulta con herramientas)
+    """
+    ahora = datetime.now()
+    lineas = [
+        f"FECHA ACTUAL: {ahora.strftime('%d/%m/%Y')}",
+        f"HORA ACTUAL: {ahora.strftime('%H:%M')}",
+    ]
+    if not con_herramientas:
+        lineas.append("TURNOS DISPONIBLES:")
+        for cuando, etiqueta in (("hoy", "Hoy"), ("manana", "Mañana"), ("pasado_manana", "Pasado mañana")):
+            turnos = agenda.obtener_turnos_disponibles(cuando)
+            horas = turnos["disponibles"]
+            libres = ", ".join(horas[:MAX_TURNOS_CONTEXTO]) or ("COMPLETO" if turnos["abierto"] else "CERRADO")
+            if len(horas) > MAX_TURNOS_CONTEXTO:
+                libres += f" (y {len(horas) - MAX_TURNOS_CONTEXTO} más)"
+            lineas.append(f"- {etiqueta} ({turnos['fecha']}): {libres}")
+    return "\n".join(lineas)
+
+
+def obtener_mensaje_sistema(con_herramientas: bool = False) -> Dict[str, str]:
+    """
+    Retorna el mensaje de sistema compartido por todas las sesiones.
+
+    El diccionario devuelto es el mismo objeto para todas las sesiones,
+    por lo que no debe modificarse.
+
+    Args:
+        con_herramientas: Versión reducida para sesiones que consultan médicos,
+            coberturas y turnos con herramientas
+
+    Returns:
+        Mensaje {"role": "system", "content": ...}
+    """
+    clave = datos_clinica.VERSION_DATOS
+    compilado = _prompt_sistema[con_herramientas]
+
+    if compilado["clave"] != clave:
+        with _lock_prompt:
+            if compilado["clave"] != clave:
+                instrucciones_herramientas = prompts.PROMPT_HERRAMIENTAS if con_herramientas else ""
+                system_prompt = f"""{prompts.obtener_prompt_sistema()}
+{instrucciones_herramientas}
+INFORMACIÓN DE LA CLÍNICA QUE DEBES CONOCER:
+{_generar_contexto_clinica(completo=not con_herramientas)}
+
+La fecha, la hora y los datos ya recolectados del paciente llegan en un mensaje de contexto al final de la conversación.
+
+Recuerda: Eres el primer punto de contacto del paciente. Sé empático, profesional y eficiente.
+"""
+                compilado["mensaje"] = {"role": "system", "content": system_prompt}
+                compilado["clave"] = clave
+                logger.info(f"Prompt del sistema compilado ({len(system_prompt)} caracteres)")
+
+    return compilado["mensaje"]
+
+
+# ==================== FRAGMENTACIÓN DE RESPUESTAS ====================
+
+# Fin de frase: signo de cierre seguido de espacio, o salto de línea
+_FIN_DE_FRASE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+# Abreviaturas que no cierran una frase ("Dr. Silva", "Av. Libertador")
+ABREVIATURAS = {"dr", "dra", "av", "sr", "sra", "nro", "gral", "lic"}
+
+# Largo mínimo de un fragmento para no entregar frases sueltas de una palabra
+LARGO_MINIMO_FRASE = 12
+
+
+def dividir_en_frases(texto: str) -> Tuple[List[str], str]:
+    """
+    Separa las frases completas de un texto parcial.
+
+    Args:
+        texto: Texto acumulado del stream
+
+    Returns:
+        Tupla (frases completas, resto sin terminar)
+    """
+    frases = []
+    desde = 0
+    for match in _FIN_DE_FRASE.finditer(texto):
+        candidata = texto[desde:match.start()].strip()
+        ultima_palabra = candidata.rsplit(" ", 1)[-1].rstrip(".").lower()
+        if ultima_palabra in ABREVIATURAS or len(candidata) < LARGO_MINIMO_FRASE:
+            continue
+        frases.append(candidata)
+        desde = match.end()
+    return frases, texto[desde:]
+
+
+# ==================== RESPUESTA COMBINADA ====================
+
+_CAMPOS_COMBINADOS = prompts.ESQUEMA_RESPUESTA_COMBINADA["schema"]["properties"]["datos"]["properties"]
+
+
+def validar_respuesta_combinada(contenido: str) -> Optional[Tuple[str, Dict]]:
+    """
+    Valida el JSON de una respuesta combinada (respuesta + datos del paciente).
+
+    Los campos de datos con tipo inesperado se descartan; si falta la
+    respuesta o el JSON es inválido se devuelve None.
+
+    Args:
+        contenido: Contenido devuelto por el modelo
+
+    Returns:
+        Tupla (respuesta para el paciente, datos extraídos) o None
+    """
+    try:
+        resultado = json.loads(contenido)
+    except (TypeError, json.JSONDecodeError):
+        return None
+
+    if not isinstance(resultado, dict):
+        return None
+    respuesta = resultado.get("respuesta")
+    datos = resultado.get("datos")
+    if not isinstance(respuesta, str) or not respuesta.strip() or not isinstance(datos, dict):
+        return None
+
+    datos_validos = {}
+    for campo, valor in datos.items():
+        if campo not in _CAMPOS_COMBINADOS:
+            continue
+        if campo == "sintomas_graves":
+            if isinstance(valor, bool):
+                datos_validos[campo] = valor
+        elif valor is None or isinstance(valor, str):
+            datos_validos[campo] = valor.strip() if isinstance(valor, str) else None
+
+    return respuesta.strip(), datos_validos
+
+
+# ==================== RUTEO DE MODELOS ====================
+
+# Un mensaje con más palabras que esto se considera complejo
+PALABRAS_TURNO_COMPLEJO = 35
+
+# Indicios de que el paciente está molesto o no se entendió la respuesta anterior
+PALABRAS_FRUSTRACION = [
+    "no entiendo", "no me entiende", "no me entendio", "ya le dije", "ya te dije", "otra vez",
+    "queja", "reclamo", "molesto", "molesta", "enojado", "enojada", "indignado", "indignada",
+    "es la tercera vez", "nadie me", "pesimo", "vergüenza", "verguenza"
+]
+
+
+def motivo_turno_complejo(mensaje: str, mensaje_anterior: Optional[str] = None) -> Optional[str]:
+    """
+    Indica si un turno amerita el modelo avanzado.
+
+    Args:
+        mensaje: Mensaje del usuario
+        mensaje_anterior: Mensaje anterior del usuario (para detectar repeticiones)
+
+    Returns:
+        Motivo ("largo", "varias_preguntas", "frustracion", "repeticion") o None
+    """
+    normalizado = normalizar_texto(mensaje)
+    if len(normalizado.split()) > PALABRAS_TURNO_COMPLEJO:
+        return "largo"
+    if mensaje.count("?") >= 2:
+        return "varias_preguntas"
+    texto = f" {normalizado} "
+    if any(f" {normalizar_texto(frase)} " in texto for frase in PALABRAS_FRUSTRACION):
+        return "frustracion"
+    if mensaje_anterior is not None and normalizar_texto(mensaje_anterior) == normalizado and len(normalizado.split()) > 2:
+        return "repeticion"
+    return None
+
+
+# ==================== RESPUESTAS DIRECTAS DE FAQs ====================
+
+# Contadores del proceso para las FAQs respondidas sin llamar al modelo
+_estadisticas_faq = {"aciertos": 0, "fallos": 0}
+_lock_faq = Lock()
+
+
+def obtener_estadisticas_cache() -> Dict:
+    """Retorna aciertos, tasa de acierto y memoria de la cache de respuestas."""
+    return cache_respuestas.estadisticas()
+
+
+def obtener_estadisticas_consumo() -> Dict:
+    """Retorna tokens, latencia y costo acumulados por todas las sesiones del proceso."""
+    return obtener_consumo_global()
+
+
+def obtener_estadisticas_latencia() -> Dict:
+    """Retorna reintentos, coberturas, presupuestos agotados y p95 de las llamadas al modelo."""
+    return latencia.obtener_estadisticas()
+
+
+def obtener_estadisticas_faq() -> Dict:
+    """
+    Retorna cuántos turnos se respondieron directo desde FAQS.
+
+    Returns:
+        Diccionario con aciertos, fallos y tasa_acierto
+    """
+    with _lock_faq:
+        aciertos = _estadisticas_faq["aciertos"]
+        fallos = _estadisticas_faq["fallos"]
+    total = aciertos + fallos
+    return {
+        "aciertos": aciertos,
+        "fallos": fallos,
+        "tasa_acierto": aciertos / total if total else 0.0
+    }
+
+
+def _clave_especialidad(especialidad: Optional[str]) -> Optional[str]:
+    """Clave de ESPECIALIDADES para una especialidad dada como clave, nombre o texto libre."""
+    if not especialidad:
+        return None
+    if especialidad in datos_clinica.ESPECIALIDADES:
+        return especialidad
+    return extractor_local.buscar_especialidad(especialidad)
+
 
 class AIAssistant:
     """Asistente de IA para la clínica médica."""
 
-    def __init__(self, model: str = None):
+    def __init__(
+        self,
+        model: str = None,
+        umbral_faq: float = None,
+        modo_combinado: bool = None,
+        usar_herramientas: bool = None,
+        modelo_extraccion: str = None,
+        modelo_resumen: str = None,
+        modelo_avanzado: str = None,
+        usar_motor_dialogo: bool = None
+    ):
         """
         Inicializa el asistente de IA.
 
         Args:
-            model: Modelo de OpenAI a usar (default: gpt-4o-mini desde .env)
+            model: Modelo para las respuestas al paciente (default: OPENAI_MODEL
+                desde .env, o gpt-4o-mini)
+            umbral_faq: Confianza mínima para responder una FAQ sin llamar al
+                modelo (default: FAQ_UMBRAL_CONFIANZA desde .env, o 0.6)
+            modo_combinado: Pedir respuesta y datos del paciente en una sola
+                llamada (default: AI_MODO_COMBINADO desde .env, o False)
+            usar_herramientas: Consultar coberturas, médicos y turnos con
+                herramientas en vez de enviarlos en el prompt (default:
+                AI_HERRAMIENTAS desde .env, o True)
+            modelo_extraccion: Modelo para extraer datos del paciente (default:
+                OPENAI_MODEL_EXTRACCION desde .env, o gpt-4.1-nano)
+            modelo_resumen: Modelo para condensar el historial viejo; sin él se
+                usa el resumen local (default: OPENAI_MODEL_RESUMEN desde .env)
+            modelo_avanzado: Modelo al que se escalan los turnos complejos; sin
+                él no hay ruteo (default: OPENAI_MODEL_AVANZADO desde .env)
+            usar_motor_dialogo: Conducir el pedido de turno con el motor de
+                diálogo, sin llamar al modelo mientras el paciente siga el
+                flujo (default: AI_MOTOR_DIALOGO desde .env, o True)
         """
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY no encontrada en variables de entorno")
-
-        self.client = OpenAI(api_key=api_key)
+        # Cliente y pool de conexiones compartidos por todas las sesiones
+        self.client = obtener_cliente()
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-
-        # Historial de conversación
-        self.conversation_history: List[Dict[str, str]] = []
+        self.modelo_extraccion = modelo_extraccion or os.getenv("OPENAI_MODEL_EXTRACCION", "gpt-4.1-nano")
+        self.modelo_resumen = modelo_resumen or os.getenv("OPENAI_MODEL_RESUMEN") or None
+        self.modelo_avanzado = modelo_avanzado or os.getenv("OPENAI_MODEL_AVANZADO") or None
+        self.umbral_faq = umbral_faq if umbral_faq is not None else float(os.getenv("FAQ_UMBRAL_CONFIANZA", "0.6"))
+        if modo_combinado is None:
+            modo_combinado = os.getenv("AI_MODO_COMBINADO", "false").lower() in ("1", "true", "si", "sí")
+        self.modo_combinado = modo_combinado
+        if usar_herramientas is None:
+            usar_herramientas = os.getenv("AI_HERRAMIENTAS", "true").lower() in ("1", "true", "si", "sí")
+        self.usar_herramientas = usar_herramientas
+        if usar_motor_dialogo is None:
+            usar_motor_dialogo = os.getenv("AI_MOTOR_DIALOGO", "true").lower() in ("1", "true", "si", "sí")
+        self.usar_motor_dialogo = usar_motor_dialogo
+
+        # Historial de conversación (el prompt del sistema es un dict compartido;
+        # el resto son Mensaje compactos)
+        self.conversation_history: List[Union[Dict[str, str], Mensaje]] = []
 
         # Datos extraídos del paciente
-        self.patient_data = {
-            "nombre_completo": None,
-            "dni": None,
-            "cobertura": None,
-            "tipo_consulta": None,
-            "especialidad": None,
-            "fecha_preferida": None,
-            "sintomas_graves": False,
-            "turno_confirmado": None
-        }
-
-        # Inicializar conversación con prompt del sistema
-        self._inicializar_sistema()
-
-        logger.info(f"AIAssistant inicializado con modelo: {self.model}")
+        self.patient_data = DatosPaciente()
 
-    def _inicializar_sistema(self):
-        """Inicializa el sistema con el prompt base y contexto de la clínica."""
-        # Obtener información de la clínica
-        info_clinica = self._generar_contexto_clinica()
+        # Estado del flujo de turno del motor de diálogo
+        self.dialogo = motor_dialogo.EstadoDialogo()
 
-        # Prompt del sistema completo
-        system_prompt = f"""{prompts.obtener_prompt_sistema()}
+        # Identificador de la sesión en la agenda y turno que tiene reservado
+        self.titular_agenda = uuid.uuid4().hex
+        self.reserva: Optional[agenda.Turno] = None
 
-INFORMACIÓN DE LA CLÍNICA QUE DEBES CONOCER:
-{info_clinica}
+        # Extracción que quedó corriendo en segundo plano del turno anterior
+        self._extraccion_pendiente: Optional[Future] = None
 
-HORA ACTUAL: {datetime.now().strftime('%H:%M')}
-FECHA ACTUAL: {datetime.now().strftime('%d/%m/%Y')}
+        # Se marca si el turno se abandona por una urgencia: la generación que
+        # siga corriendo en segundo plano ya no puede confirmar turnos
+        self._turno_cancelado = Event()
 
-Recuerda: Eres el primer punto de contacto del paciente. Sé empático, profesional y eficiente.
-"""
+        # Tiempos por etapa del último turno (en milisegundos)
+        self.metricas_turno: Dict = {}
 
-        self.conversation_history = [
-            {"role": "system", "content": system_prompt}
-        ]
+        # Ventana de historial que se envía al modelo
+        self.historial = GestorHistorial()
 
-    def _generar_contexto_clinica(self) -> str:
-        """Genera un resumen de la información de la clínica para el contexto."""
-        context = f"""
-CLÍNICA: {datos_clinica.CLINICA['nombre']}
-DIRECCIÓN: {datos_clinica.CLINICA['direccion']}
-TELÉFONO: {datos_clinica.CLINICA['telefono']}
+        # Tokens, latencia y costo de las llamadas, por turno y por sesión
+        self.consumo = RegistroConsumo()
+        self._turno_consumo = -1
 
-HORARIOS:
-- Lunes a Viernes: {datos_clinica.HORARIOS['lunes_viernes']}
-- Sábados: {datos_clinica.HORARIOS['sabados']}
-- Domingos y Feriados: {datos_clinica.HORARIOS['domingos']}
+        # Plazo, reintentos y cobertura de las llamadas de cada turno (compartida)
+        self.politica = latencia.obtener_politica()
+        self._presupuesto = self.politica.nuevo_presupuesto()
 
-ESPECIALIDADES DISPONIBLES:
-"""
-        for key, esp in datos_clinica.ESPECIALIDADES.items():
-            context += f"\n- {esp['nombre']}:"
-            for medico in esp['medicos']:
-                context += f"\n  * {medico['nombre']} - {', '.join(medico['dias'])} ({medico['horario']})"
+        # Modelo que responde el turno en curso (el avanzado si el turno es complejo)
+        self._modelo_turno = self.model
 
-        context += f"\n\nOBRAS SOCIALES ACEPTADAS: {', '.join(datos_clinica.OBRAS_SOCIALES)}"
-        context += f"\n\nPREPAGAS ACEPTADAS: {', '.join(datos_clinica.PREPAGAS)}"
-        context += f"\n\nPRECIO CONSULTA PARTICULAR: ${datos_clinica.PRECIOS['consulta_particular']}"
+        # Inicializar conversación con prompt del sistema
+        self._inicializar_sistema()
 
-        # Turnos disponibles
-        turnos = datos_clinica.generar_turnos_mock()
-        context += f"\n\nTURNOS DISPONIBLES:"
-        context += f"\n- Hoy ({turnos['hoy']['fecha']}): {turnos['hoy']['disponibles'] if turnos['hoy']['disponibles'] else 'COMPLETO'}"
-        context += f"\n- Mañana ({turnos['manana']['fecha']}): {', '.join(turnos['manana']['disponibles'])}"
-        context += f"\n- Pasado mañana ({turnos['pasado_manana']['fecha']}): {', '.join(turnos['pasado_manana']['disponibles'])}"
+        logger.info(
+            f"AIAssistant inicializado con modelo: {self.model} "
+            f"(extracción: {self.modelo_extraccion}, resumen: {self.modelo_resumen or 'local'}, "
+            f"avanzado: {self.modelo_avanzado or 'sin ruteo'})"
+        )
 
-        return context
+    def _inicializar_sistema(self):
+        """Inicializa el sistema con el prompt base y contexto de la clínica."""
+        # El prompt estático es el mismo objeto para todas las sesiones; la
+        # fecha y la hora se agregan en cada turno como contexto final
+        self.conversation_history = [obtener_mensaje_sistema(self.usar_herramientas)]
 
     def procesar_mensaje(self, mensaje_usuario: str) -> str:
         """
         Procesa un mensaje del usuario y genera una respuesta.
 
+        Primero se intenta extraer los datos con reglas locales; solo si esa
+        pasada no es concluyente se consulta al modelo. La extracción con el
+        modelo y la generación de la respuesta se lanzan en paralelo. Solo se
+        espera la extracción antes de responder cuando el mensaje puede
+        indicar una urgencia; en otro caso termina en segundo plano y se
+        incorpora al comienzo del siguiente turno.
+
+        En modo combinado se pide todo en una sola llamada con salida
+        estructurada; si el JSON no es válido se usa el camino de dos llamadas.
+
         Args:
             mensaje_usuario: Mensaje del usuario
 
         Returns:
             Respuesta del asistente
         """
+        inicio = time.perf_counter()
         try:
-            # Agregar mensaje del usuario al historial
-            self.conversation_history.append({
-                "role": "user",
-                "content": mensaje_usuario
-            })
+            datos_locales, concluyente = self._iniciar_turno(mensaje_usuario)
 
-            # Extraer información del mensaje
-            self._extraer_informacion(mensaje_usuario)
-
-            # Verificar si hay síntomas graves
             if self.patient_data["sintomas_graves"]:
+                # Urgencia detectada localmente o en un turno anterior: se
+                # responde sin esperar al modelo (la extracción sigue como verificación)
+                self._extraccion_pendiente = self._lanzar_extraccion(mensaje_usuario, concluyente)
                 respuesta = self._manejar_urgencia()
             else:
-                # Generar respuesta con OpenAI
-                respuesta = self._generar_respuesta()
-
-            # Agregar respuesta al historial
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": respuesta
-            })
-
-            logger.info(f"Usuario: {mensaje_usuario[:50]}... | Asistente: {respuesta[:50]}...")
+                # Flujo de turno, FAQs de alta confianza y respuestas en cache: sin llamar al modelo
+                respuesta = self._responder_sin_modelo(mensaje_usuario, datos_locales, concluyente)
+
+            if respuesta is None and self.modo_combinado:
+                # Respuesta y extracción en una sola llamada
+                respuesta = self._responder_combinado(mensaje_usuario, datos_locales)
+
+            if respuesta is None:
+                # Lanzar extracción y generación al mismo tiempo
+                futuro_extraccion = self._lanzar_extraccion(mensaje_usuario, concluyente)
+                futuro_respuesta = _EJECUTOR_TURNOS.submit(
+                    self._cronometrar_respuesta,
+                    self._mensajes_para_modelo()
+                )
+                self._resolver_extraccion(mensaje_usuario, futuro_extraccion)
+
+                if self.patient_data["sintomas_graves"]:
+                    # cancel() no detiene una generación que ya empezó
+                    self._turno_cancelado.set()
+                    futuro_respuesta.cancel()
+                    respuesta = self._manejar_urgencia()
+                else:
+                    respuesta, self.metricas_turno["generacion_ms"] = futuro_respuesta.result()
+                    self._guardar_en_cache(mensaje_usuario, datos_locales, respuesta)
+
+            self._cerrar_turno(mensaje_usuario, respuesta, inicio)
 
             return respuesta
 
@@ -153,22 +516,639 @@ ESPECIALIDADES DISPONIBLES:
             logger.error(f"Error procesando mensaje: {e}")
             return "Disculpe, tuve un problema procesando su solicitud. ¿Podría repetir?"
 
-    def _generar_respuesta(self) -> str:
-        """Genera una respuesta usando OpenAI."""
+    def procesar_mensaje_stream(self, mensaje_usuario: str) -> Iterator[str]:
+        """
+        Procesa un mensaje del usuario y entrega la respuesta por frases.
+
+        Cada frase se entrega apenas el modelo la termina de generar, así los
+        canales de voz pueden empezar a hablar sin esperar la respuesta
+        completa. El historial y los datos del paciente se actualizan igual
+        que en procesar_mensaje al terminar el stream.
+        El modo combinado no aplica acá: el JSON no se puede hablar por frases.
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+
+        Yields:
+            Fragmentos de la respuesta del tamaño de una frase
+        """
+        inicio = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history,
-                temperature=0.7,
-                max_tokens=300
+            datos_locales, concluyente = self._iniciar_turno(mensaje_usuario)
+        except Exception as e:
+            logger.error(f"Error procesando mensaje: {e}")
+            yield "Disculpe, tuve un problema procesando su solicitud. ¿Podría repetir?"
+            return
+
+        if self.patient_data["sintomas_graves"]:
+            self._extraccion_pendiente = self._lanzar_extraccion(mensaje_usuario, concluyente)
+            respuesta = self._manejar_urgencia()
+            self._cerrar_turno(mensaje_usuario, respuesta, inicio)
+            yield respuesta
+            return
+
+        respuesta_directa = self._responder_sin_modelo(mensaje_usuario, datos_locales, concluyente)
+        if respuesta_directa is not None:
+            self._cerrar_turno(mensaje_usuario, respuesta_directa, inicio)
+            yield respuesta_directa
+            return
+
+        # Abrir el stream antes de esperar la extracción para solaparlas
+        futuro_extraccion = self._lanzar_extraccion(mensaje_usuario, concluyente)
+        mensajes = self._mensajes_para_modelo()
+        stream = self._abrir_stream_respuesta(mensajes)
+        self._resolver_extraccion(mensaje_usuario, futuro_extraccion)
+
+        if self.patient_data["sintomas_graves"]:
+            if stream is not None:
+                stream.close()
+            respuesta = self._manejar_urgencia()
+            self._cerrar_turno(mensaje_usuario, respuesta, inicio)
+            yield respuesta
+            return
+
+        if stream is None:
+            respuesta = self._respuesta_fallida()
+            self._cerrar_turno(mensaje_usuario, respuesta, inicio)
+            yield respuesta
+            return
+
+        fragmentos = []
+        try:
+            for frase in self._fragmentar_stream(stream, mensajes):
+                if not fragmentos:
+                    self.metricas_turno["primer_fragmento_ms"] = (time.perf_counter() - inicio) * 1000
+                fragmentos.append(frase)
+                yield frase
+        finally:
+            # También se registra lo emitido si el consumidor corta el stream
+            respuesta = " ".join(fragmentos)
+            if not respuesta:
+                respuesta = self._respuesta_fallida()
+            self.metricas_turno["generacion_ms"] = (time.perf_counter() - inicio) * 1000
+            self._cerrar_turno(mensaje_usuario, respuesta, inicio)
+            if fragmentos and not self.patient_data["sintomas_graves"]:
+                self._guardar_en_cache(mensaje_usuario, datos_locales, respuesta)
+
+        if not fragmentos:
+            yield respuesta
+
+    def _iniciar_turno(self, mensaje_usuario: str) -> Tuple[Dict, bool]:
+        """
+        Registra el mensaje del usuario y corre el extractor local.
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+
+        Returns:
+            Tupla (datos extraídos localmente, True si la extracción local fue concluyente)
+        """
+        # Incorporar la extracción del turno anterior si quedó pendiente
+        self._esperar_extraccion_pendiente()
+        self.metricas_turno = {}
+        self._turno_cancelado = Event()
+        self._turno_consumo = self.consumo.nuevo_turno()
+        self._presupuesto = self.politica.nuevo_presupuesto()
+
+        self._modelo_turno = self._elegir_modelo(mensaje_usuario)
+
+        # Agregar mensaje del usuario al historial
+        self.conversation_history.append(crear_mensaje("user", mensaje_usuario))
+
+        # Extracción local; el modelo solo se consulta si no alcanza
+        datos_locales, concluyente = extractor_local.extraer_datos(mensaje_usuario)
+        self._actualizar_datos_paciente(datos_locales)
+        self.metricas_turno["extraccion_local"] = concluyente
+
+        # Urgencias evidentes: se activa el protocolo sin esperar la extracción
+        evaluacion = detector_urgencias.evaluar_urgencia(mensaje_usuario)
+        if evaluacion.urgente:
+            self.patient_data["sintomas_graves"] = True
+            self.patient_data["tipo_consulta"] = "urgencia"
+            self.metricas_turno["urgencia_local"] = list(evaluacion.terminos)
+            logger.warning(f"Urgencia detectada localmente: {', '.join(evaluacion.terminos)} ({evaluacion.puntaje})")
+        return datos_locales, concluyente
+
+    def turno_cancelado(self) -> bool:
+        """
+        Indica si la respuesta en curso ya no se va a usar (se detectó una urgencia).
+
+        Las herramientas con efectos (confirmar_turno) lo consultan antes de
+        ejecutarse, porque la generación puede seguir en otro hilo.
+        """
+        return self._turno_cancelado.is_set() or self.patient_data["sintomas_graves"]
+
+    def _elegir_modelo(self, mensaje_usuario: str) -> str:
+        """Elige el modelo de la respuesta: el avanzado solo para turnos complejos."""
+        if self.modelo_avanzado is None:
+            return self.model
+
+        anteriores = [msg["content"] for msg in self.conversation_history if msg["role"] == "user"]
+        motivo = motivo_turno_complejo(mensaje_usuario, anteriores[-1] if anteriores else None)
+        if motivo is None:
+            return self.model
+
+        self.metricas_turno["ruteo"] = motivo
+        logger.info(f"Turno complejo ({motivo}), se responde con {self.modelo_avanzado}")
+        return self.modelo_avanzado
+
+    def _lanzar_extraccion(self, mensaje_usuario: str, concluyente: bool) -> Optional[Future]:
+        """
+        Lanza en segundo plano la extracción con el modelo si hace falta.
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+            concluyente: Resultado de la extracción local
+
+        Returns:
+            Futuro de la extracción, o None si la extracción local alcanzó
+        """
+        if concluyente:
+            return None
+        return _EJECUTOR_TURNOS.submit(
+            self._ejecutar_extraccion,
+            self._preparar_extraccion(mensaje_usuario),
+            self._turno_consumo
+        )
+
+    def _resolver_extraccion(self, mensaje_usuario: str, futuro: Optional[Future]):
+        """Espera la extracción si hace falta para la urgencia, o la deja pendiente."""
+        if futuro is not None and self._requiere_extraccion_sincrona(mensaje_usuario):
+            # Verificar si hay síntomas graves antes de responder
+            self._incorporar_extraccion(futuro)
+        else:
+            self._extraccion_pendiente = futuro
+
+    def _cerrar_turno(self, mensaje_usuario: str, respuesta: str, inicio: float):
+        """Agrega la respuesta al historial y completa las métricas del turno."""
+        self.conversation_history.append(crear_mensaje("assistant", respuesta))
+
+        self.metricas_turno["extraccion_en_segundo_plano"] = self._hay_extraccion_pendiente()
+        self.metricas_turno["total_ms"] = (time.perf_counter() - inicio) * 1000
+        self.metricas_turno["modelo"] = self._modelo_turno
+
+        # Condensar el resumen del historial viejo fuera del camino crítico
+        if self.modelo_resumen and self.historial.requiere_condensar():
+            _EJECUTOR_TURNOS.submit(self.historial.condensar, self._resumir_con_modelo)
+
+        logger.info(f"Usuario: {mensaje_usuario[:50]}... | Asistente: {respuesta[:50]}...")
+
+        # Con la extracción en segundo plano, sus tokens llegan después: el
+        # consumo del turno se completa (y se verifica el SLO) cuando termina
+        turno, metricas = self._turno_consumo, self.metricas_turno
+        extraccion = self._extraccion_en_curso()
+        if extraccion is None:
+            self._cerrar_consumo_turno(turno, metricas)
+        else:
+            extraccion.add_done_callback(lambda _: self._cerrar_consumo_turno(turno, metricas))
+
+    def _cerrar_consumo_turno(self, turno: int, metricas: Dict):
+        """
+        Copia a las métricas del turno sus tokens y costo, y verifica el SLO.
+
+        Args:
+            turno: Índice del turno en el registro de consumo
+            metricas: metricas_turno de ese turno
+        """
+        consumo_turno = self.consumo.ultimo_turno(turno)
+        if consumo_turno is None:
+            return
+        metricas["tokens_entrada"] = consumo_turno["tokens_entrada"]
+        metricas["tokens_cacheados"] = consumo_turno["tokens_cacheados"]
+        metricas["tokens_salida"] = consumo_turno["tokens_salida"]
+        metricas["costo_usd"] = consumo_turno["costo_usd"]
+        self.consumo.verificar_slo(turno, metricas["total_ms"])
+
+        if consumo_turno["llamadas"]:
+            # Sin streaming, el primer fragmento es la respuesta completa
+            primer_fragmento_ms = metricas.get("primer_fragmento_ms", metricas.get("generacion_ms", 0))
+            logger.info(
+                f"Prompt: {consumo_turno['tokens_entrada']} tokens, "
+                f"{consumo_turno['tokens_cacheados']} desde la cache | "
+                f"primer fragmento: {primer_fragmento_ms:.0f} ms"
+            )
+
+    def _responder_sin_modelo(self, mensaje_usuario: str, datos_locales: Dict, concluyente: bool) -> Optional[str]:
+        """
+        Intenta responder sin llamar al modelo: primero el flujo de turno del
+        motor de diálogo, luego FAQs y por último la cache.
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+            datos_locales: Datos extraídos localmente del mensaje
+            concluyente: Si la extracción local entendió todo el mensaje
+
+        Returns:
+            Respuesta directa, o None si hay que consultar al modelo
+        """
+        # Durante un pedido de turno las respuestas cortas ("la primera", "el
+        # martes") contestan lo que se preguntó, no son preguntas frecuentes
+        en_pedido_de_turno = self.patient_data["tipo_consulta"] == "turno" or self.dialogo.pendiente is not None
+        # Un posible síntoma grave sin confirmar va por la extracción con el
+        # modelo antes de responder; el flujo de turno no lo puede tomar como dato
+        if self.usar_motor_dialogo and not self._requiere_extraccion_sincrona(mensaje_usuario):
+            respuesta = motor_dialogo.responder(self, mensaje_usuario, datos_locales, concluyente)
+            if respuesta is not None:
+                self.metricas_turno["motor_dialogo"] = self.dialogo.pendiente or "confirmado"
+                return respuesta
+
+        respuesta = None if en_pedido_de_turno else self._responder_faq(mensaje_usuario)
+        if respuesta is None and self._es_turno_cacheable(mensaje_usuario, datos_locales):
+            respuesta = cache_respuestas.obtener(mensaje_usuario)
+            self.metricas_turno["cache"] = respuesta is not None
+        return respuesta
+
+    def _es_turno_cacheable(self, mensaje_usuario: str, datos_locales: Dict) -> bool:
+        """
+        Indica si la respuesta al mensaje no depende del estado del paciente.
+
+        Solo se consideran preguntas independientes del contexto, sin datos
+        personales (salvo la cobertura), fuera de un pedido de turno y sin
+        indicios de urgencia.
+        """
+        if self.patient_data["sintomas_graves"] or self._requiere_extraccion_sincrona(mensaje_usuario):
+            return False
+        if self.patient_data["tipo_consulta"] == "turno" or set(datos_locales) - {"cobertura"}:
+            return False
+        palabras = normalizar_texto(mensaje_usuario).split()
+        return bool(palabras) and ("?" in mensaje_usuario or palabras[0] in INTERROGATIVOS)
+
+    def _guardar_en_cache(self, mensaje_usuario: str, datos_locales: Dict, respuesta: str):
+        """Guarda la respuesta si es reutilizable y no está personalizada."""
+        if (
+            respuesta != RESPUESTA_ERROR_TECNICO
+            and not self.metricas_turno.get("presupuesto_agotado")
+            and self.patient_data["nombre_completo"] is None
+            and self._es_turno_cacheable(mensaje_usuario, datos_locales)
+        ):
+            cache_respuestas.guardar(mensaje_usuario, respuesta)
+
+    def _mensajes_combinados(self) -> List[Dict[str, str]]:
+        """Ventana de historial más la instrucción de formato combinado."""
+        mensajes = self._mensajes_para_modelo()
+        mensajes.append({"role": "system", "content": prompts.PROMPT_RESPUESTA_COMBINADA})
+        return mensajes
+
+    def _parametros_combinados(self, messages: List[Dict[str, str]]) -> Dict:
+        """Parámetros del pedido combinado de respuesta y extracción."""
+        return self._agregar_herramientas({
+            "model": self._modelo_turno,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 500,
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": prompts.ESQUEMA_RESPUESTA_COMBINADA
+            }
+        })
+
+    def _responder_combinado(self, mensaje_usuario: str, datos_locales: Dict) -> Optional[str]:
+        """
+        Genera la respuesta y extrae los datos del paciente en una sola llamada.
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+            datos_locales: Datos extraídos localmente del mensaje
+
+        Returns:
+            Respuesta para el paciente, o None si hay que usar las dos llamadas
+        """
+        inicio = time.perf_counter()
+        contenido = None
+        try:
+            response = self._completar_con_herramientas(
+                self._parametros_combinados(self._mensajes_combinados()),
+                "combinada"
             )
+            contenido = response.choices[0].message.content
+        except PresupuestoAgotado:
+            return self._respuesta_de_respaldo()
+        except Exception as e:
+            logger.error(f"Error en la llamada combinada: {e}")
+
+        self.metricas_turno["generacion_ms"] = (time.perf_counter() - inicio) * 1000
+        return self._aplicar_combinada(mensaje_usuario, datos_locales, contenido)
+
+    def _aplicar_combinada(self, mensaje_usuario: str, datos_locales: Dict, contenido: Optional[str]) -> Optional[str]:
+        """
+        Valida la respuesta combinada y actualiza patient_data.
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+            datos_locales: Datos extraídos localmente del mensaje
+            contenido: JSON devuelto por el modelo (None si la llamada falló)
+
+        Returns:
+            Respuesta para el paciente, o None si el resultado no es válido
+        """
+        resultado = validar_respuesta_combinada(contenido) if contenido is not None else None
+        self.metricas_turno["combinada"] = resultado is not None
+        if resultado is None:
+            logger.warning("Respuesta combinada inválida, se usan dos llamadas")
+            return None
+
+        respuesta, datos = resultado
+        self._actualizar_datos_paciente(datos)
+
+        if self.patient_data["sintomas_graves"]:
+            return self._manejar_urgencia()
+
+        self._guardar_en_cache(mensaje_usuario, datos_locales, respuesta)
+        return respuesta
+
+    def _responder_faq(self, mensaje_usuario: str) -> Optional[str]:
+        """
+        Responde directo desde FAQS si la coincidencia es de alta confianza.
+
+        Los mensajes que pueden indicar una urgencia nunca se responden por
+        esta vía, para no saltear la verificación de síntomas graves. Durante
+        un pedido de turno no se llama (ver _responder_sin_modelo).
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+
+        Returns:
+            Respuesta de la FAQ, o None si hay que consultar al modelo
+        """
+        faq_key, puntaje = datos_clinica.buscar_faq_con_puntaje(mensaje_usuario)
+        self.metricas_turno["faq_puntaje"] = puntaje
+
+        acierto = (
+            faq_key is not None
+            and puntaje >= self.umbral_faq
+            and not self._requiere_extraccion_sincrona(mensaje_usuario)
+        )
+        with _lock_faq:
+            _estadisticas_faq["aciertos" if acierto else "fallos"] += 1
+
+        if not acierto:
+            return None
+
+        self.metricas_turno["faq"] = faq_key
+        logger.info(f"FAQ respondida sin modelo: {faq_key} (confianza {puntaje:.2f})")
+        return datos_clinica.FAQS[faq_key]["respuesta"]
+
+    def _requiere_extraccion_sincrona(self, mensaje: str) -> bool:
+        """Indica si el mensaje puede activar el protocolo de urgencia (el modelo lo confirma)."""
+        evaluacion = detector_urgencias.evaluar_urgencia(mensaje)
+        return evaluacion.urgente or evaluacion.dudosa
+
+    def _mensajes_para_modelo(self) -> List[Dict[str, str]]:
+        """Arma la ventana de historial a enviar y registra los tokens ahorrados."""
+        mensajes, metricas = self.historial.preparar(
+            self.conversation_history,
+            self.patient_data,
+            generar_contexto_turno(self.usar_herramientas)
+        )
+        self.metricas_turno.update(metricas)
+        return mensajes
+
+    def _cronometrar_respuesta(self, messages: List[Dict[str, str]]) -> Tuple[str, float]:
+        """Genera la respuesta y devuelve también su duración en milisegundos."""
+        inicio = time.perf_counter()
+        respuesta = self._generar_respuesta(messages)
+        return respuesta, (time.perf_counter() - inicio) * 1000
+
+    def _hay_extraccion_pendiente(self) -> bool:
+        """Indica si quedó una extracción corriendo en segundo plano."""
+        return self._extraccion_pendiente is not None
+
+    def _extraccion_en_curso(self) -> Optional[Future]:
+        """Extracción que quedó en segundo plano (con add_done_callback), o None."""
+        return self._extraccion_pendiente
+
+    def _esperar_extraccion_pendiente(self):
+        """Incorpora a patient_data la extracción que quedó en segundo plano."""
+        if self._extraccion_pendiente is not None:
+            futuro = self._extraccion_pendiente
+            self._extraccion_pendiente = None
+            self._incorporar_extraccion(futuro)
+
+    def _incorporar_extraccion(self, futuro: Future):
+        """Espera el resultado de una extracción y lo aplica a patient_data."""
+        contenido, duracion_ms = futuro.result()
+        self.metricas_turno["extraccion_ms"] = duracion_ms
+        if contenido is not None:
+            self._aplicar_extraccion(contenido)
+
+    def _generar_respuesta(self, messages: List[Dict[str, str]] = None) -> str:
+        """
+        Genera una respuesta usando OpenAI.
+
+        Args:
+            messages: Ventana de historial a enviar (por defecto se arma en el momento)
+        """
+        try:
+            if messages is None:
+                messages = self._mensajes_para_modelo()
+            response = self._completar_con_herramientas(self._parametros_respuesta(messages), "respuesta")
 
             respuesta = response.choices[0].message.content
             return respuesta
 
+        except PresupuestoAgotado:
+            return self._respuesta_de_respaldo()
+
         except Exception as e:
             logger.error(f"Error llamando a OpenAI API: {e}")
-            return "Disculpe, estoy teniendo problemas técnicos. ¿Podría intentar nuevamente?"
+            return RESPUESTA_ERROR_TECNICO
+
+    def _llamar_modelo(self, parametros: Dict, cobertura: bool = True):
+        """
+        Llama a chat.completions dentro del presupuesto del turno.
+
+        Los reintentos los maneja la política del turno, por eso se
+        desactivan los del SDK.
+
+        Args:
+            parametros: Parámetros de chat.completions.create
+            cobertura: Permitir una llamada duplicada si la primera se demora
+
+        Raises:
+            PresupuestoAgotado: Si se terminó el tiempo del turno
+        """
+        cliente = self.client.with_options(max_retries=0)
+        return self.politica.llamar(
+            lambda timeout: cliente.chat.completions.create(**parametros, timeout=timeout),
+            self._presupuesto,
+            cobertura
+        )
+
+    def _respuesta_de_respaldo(self) -> str:
+        """Respuesta fija para cuando se termina el tiempo del turno."""
+        self.metricas_turno["presupuesto_agotado"] = True
+        logger.warning("Presupuesto del turno agotado, se usa una respuesta de respaldo")
+        return random.choice(prompts.obtener_ejemplo_respuesta("demora"))
+
+    def _respuesta_fallida(self) -> str:
+        """Respuesta cuando no se pudo generar una: respaldo si faltó tiempo, error técnico si no."""
+        if self.metricas_turno.get("presupuesto_agotado"):
+            return self._respuesta_de_respaldo()
+        return RESPUESTA_ERROR_TECNICO
+
+    def _parametros_respuesta(self, messages: List[Dict[str, str]]) -> Dict:
+        """Parámetros del pedido de respuesta al paciente."""
+        return self._agregar_herramientas({
+            "model": self._modelo_turno,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 300
+        })
+
+    def _agregar_herramientas(self, parametros: Dict) -> Dict:
+        """Agrega las definiciones de herramientas si la sesión las usa."""
+        if self.usar_herramientas:
+            parametros["tools"] = herramientas.HERRAMIENTAS
+        return parametros
+
+    def _preparar_ronda(self, parametros: Dict, ronda: int):
+        """En la última ronda permitida se obliga al modelo a responder con texto."""
+        if "tools" in parametros and ronda == herramientas.MAX_RONDAS_HERRAMIENTAS - 1:
+            parametros["tool_choice"] = "none"
+
+    def _completar_con_herramientas(self, parametros: Dict, etapa: str):
+        """
+        Llama al modelo y ejecuta las herramientas que pida hasta obtener la respuesta final.
+
+        Args:
+            parametros: Parámetros de chat.completions.create
+            etapa: Etapa a la que se imputa el consumo
+
+        Returns:
+            Última respuesta del modelo (sin tool_calls)
+        """
+        parametros = dict(parametros, messages=list(parametros["messages"]))
+        for ronda in range(herramientas.MAX_RONDAS_HERRAMIENTAS):
+            self._preparar_ronda(parametros, ronda)
+            inicio = time.perf_counter()
+            response = self._llamar_modelo(parametros)
+            self._registrar_consumo(etapa, response, inicio)
+
+            llamadas = herramientas.llamadas_de_mensaje(response.choices[0].message)
+            if not llamadas:
+                break
+            parametros["messages"].extend(herramientas.mensajes_resultados(self, llamadas))
+        return response
+
+    def _parametros_extraccion(self, messages: List[Dict[str, str]]) -> Dict:
+        """Parámetros del pedido de extracción de datos."""
+        return {
+            "model": self.modelo_extraccion,
+            "messages": messages,
+            "temperature": 0.3,
+            "max_tokens": 200,
+            "response_format": {"type": "json_object"}
+        }
+
+    def _abrir_stream_respuesta(self, messages: List[Dict[str, str]], ronda: int = 0):
+        """Abre una respuesta de OpenAI en modo stream (None si falla)."""
+        try:
+            parametros = self._parametros_respuesta(messages)
+            self._preparar_ronda(parametros, ronda)
+            parametros.update(stream=True, stream_options={"include_usage": True})
+            return self._llamar_modelo(parametros, cobertura=False)
+        except PresupuestoAgotado:
+            self.metricas_turno["presupuesto_agotado"] = True
+            return None
+        except Exception as e:
+            logger.error(f"Error llamando a OpenAI API: {e}")
+            return None
+
+    def _fragmentar_stream(self, stream, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        Agrupa los tokens de un stream en frases completas.
+
+        Si el modelo pide herramientas, se ejecutan y se abre un nuevo stream
+        con los resultados.
+
+        Args:
+            stream: Stream devuelto por chat.completions.create(stream=True)
+            messages: Mensajes con los que se abrió el stream
+
+        Yields:
+            Frases terminadas en punto, signo o salto de línea
+        """
+        buffer = ""
+        messages = list(messages)
+        for ronda in range(herramientas.MAX_RONDAS_HERRAMIENTAS):
+            inicio = time.perf_counter()
+            uso = None
+            llamadas: Dict[int, Dict] = {}
+            try:
+                for chunk in stream:
+                    # El último chunk trae el consumo y no tiene choices
+                    if getattr(chunk, "usage", None) is not None:
+                        uso = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    for parcial in getattr(delta, "tool_calls", None) or []:
+                        herramientas.acumular_llamada_stream(llamadas, parcial)
+                    if not delta.content:
+                        continue
+                    buffer += delta.content
+                    frases, buffer = dividir_en_frases(buffer)
+                    yield from frases
+            except Exception as e:
+                logger.error(f"Error leyendo stream de OpenAI: {e}")
+            finally:
+                self.consumo.registrar(
+                    self._turno_consumo, "respuesta", self._modelo_turno, uso,
+                    (time.perf_counter() - inicio) * 1000
+                )
+
+            if not llamadas:
+                break
+            messages.extend(herramientas.mensajes_resultados(self, [llamadas[i] for i in sorted(llamadas)]))
+            stream = self._abrir_stream_respuesta(messages, ronda + 1)
+            if stream is None:
+                break
+
+        if buffer.strip():
+            yield buffer.strip()
+
+    def _resumir_con_modelo(self, texto: str) -> Optional[str]:
+        """
+        Condensa las líneas del resumen del historial con el modelo de resumen.
+
+        Corre en segundo plano, por eso no usa el presupuesto del turno.
+
+        Args:
+            texto: Líneas del resumen local
+
+        Returns:
+            Resumen condensado, o None si la llamada falló
+        """
+        turno = self._turno_consumo
+        inicio = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(
+                model=self.modelo_resumen,
+                messages=[
+                    {"role": "system", "content": prompts.PROMPT_RESUMEN_HISTORIAL},
+                    {"role": "user", "content": texto}
+                ],
+                temperature=0.3,
+                max_tokens=150
+            )
+            self.consumo.registrar(
+                turno, "resumen", self.modelo_resumen, getattr(response, "usage", None),
+                (time.perf_counter() - inicio) * 1000
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            logger.warning(f"Error condensando el resumen del historial: {e}")
+            return None
+
+    def _registrar_consumo(self, etapa: str, response, inicio: float, turno: int = None):
+        """Registra tokens, latencia y costo de una llamada en el turno actual (o en el indicado)."""
+        self.consumo.registrar(
+            self._turno_consumo if turno is None else turno,
+            etapa,
+            getattr(response, "model", None) or self._modelo_turno,
+            getattr(response, "usage", None),
+            (time.perf_counter() - inicio) * 1000
+        )
 
     def _extraer_informacion(self, mensaje: str):
         """
@@ -177,37 +1157,73 @@ ESPECIALIDADES DISPONIBLES:
         Args:
             mensaje: Mensaje del usuario
         """
-        # Intentar extraer información usando OpenAI
-        try:
-            extraction_prompt = f"""{prompts.PROMPT_EXTRACCION_DATOS}
+        contenido, _ = self._ejecutar_extraccion(self._preparar_extraccion(mensaje))
+        if contenido is not None:
+            self._aplicar_extraccion(contenido)
+
+    def _preparar_extraccion(self, mensaje: str) -> List[Dict[str, str]]:
+        """
+        Arma los mensajes del pedido de extracción.
+
+        Se construyen en el hilo principal para que la llamada en paralelo
+        trabaje sobre una copia fija de la conversación.
+
+        Args:
+            mensaje: Mensaje del usuario
 
-Conversación hasta ahora:
+        Returns:
+            Lista de mensajes para la API
+        """
+        # Las instrucciones fijas van en el mensaje de sistema (prefijo cacheable)
+        # y lo propio del turno en el mensaje del usuario
+        extraction_prompt = f"""Conversación hasta ahora:
 {self._obtener_resumen_conversacion()}
 
 Último mensaje del usuario: "{mensaje}"
 
-Datos actuales del paciente: {json.dumps(self.patient_data, ensure_ascii=False)}
+Datos actuales del paciente: {json.dumps(self.patient_data.copy(), ensure_ascii=False)}
 
 Extrae SOLO la nueva información del último mensaje y actualiza los datos. Si un campo ya tiene valor y no se menciona en el último mensaje, mantén el valor anterior.
 """
+        return [
+            {"role": "system", "content": _PROMPT_SISTEMA_EXTRACCION},
+            {"role": "user", "content": extraction_prompt}
+        ]
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Eres un experto en extracción de información estructurada."},
-                    {"role": "user", "content": extraction_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=200
-            )
+    def _ejecutar_extraccion(self, messages: List[Dict[str, str]], turno: int = None) -> Tuple[Optional[str], float]:
+        """
+        Llama a OpenAI para extraer los datos del paciente.
+
+        Args:
+            messages: Mensajes armados por _preparar_extraccion
+            turno: Turno del registro de consumo al que se imputa (default: el actual)
 
+        Returns:
+            Tupla (contenido JSON o None si falló, duración en milisegundos)
+        """
+        inicio = time.perf_counter()
+        contenido = None
+        try:
+            response = self._llamar_modelo(self._parametros_extraccion(messages))
+            self._registrar_consumo("extraccion", response, inicio, turno)
+            contenido = response.choices[0].message.content
+        except Exception as e:
+            logger.error(f"Error extrayendo información: {e}")
+
+        return contenido, (time.perf_counter() - inicio) * 1000
+
+    def _aplicar_extraccion(self, contenido: str):
+        """
+        Actualiza patient_data con el JSON devuelto por la extracción.
+
+        Args:
+            contenido: Respuesta del modelo (objeto JSON)
+        """
+        try:
             # Parsear respuesta JSON
-            extracted_data = json.loads(response.choices[0].message.content)
+            extracted_data = json.loads(contenido)
 
-            # Actualizar datos del paciente (solo campos no nulos)
-            for key, value in extracted_data.items():
-                if value is not None and key in self.patient_data:
-                    self.patient_data[key] = value
+            self._actualizar_datos_paciente(extracted_data)
 
             logger.info(f"Datos extraídos: {self.patient_data}")
 
@@ -216,6 +1232,17 @@ Extrae SOLO la nueva información del último mensaje y actualiza los datos. Si
         except Exception as e:
             logger.error(f"Error extrayendo información: {e}")
 
+    def _actualizar_datos_paciente(self, datos: Dict):
+        """
+        Actualiza patient_data con los campos no nulos recibidos.
+
+        Args:
+            datos: Campos extraídos del mensaje
+        """
+        for key, value in datos.items():
+            if value is not None and key in self.patient_data:
+                self.patient_data[key] = value
+
     def _manejar_urgencia(self) -> str:
         """Maneja casos de urgencia médica."""
         return """Por su seguridad, le recomiendo que acuda inmediatamente a la guardia del Hospital Fernández (Av. Cerviño 3356) o al Hospital Rivadavia (Av. Gral. Las Heras 2670), ambos con guardia 24hs. También puede llamar al 107 para emergencias médicas.
@@ -264,17 +1291,66 @@ Nuestra clínica no cuenta con servicio de urgencias. ¿Necesita la dirección d
             precio = datos_clinica.PRECIOS['consulta_particular']
             return False, f"Lamentablemente no tenemos convenio con esa obra social. La consulta sería particular, con un costo de ${precio}. ¿Desea agendar de todas formas?"
 
-    def obtener_turnos_disponibles(self, cuando: str = "manana") -> Dict:
+    def obtener_turnos_disponibles(self, cuando: str = "manana", especialidad: str = None) -> Optional[Dict]:
         """
         Obtiene los turnos disponibles.
 
         Args:
             cuando: "hoy", "manana" o "pasado_manana"
+            especialidad: Especialidad (clave o texto libre); None para todas
+
+        Returns:
+            Diccionario con fecha y horarios libres, o None si el día no es válido
+        """
+        return agenda.obtener_turnos_disponibles(cuando, _clave_especialidad(especialidad))
+
+    def proximos_turnos(self, especialidad: str = None, cantidad: int = 5) -> List[Dict]:
+        """
+        Obtiene los próximos turnos libres desde ahora, aunque sean de otras semanas.
+
+        Args:
+            especialidad: Especialidad (clave o texto libre); None para todas
+            cantidad: Cantidad máxima de turnos
 
         Returns:
-            Diccionario con turnos disponibles
+            Lista de diccionarios con fecha, hora y medico
+        """
+        return agenda.proximos_turnos(_clave_especialidad(especialidad), cantidad)
+
+    def reservar_turno(self, fecha: str, hora: str, especialidad: str = None, medico: str = None) -> bool:
         """
-        return datos_clinica.obtener_turnos_disponibles(cuando)
+        Reserva el turno elegido mientras el paciente lo confirma (reemplaza la reserva anterior).
+
+        Args:
+            fecha: Fecha del turno (dd/mm/aaaa)
+            hora: Hora del turno (HH:MM)
+            especialidad: Especialidad (clave o texto libre)
+            medico: Nombre del médico (opcional)
+
+        Returns:
+            True si el turno quedó reservado para esta sesión
+        """
+        dia = agenda.fecha_iso(fecha or "")
+        if dia is None:
+            return False
+        try:
+            self.reserva = agenda.obtener_agenda().reservar(
+                self.titular_agenda, dia, hora, _clave_especialidad(especialidad), medico
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error reservando el turno: {e}")
+            self.reserva = None
+        return self.reserva is not None
+
+    def liberar_reserva(self):
+        """Libera el turno reservado y todavía no confirmado."""
+        if self.reserva is None or self.patient_data["turno_confirmado"] is not None:
+            return
+        try:
+            agenda.obtener_agenda().cancelar(self.reserva.id, self.titular_agenda)
+        except sqlite3.Error as e:
+            logger.error(f"Error liberando el turno: {e}")
+        self.reserva = None
 
     def confirmar_turno(
         self,
@@ -284,7 +1360,11 @@ Nuestra clínica no cuenta con servicio de urgencias. ¿Necesita la dirección d
         medico: str = None
     ) -> str:
         """
-        Confirma un turno y genera mensaje de confirmación.
+        Confirma un turno en la agenda y genera mensaje de confirmación.
+
+        Si la sesión ya tenía reservado ese turno se confirma la reserva; si
+        no, se reserva y confirma en un solo paso. Si el horario ya no está
+        libre, patient_data["turno_confirmado"] queda en None.
 
         Args:
             fecha: Fecha del turno
@@ -293,8 +1373,33 @@ Nuestra clínica no cuenta con servicio de urgencias. ¿Necesita la dirección d
             medico: Nombre del médico (opcional)
 
         Returns:
-            Mensaje de confirmación
+            Mensaje de confirmación, o el aviso de que el horario ya no está disponible
         """
+        paciente = " - ".join(
+            str(self.patient_data[campo]) for campo in ("nombre_completo", "dni") if self.patient_data.get(campo)
+        ) or None
+        dia = agenda.fecha_iso(fecha or "")
+        reserva = self.reserva
+        try:
+            if reserva is not None and (reserva.fecha, reserva.hora) == (dia, hora):
+                confirmado = agenda.obtener_agenda().confirmar(reserva.id, self.titular_agenda, paciente)
+            else:
+                reserva = agenda.obtener_agenda().reservar(
+                    self.titular_agenda, dia, hora, _clave_especialidad(especialidad), medico,
+                    confirmar=True, paciente=paciente
+                ) if dia else None
+                confirmado = reserva is not None
+        except sqlite3.Error as e:
+            logger.error(f"Error confirmando el turno: {e}")
+            confirmado = False
+
+        if not confirmado:
+            self.reserva = None
+            logger.info(f"Turno no disponible al confirmar: {fecha} {hora} {especialidad}")
+            return f"Lo siento, el turno del {fecha} a las {hora} ya no está disponible."
+
+        self.reserva = reserva
+        medico = medico or reserva.medico
         self.patient_data["turno_confirmado"] = {
             "fecha": fecha,
             "hora": hora,
@@ -333,29 +1438,54 @@ Por favor llegue 10 minutos antes con su DNI"""
 
     def obtener_datos_paciente(self) -> Dict:
         """Retorna los datos recolectados del paciente."""
+        self._esperar_extraccion_pendiente()
         return self.patient_data.copy()
 
+    def obtener_metricas_turno(self) -> Dict:
+        """
+        Retorna los tiempos por etapa y el consumo del último turno.
+
+        Returns:
+            Diccionario con extraccion_ms, generacion_ms, total_ms, tokens_entrada,
+            tokens_salida y costo_usd
+        """
+        return self.metricas_turno.copy()
+
+    def obtener_consumo(self) -> Dict:
+        """
+        Retorna tokens, latencia de modelo y costo estimado del último turno y de la sesión.
+
+        Returns:
+            Diccionario con "turno" y "sesion" (llamadas, tokens_entrada,
+            tokens_salida, latencia_modelo_ms, costo_usd y detalle por etapa)
+        """
+        return {
+            "turno": self.consumo.ultimo_turno(),
+            "sesion": self.consumo.total()
+        }
+
     def reiniciar_conversacion(self):
         """Reinicia la conversación (para una nueva llamada)."""
+        if self._extraccion_pendiente is not None:
+            self._extraccion_pendiente.cancel()
+            self._extraccion_pendiente = None
         self._inicializar_sistema()
-        self.patient_data = {
-            "nombre_completo": None,
-            "dni": None,
-            "cobertura": None,
-            "tipo_consulta": None,
-            "especialidad": None,
-            "fecha_preferida": None,
-            "sintomas_graves": False,
-            "turno_confirmado": None
-        }
+        self.historial.reiniciar()
+        self.consumo = RegistroConsumo()
+        self._turno_consumo = -1
+        self.liberar_reserva()
+        self.reserva = None
+        self.patient_data = DatosPaciente()
+        self.dialogo.reiniciar()
         logger.info("Conversación reiniciada")
 
     def obtener_historial(self) -> List[Dict[str, str]]:
         """Retorna el historial completo de la conversación."""
-        return self.conversation_history.copy()
+        return [mensaje_para_api(msg) for msg in self.conversation_history]
 
     def generar_resumen_llamada(self) -> str:
         """Genera un resumen de la llamada para logs."""
+        self._esperar_extraccion_pendiente()
         resumen = f"""
 === RESUMEN DE LLAMADA ===
 Fecha y hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
@@ -378,7 +1508,18 @@ TURNO:
         else:
             resumen += "- No se confirmó turno\n"
 
-        resumen += f"\nTotal de mensajes intercambiados: {len(self.conversation_history) - 1}\n"
+        total_mensajes = sum(1 for msg in self.conversation_history if msg["role"] != "system")
+        resumen += f"\nTotal de mensajes intercambiados: {total_mensajes}\n"
+
+        consumo = self.consumo.total()
+        resumen += "\nCONSUMO:\n"
+        resumen += f"- Llamadas al modelo: {consumo['llamadas']}\n"
+        resumen += (
+            f"- Tokens: {consumo['tokens_entrada']} entrada ({consumo['tokens_cacheados']} cacheados) "
+            f"/ {consumo['tokens_salida']} salida\n"
+        )
+        resumen += f"- Latencia acumulada del modelo: {consumo['latencia_modelo_ms']:.0f} ms\n"
+        resumen += f"- Costo estimado: USD {consumo['costo_usd']:.4f}\n"
         resumen += "========================\n"
 
         return resumen
@@ -386,17 +1527,19 @@ TURNO:
 
 # ==================== FUNCIONES DE UTILIDAD ====================
 
-def crear_asistente(model: str = None) -> AIAssistant:
+def crear_asistente(model: str = None, modo_combinado: bool = None, usar_herramientas: bool = None) -> AIAssistant:
     """
     Crea una instancia del asistente.
 
     Args:
         model: Modelo de OpenAI a usar
+        modo_combinado: Pedir respuesta y datos en una sola llamada
+        usar_herramientas: Consultar la agenda con herramientas
 
     Returns:
         Instancia de AIAssistant
     """
-    return AIAssistant(model=model)
+    return AIAssistant(model=model, modo_combinado=modo_combinado, usar_herramientas=usar_herramientas)
 
 
 # Para pruebas directas del módulo
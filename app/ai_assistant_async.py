@@ -0,0 +1,296 @@
+"""
+AI Assistant Async - Variante asyncio del asistente basada en AsyncOpenAI
+Misma lógica que AIAssistant, pero sin bloquear un hilo por cada llamada a
+OpenAI: un solo proceso puede atender muchas llamadas concurrentes.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .ai_assistant import AIAssistant, RESPUESTA_ERROR_TECNICO
+from .latencia import PresupuestoAgotado
+from . import herramientas
+from .openai_client import obtener_cliente_async
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAIAssistant(AIAssistant):
+    """Asistente de IA con la misma interfaz pública que AIAssistant, pero asíncrona."""
+
+    def __init__(
+        self,
+        model: str = None,
+        umbral_faq: float = None,
+        timeout_llamada: float = None,
+        modo_combinado: bool = None,
+        usar_herramientas: bool = None,
+        modelo_extraccion: str = None,
+        modelo_resumen: str = None,
+        modelo_avanzado: str = None,
+        usar_motor_dialogo: bool = None
+    ):
+        """
+        Inicializa el asistente asíncrono.
+
+        Args:
+            model: Modelo de OpenAI a usar (default: gpt-4o-mini desde .env)
+            umbral_faq: Confianza mínima para responder una FAQ sin llamar al modelo
+            timeout_llamada: Tiempo máximo en segundos de cada llamada a OpenAI
+                (default: OPENAI_TIMEOUT_LLAMADA_SEGUNDOS desde .env, o 20)
+            modo_combinado: Pedir respuesta y datos del paciente en una sola llamada
+            usar_herramientas: Consultar coberturas, médicos y turnos con herramientas
+            modelo_extraccion: Modelo para extraer datos del paciente
+            modelo_resumen: Modelo para condensar el historial viejo
+            modelo_avanzado: Modelo al que se escalan los turnos complejos
+            usar_motor_dialogo: Conducir el pedido de turno sin llamar al modelo
+        """
+        super().__init__(
+            model=model,
+            umbral_faq=umbral_faq,
+            modo_combinado=modo_combinado,
+            usar_herramientas=usar_herramientas,
+            modelo_extraccion=modelo_extraccion,
+            modelo_resumen=modelo_resumen,
+            modelo_avanzado=modelo_avanzado,
+            usar_motor_dialogo=usar_motor_dialogo
+        )
+        self.client_async = obtener_cliente_async()
+        self.timeout_llamada = timeout_llamada or float(os.getenv("OPENAI_TIMEOUT_LLAMADA_SEGUNDOS", "20"))
+
+        # Extracción que quedó corriendo en segundo plano del turno anterior
+        self._tarea_extraccion: Optional[asyncio.Task] = None
+
+    async def procesar_mensaje(self, mensaje_usuario: str) -> str:
+        """
+        Procesa un mensaje del usuario y genera una respuesta.
+
+        La extracción y la generación corren como tareas concurrentes. Si el
+        llamador cancela la corrutina, también se cancelan ambas tareas.
+
+        Args:
+            mensaje_usuario: Mensaje del usuario
+
+        Returns:
+            Respuesta del asistente
+        """
+        inicio = time.perf_counter()
+        tareas: List[asyncio.Task] = []
+        try:
+            await self._esperar_tarea_extraccion()
+            datos_locales, concluyente = self._iniciar_turno(mensaje_usuario)
+
+            if self.patient_data["sintomas_graves"]:
+                # Urgencia detectada localmente o en un turno anterior
+                self._tarea_extraccion = self._lanzar_extraccion_async(mensaje_usuario, concluyente)
+                respuesta = self._manejar_urgencia()
+            else:
+                # Flujo de turno, FAQs de alta confianza y respuestas en cache: sin llamar al modelo
+                respuesta = self._responder_sin_modelo(mensaje_usuario, datos_locales, concluyente)
+
+            if respuesta is None and self.modo_combinado:
+                # Respuesta y extracción en una sola llamada
+                respuesta = await self._responder_combinado_async(mensaje_usuario, datos_locales)
+
+            if respuesta is None:
+                # Lanzar extracción y generación al mismo tiempo
+                tarea_extraccion = self._lanzar_extraccion_async(mensaje_usuario, concluyente)
+                tarea_respuesta = asyncio.create_task(
+                    self._cronometrar_respuesta_async(self._mensajes_para_modelo())
+                )
+                tareas = [t for t in (tarea_extraccion, tarea_respuesta) if t is not None]
+
+                if tarea_extraccion is not None and self._requiere_extraccion_sincrona(mensaje_usuario):
+                    # Verificar si hay síntomas graves antes de responder
+                    await self._incorporar_tarea(tarea_extraccion)
+                else:
+                    self._tarea_extraccion = tarea_extraccion
+
+                if self.patient_data["sintomas_graves"]:
+                    self._turno_cancelado.set()
+                    tarea_respuesta.cancel()
+                    respuesta = self._manejar_urgencia()
+                else:
+                    respuesta, self.metricas_turno["generacion_ms"] = await tarea_respuesta
+                    self._guardar_en_cache(mensaje_usuario, datos_locales, respuesta)
+
+            self._cerrar_turno(mensaje_usuario, respuesta, inicio)
+
+            return respuesta
+
+        except asyncio.CancelledError:
+            for tarea in tareas:
+                tarea.cancel()
+            self._tarea_extraccion = None
+            logger.info("Procesamiento de mensaje cancelado")
+            raise
+
+        except Exception as e:
+            logger.error(f"Error procesando mensaje: {e}")
+            return "Disculpe, tuve un problema procesando su solicitud. ¿Podría repetir?"
+
+    async def obtener_saludo_inicial(self) -> str:
+        """Genera el saludo inicial del asistente."""
+        return super().obtener_saludo_inicial()
+
+    async def obtener_datos_paciente(self) -> Dict:
+        """Retorna los datos recolectados del paciente."""
+        await self._esperar_tarea_extraccion()
+        return super().obtener_datos_paciente()
+
+    async def generar_resumen_llamada(self) -> str:
+        """Genera un resumen de la llamada para logs."""
+        await self._esperar_tarea_extraccion()
+        return super().generar_resumen_llamada()
+
+    def reiniciar_conversacion(self):
+        """Reinicia la conversación (para una nueva llamada)."""
+        if self._tarea_extraccion is not None:
+            self._tarea_extraccion.cancel()
+            self._tarea_extraccion = None
+        super().reiniciar_conversacion()
+
+    # ==================== TAREAS ====================
+
+    def _hay_extraccion_pendiente(self) -> bool:
+        """Indica si quedó una extracción corriendo en segundo plano."""
+        return self._tarea_extraccion is not None
+
+    def _extraccion_en_curso(self) -> Optional[asyncio.Task]:
+        """Tarea de extracción que quedó en segundo plano, o None."""
+        return self._tarea_extraccion
+
+    def _lanzar_extraccion_async(self, mensaje_usuario: str, concluyente: bool) -> Optional[asyncio.Task]:
+        """Lanza la extracción con el modelo como tarea, si la local no alcanzó."""
+        if concluyente:
+            return None
+        return asyncio.create_task(
+            self._ejecutar_extraccion_async(self._preparar_extraccion(mensaje_usuario))
+        )
+
+    async def _esperar_tarea_extraccion(self):
+        """Incorpora a patient_data la extracción que quedó en segundo plano."""
+        if self._tarea_extraccion is not None:
+            tarea = self._tarea_extraccion
+            self._tarea_extraccion = None
+            await self._incorporar_tarea(tarea)
+
+    async def _incorporar_tarea(self, tarea: asyncio.Task):
+        """Espera el resultado de una extracción y lo aplica a patient_data."""
+        contenido, duracion_ms = await tarea
+        self.metricas_turno["extraccion_ms"] = duracion_ms
+        if contenido is not None:
+            self._aplicar_extraccion(contenido)
+
+    # ==================== LLAMADAS A OPENAI ====================
+
+    async def _cronometrar_respuesta_async(self, messages: List[Dict[str, str]]) -> Tuple[str, float]:
+        """Genera la respuesta y devuelve también su duración en milisegundos."""
+        inicio = time.perf_counter()
+        try:
+            response = await self._completar_con_herramientas_async(self._parametros_respuesta(messages), "respuesta")
+            respuesta = response.choices[0].message.content
+        except PresupuestoAgotado:
+            respuesta = self._respuesta_de_respaldo()
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout de {self.timeout_llamada}s generando respuesta")
+            respuesta = RESPUESTA_ERROR_TECNICO
+        except Exception as e:
+            logger.error(f"Error llamando a OpenAI API: {e}")
+            respuesta = RESPUESTA_ERROR_TECNICO
+
+        return respuesta, (time.perf_counter() - inicio) * 1000
+
+    async def _llamar_modelo_async(self, parametros: Dict, cobertura: bool = True):
+        """Versión asíncrona de _llamar_modelo; cada intento además respeta timeout_llamada."""
+        cliente = self.client_async.with_options(max_retries=0)
+        return await self.politica.llamar_async(
+            lambda timeout: asyncio.wait_for(
+                cliente.chat.completions.create(**parametros, timeout=timeout),
+                timeout=min(timeout, self.timeout_llamada)
+            ),
+            self._presupuesto,
+            cobertura
+        )
+
+    async def _completar_con_herramientas_async(self, parametros: Dict, etapa: str):
+        """Versión asíncrona de _completar_con_herramientas (con timeout por llamada)."""
+        parametros = dict(parametros, messages=list(parametros["messages"]))
+        for ronda in range(herramientas.MAX_RONDAS_HERRAMIENTAS):
+            self._preparar_ronda(parametros, ronda)
+            inicio = time.perf_counter()
+            response = await self._llamar_modelo_async(parametros)
+            self._registrar_consumo(etapa, response, inicio)
+
+            llamadas = herramientas.llamadas_de_mensaje(response.choices[0].message)
+            if not llamadas:
+                break
+            parametros["messages"].extend(herramientas.mensajes_resultados(self, llamadas))
+        return response
+
+    async def _responder_combinado_async(self, mensaje_usuario: str, datos_locales: Dict) -> Optional[str]:
+        """Versión asíncrona de _responder_combinado."""
+        inicio = time.perf_counter()
+        contenido = None
+        try:
+            response = await self._completar_con_herramientas_async(
+                self._parametros_combinados(self._mensajes_combinados()),
+                "combinada"
+            )
+            contenido = response.choices[0].message.content
+        except PresupuestoAgotado:
+            return self._respuesta_de_respaldo()
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout de {self.timeout_llamada}s en la llamada combinada")
+        except Exception as e:
+            logger.error(f"Error en la llamada combinada: {e}")
+
+        self.metricas_turno["generacion_ms"] = (time.perf_counter() - inicio) * 1000
+        return self._aplicar_combinada(mensaje_usuario, datos_locales, contenido)
+
+    async def _ejecutar_extraccion_async(self, messages: List[Dict[str, str]]) -> Tuple[Optional[str], float]:
+        """
+        Llama a OpenAI para extraer los datos del paciente.
+
+        Args:
+            messages: Mensajes armados por _preparar_extraccion
+
+        Returns:
+            Tupla (contenido JSON o None si falló, duración en milisegundos)
+        """
+        inicio = time.perf_counter()
+        contenido = None
+        try:
+            response = await self._llamar_modelo_async(self._parametros_extraccion(messages))
+            self._registrar_consumo("extraccion", response, inicio)
+            contenido = response.choices[0].message.content
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout de {self.timeout_llamada}s extrayendo información")
+        except Exception as e:
+            logger.error(f"Error extrayendo información: {e}")
+
+        return contenido, (time.perf_counter() - inicio) * 1000
+
+
+# ==================== FUNCIONES DE UTILIDAD ====================
+
+def crear_asistente_async(
+    model: str = None,
+    modo_combinado: bool = None,
+    usar_herramientas: bool = None
+) -> AsyncAIAssistant:
+    """
+    Crea una instancia del asistente asíncrono.
+
+    Args:
+        model: Modelo de OpenAI a usar
+        modo_combinado: Pedir respuesta y datos en una sola llamada
+        usar_herramientas: Consultar la agenda con herramientas
+
+    Returns:
+        Instancia de AsyncAIAssistant
+    """
+    return AsyncAIAssistant(model=model, modo_combinado=modo_combinado, usar_herramientas=usar_herramientas)
@@ -0,0 +1,454 @@
+"""
+Backend Simulado - Servidor local compatible con la API de OpenAI
+Responde /v1/chat/completions (con y sin streaming, JSON, structured outputs y
+herramientas) y /v1/audio/transcriptions con respuestas guionadas y latencias
+configurables, para hacer pruebas de carga de los bots sin red ni costo.
+
+Uso:
+    python -m app.backend_simulado --puerto 8089 --latencia lognormal:600:0.4
+    LLM_BACKEND=local gunicorn -w 2 --threads 16 -b 127.0.0.1:5000 app.whatsapp_bot:app
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+import argparse
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
+
+from flask import Flask, Response, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+
+# Prefijos que el proveedor cachea a partir de este tamaño, en bloques de 128 tokens
+MINIMO_TOKENS_CACHE = 1024
+BLOQUE_TOKENS_CACHE = 128
+MAX_PREFIJOS_CACHE = 1000
+
+# Guion por defecto: la primera regla cuyo texto aparece en el último mensaje
+# del usuario define la respuesta
+GUION_POR_DEFECTO = {
+    "respuestas": [
+        {"contiene": ["urgencia", "dolor de pecho", "no puedo respirar"],
+         "respuesta": "Por lo que me cuenta, llame ya mismo al 107 o acérquese a la guardia.",
+         "datos": {"tipo_consulta": "urgencia", "sintomas_graves": True}},
+        {"contiene": ["turno"],
+         "respuesta": "Con gusto le ayudo a sacar un turno. ¿Para qué especialidad lo necesita?",
+         "datos": {"tipo_consulta": "turno"}},
+        {"contiene": ["obra social", "prepaga", "cobertura"],
+         "respuesta": "Déjeme verificar su cobertura.",
+         "herramienta": {"nombre": "verificar_cobertura", "argumentos": {"cobertura": "OSDE"}}},
+        {"contiene": ["horario", "dirección", "direccion"],
+         "respuesta": "Atendemos de lunes a viernes de 8 a 20 y los sábados de 8 a 13."},
+        {"contiene": ["gracias", "chau", "adiós"],
+         "respuesta": "¡Gracias por comunicarse con la clínica! Que tenga un buen día."},
+    ],
+    "respuesta_por_defecto": "Entiendo. ¿Me podría dar un poco más de detalle para ayudarle mejor?",
+    "transcripcion": "Hola, quiero sacar un turno con cardiología",
+}
+
+
+# ==================== LATENCIA ====================
+
+class DistribucionLatencia:
+    """Distribución de latencias en milisegundos ("fija:300", "uniforme:200:800", "normal:500:100", "lognormal:600:0.4")."""
+
+    def __init__(self, especificacion: str):
+        """
+        Inicializa la distribución.
+
+        Args:
+            especificacion: "tipo:param1[:param2]"; lognormal recibe la mediana
+                en ms y el sigma, normal la media y el desvío en ms
+
+        Raises:
+            ValueError: Si la especificación no es válida
+        """
+        partes = especificacion.strip().lower().split(":")
+        self.tipo = partes[0]
+        try:
+            self.parametros = [float(p) for p in partes[1:]]
+        except ValueError:
+            raise ValueError(f"Latencia inválida: {especificacion}")
+
+        cantidad = {"fija": 1, "uniforme": 2, "normal": 2, "lognormal": 2}.get(self.tipo)
+        if cantidad is None or len(self.parametros) != cantidad:
+            raise ValueError(f"Latencia inválida: {especificacion}")
+        self.especificacion = especificacion
+
+    def muestrear(self) -> float:
+        """Retorna una latencia en segundos."""
+        if self.tipo == "fija":
+            ms = self.parametros[0]
+        elif self.tipo == "uniforme":
+            ms = random.uniform(*self.parametros)
+        elif self.tipo == "normal":
+            ms = random.gauss(*self.parametros)
+        else:
+            mediana, sigma = self.parametros
+            ms = mediana * random.lognormvariate(0, sigma)
+        return max(ms, 0.0) / 1000
+
+
+# ==================== CONFIGURACIÓN ====================
+
+_config = {
+    "latencia": DistribucionLatencia(os.getenv("SIMULADO_LATENCIA", "lognormal:600:0.4")),
+    "latencia_transcripcion": DistribucionLatencia(os.getenv("SIMULADO_LATENCIA_TRANSCRIPCION", "lognormal:900:0.3")),
+    "ms_por_fragmento": float(os.getenv("SIMULADO_MS_POR_FRAGMENTO", "20")),
+    "tasa_errores": float(os.getenv("SIMULADO_TASA_ERRORES", "0")),
+    "guion": GUION_POR_DEFECTO,
+}
+
+_estadisticas = {"chat": 0, "stream": 0, "herramientas": 0, "transcripciones": 0, "errores": 0, "tokens_cacheados": 0}
+_prefijos_vistos: Dict[str, None] = {}
+_lock = Lock()
+
+
+def configurar(
+    latencia: str = None,
+    latencia_transcripcion: str = None,
+    ms_por_fragmento: float = None,
+    tasa_errores: float = None,
+    guion: Dict = None
+):
+    """
+    Cambia la configuración del servidor.
+
+    Args:
+        latencia: Distribución de la latencia de chat (hasta el primer token con streaming)
+        latencia_transcripcion: Distribución de la latencia de transcripción
+        ms_por_fragmento: Pausa entre fragmentos del streaming
+        tasa_errores: Proporción de pedidos que fallan con 429 o 500 (0 a 1)
+        guion: Respuestas guionadas (mismo formato que GUION_POR_DEFECTO)
+    """
+    if latencia:
+        _config["latencia"] = DistribucionLatencia(latencia)
+    if latencia_transcripcion:
+        _config["latencia_transcripcion"] = DistribucionLatencia(latencia_transcripcion)
+    if ms_por_fragmento is not None:
+        _config["ms_por_fragmento"] = ms_por_fragmento
+    if tasa_errores is not None:
+        _config["tasa_errores"] = tasa_errores
+    if guion is not None:
+        _config["guion"] = {**GUION_POR_DEFECTO, **guion}
+
+
+def _contar(campo: str, cantidad: int = 1):
+    """Incrementa un contador de estadísticas."""
+    with _lock:
+        _estadisticas[campo] += cantidad
+
+
+# ==================== RESPUESTAS ====================
+
+def _estimar_tokens(texto: str) -> int:
+    """Aproxima 1 token cada 4 caracteres."""
+    return len(texto) // 4 + 1
+
+
+def _texto_mensaje(mensaje: Dict) -> str:
+    """Contenido de un mensaje como texto (acepta contenido en partes)."""
+    contenido = mensaje.get("content") or ""
+    if isinstance(contenido, list):
+        return " ".join(parte.get("text", "") for parte in contenido if isinstance(parte, dict))
+    return contenido
+
+
+def _uso(mensajes: List[Dict], completado: str) -> Dict:
+    """Arma el usage, simulando la cache de prompts sobre el primer mensaje."""
+    tokens_entrada = sum(_estimar_tokens(_texto_mensaje(msg)) + 4 for msg in mensajes)
+    cacheados = 0
+    if mensajes:
+        prefijo = _texto_mensaje(mensajes[0])
+        tokens_prefijo = _estimar_tokens(prefijo)
+        if tokens_prefijo >= MINIMO_TOKENS_CACHE:
+            clave = hashlib.sha1(prefijo.encode("utf-8")).hexdigest()
+            with _lock:
+                if clave in _prefijos_vistos:
+                    cacheados = tokens_prefijo // BLOQUE_TOKENS_CACHE * BLOQUE_TOKENS_CACHE
+                    _estadisticas["tokens_cacheados"] += cacheados
+                else:
+                    _prefijos_vistos[clave] = None
+                    if len(_prefijos_vistos) > MAX_PREFIJOS_CACHE:
+                        _prefijos_vistos.pop(next(iter(_prefijos_vistos)))
+    tokens_salida = _estimar_tokens(completado)
+    return {
+        "prompt_tokens": tokens_entrada,
+        "completion_tokens": tokens_salida,
+        "total_tokens": tokens_entrada + tokens_salida,
+        "prompt_tokens_details": {"cached_tokens": cacheados},
+    }
+
+
+def _buscar_regla(mensajes: List[Dict]) -> Dict:
+    """Regla del guion que corresponde al último mensaje del usuario."""
+    guion = _config["guion"]
+    ultimo = next((_texto_mensaje(msg) for msg in reversed(mensajes) if msg.get("role") == "user"), "")
+    ultimo = ultimo.lower()
+    for regla in guion.get("respuestas", []):
+        claves = regla.get("contiene", [])
+        if isinstance(claves, str):
+            claves = [claves]
+        if any(clave.lower() in ultimo for clave in claves):
+            return regla
+    return {"respuesta": guion.get("respuesta_por_defecto", "")}
+
+
+def _texto_regla(regla: Dict) -> str:
+    """Respuesta de la regla (si es una lista, una al azar)."""
+    respuesta = regla.get("respuesta", "")
+    return random.choice(respuesta) if isinstance(respuesta, list) else respuesta
+
+
+def _valor_esquema(esquema: Dict, texto: str):
+    """Valor que cumple un JSON schema: strings obligatorios con el texto, opcionales en null."""
+    tipos = esquema.get("type")
+    tipos = tipos if isinstance(tipos, list) else [tipos]
+    if "object" in tipos:
+        return {clave: _valor_esquema(sub, texto) for clave, sub in esquema.get("properties", {}).items()}
+    if "null" in tipos:
+        return None
+    if "string" in tipos:
+        return texto
+    if "boolean" in tipos:
+        return False
+    if "integer" in tipos or "number" in tipos:
+        return 0
+    if "array" in tipos:
+        return []
+    return None
+
+
+def _contenido(cuerpo: Dict, regla: Dict) -> str:
+    """Contenido de la respuesta según el response_format pedido."""
+    texto = _texto_regla(regla)
+    formato = (cuerpo.get("response_format") or {}).get("type")
+    if formato == "json_object":
+        return json.dumps(regla.get("datos", {}), ensure_ascii=False)
+    if formato == "json_schema":
+        esquema = cuerpo["response_format"].get("json_schema", {}).get("schema", {})
+        valor = _valor_esquema(esquema, texto)
+        if isinstance(valor, dict) and isinstance(valor.get("datos"), dict):
+            valor["datos"].update(regla.get("datos", {}))
+        return json.dumps(valor, ensure_ascii=False)
+    return texto
+
+
+def _llamada_herramienta(cuerpo: Dict, regla: Dict) -> Optional[Dict]:
+    """tool_call guionado, si la regla lo pide y el modelo todavía no recibió resultados."""
+    herramienta = regla.get("herramienta")
+    if not herramienta or not cuerpo.get("tools") or cuerpo.get("tool_choice") == "none":
+        return None
+    if cuerpo["messages"] and cuerpo["messages"][-1].get("role") == "tool":
+        return None
+    nombres = {tool.get("function", {}).get("name") for tool in cuerpo["tools"]}
+    if herramienta["nombre"] not in nombres:
+        return None
+    return {
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "function",
+        "function": {
+            "name": herramienta["nombre"],
+            "arguments": json.dumps(herramienta.get("argumentos", {}), ensure_ascii=False)
+        }
+    }
+
+
+def _error_simulado() -> Optional[tuple]:
+    """Devuelve un 429 o 500 según la tasa de errores configurada."""
+    if random.random() >= _config["tasa_errores"]:
+        return None
+    _contar("errores")
+    estado = random.choice([429, 500])
+    mensaje = "Rate limit simulado" if estado == 429 else "Error interno simulado"
+    return jsonify({"error": {"message": mensaje, "type": "simulado", "code": estado}}), estado
+
+
+def _fragmentos(texto: str) -> Iterator[str]:
+    """Divide el texto en fragmentos de una palabra (con su espacio)."""
+    palabras = texto.split(" ")
+    for i, palabra in enumerate(palabras):
+        yield palabra if i == len(palabras) - 1 else palabra + " "
+
+
+def _chunk(id_respuesta: str, modelo: str, delta: Dict, finish_reason: Optional[str] = None) -> str:
+    """Evento SSE con un chunk de chat.completion."""
+    chunk = {
+        "id": id_respuesta,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": modelo,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+
+def _stream(cuerpo: Dict, id_respuesta: str, contenido: str, llamada: Optional[Dict], uso: Dict) -> Iterator[str]:
+    """Genera los eventos SSE de una respuesta con streaming."""
+    modelo = cuerpo.get("model", "simulado")
+    pausa = _config["ms_por_fragmento"] / 1000
+
+    time.sleep(_config["latencia"].muestrear())
+    yield _chunk(id_respuesta, modelo, {"role": "assistant", "content": ""})
+
+    if llamada is not None:
+        argumentos = llamada["function"]["arguments"]
+        mitad = len(argumentos) // 2
+        yield _chunk(id_respuesta, modelo, {"tool_calls": [{
+            "index": 0, "id": llamada["id"], "type": "function",
+            "function": {"name": llamada["function"]["name"], "arguments": argumentos[:mitad]}
+        }]})
+        yield _chunk(id_respuesta, modelo, {"tool_calls": [{"index": 0, "function": {"arguments": argumentos[mitad:]}}]})
+        yield _chunk(id_respuesta, modelo, {}, "tool_calls")
+    else:
+        for fragmento in _fragmentos(contenido):
+            if pausa:
+                time.sleep(pausa)
+            yield _chunk(id_respuesta, modelo, {"content": fragmento})
+        yield _chunk(id_respuesta, modelo, {}, "stop")
+
+    if (cuerpo.get("stream_options") or {}).get("include_usage"):
+        final = {
+            "id": id_respuesta,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": modelo,
+            "choices": [],
+            "usage": uso
+        }
+        yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+# ==================== ENDPOINTS ====================
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """Equivalente local de POST /v1/chat/completions."""
+    error = _error_simulado()
+    if error is not None:
+        return error
+
+    cuerpo = request.get_json(force=True)
+    mensajes = cuerpo.get("messages", [])
+    regla = _buscar_regla(mensajes)
+    llamada = _llamada_herramienta(cuerpo, regla)
+    contenido = "" if llamada is not None else _contenido(cuerpo, regla)
+    uso = _uso(mensajes, contenido or json.dumps(llamada or {}))
+    id_respuesta = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+    _contar("chat")
+    if llamada is not None:
+        _contar("herramientas")
+
+    if cuerpo.get("stream"):
+        _contar("stream")
+        return Response(_stream(cuerpo, id_respuesta, contenido, llamada, uso), mimetype="text/event-stream")
+
+    # Sin streaming, la latencia cubre la generación completa
+    palabras = len(contenido.split()) if contenido else 1
+    time.sleep(_config["latencia"].muestrear() + palabras * _config["ms_por_fragmento"] / 1000)
+
+    mensaje = {"role": "assistant", "content": contenido if llamada is None else None}
+    if llamada is not None:
+        mensaje["tool_calls"] = [llamada]
+    return jsonify({
+        "id": id_respuesta,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": cuerpo.get("model", "simulado"),
+        "choices": [{
+            "index": 0,
+            "message": mensaje,
+            "finish_reason": "tool_calls" if llamada is not None else "stop"
+        }],
+        "usage": uso
+    })
+
+
+@app.route('/v1/audio/transcriptions', methods=['POST'])
+def audio_transcriptions():
+    """Equivalente local de POST /v1/audio/transcriptions (devuelve el texto guionado)."""
+    error = _error_simulado()
+    if error is not None:
+        return error
+
+    _contar("transcripciones")
+    time.sleep(_config["latencia_transcripcion"].muestrear())
+    texto = _config["guion"].get("transcripcion", "")
+    if request.form.get("response_format") == "text":
+        return Response(texto, mimetype="text/plain")
+    return jsonify({"text": texto})
+
+
+@app.route('/media/<nombre>', methods=['GET'])
+def media(nombre: str):
+    """Audio de prueba para simular los MediaUrl de Twilio en las pruebas de carga."""
+    return Response(b"OggS" + bytes(1024), mimetype="audio/ogg")
+
+
+@app.route('/v1/models', methods=['GET'])
+def modelos():
+    """Lista mínima de modelos."""
+    return jsonify({"object": "list", "data": [{"id": "simulado", "object": "model", "owned_by": "local"}]})
+
+
+@app.route('/estadisticas', methods=['GET'])
+def estadisticas():
+    """Contadores de pedidos atendidos y configuración actual."""
+    with _lock:
+        datos = dict(_estadisticas)
+    datos["latencia"] = _config["latencia"].especificacion
+    datos["latencia_transcripcion"] = _config["latencia_transcripcion"].especificacion
+    datos["tasa_errores"] = _config["tasa_errores"]
+    return jsonify(datos)
+
+
+def main():
+    """Punto de entrada por línea de comandos."""
+    parser = argparse.ArgumentParser(description="Servidor local compatible con la API de OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=int(os.getenv("SIMULADO_PUERTO", "8089")))
+    parser.add_argument("--latencia", help="Latencia de chat, ej. lognormal:600:0.4, uniforme:200:800, fija:300")
+    parser.add_argument("--latencia-transcripcion", help="Latencia de transcripción (mismo formato)")
+    parser.add_argument("--ms-por-fragmento", type=float, help="Pausa entre fragmentos del streaming")
+    parser.add_argument("--tasa-errores", type=float, help="Proporción de pedidos que fallan con 429/500 (0 a 1)")
+    parser.add_argument("--guion", help="Archivo JSON con respuestas guionadas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    guion = None
+    if args.guion:
+        with open(args.guion, encoding="utf-8") as archivo:
+            guion = json.load(archivo)
+
+    try:
+        configurar(
+            latencia=args.latencia,
+            latencia_transcripcion=args.latencia_transcripcion,
+            ms_por_fragmento=args.ms_por_fragmento,
+            tasa_errores=args.tasa_errores,
+            guion=guion
+        )
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    logger.info(
+        f"Backend simulado en http://{args.host}:{args.puerto}/v1 "
+        f"(latencia {_config['latencia'].especificacion}, errores {_config['tasa_errores']:.0%})"
+    )
+    app.run(host=args.host, port=args.puerto, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Cache de Respuestas - Respuestas reutilizables para preguntas repetidas
+Guarda las respuestas del modelo a preguntas que no dependen del paciente
+(horarios, coberturas, cómo llegar) con vencimiento por tiempo y desalojo LRU.
+"""
+
+import os
+import sys
+import time
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import datos_clinica
+from config.texto import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+
+class CacheRespuestas:
+    """Cache LRU con TTL indexada por el mensaje normalizado."""
+
+    def __init__(self, max_entradas: int = None, ttl_segundos: float = None):
+        """
+        Inicializa la cache.
+
+        Args:
+            max_entradas: Cantidad máxima de respuestas guardadas (0 desactiva la cache)
+            ttl_segundos: Vigencia de cada respuesta en segundos
+        """
+        self.max_entradas = max_entradas if max_entradas is not None else int(os.getenv("CACHE_RESPUESTAS_MAX", "500"))
+        self.ttl_segundos = ttl_segundos if ttl_segundos is not None else float(os.getenv("CACHE_RESPUESTAS_TTL_SEGUNDOS", "3600"))
+
+        # clave -> (respuesta, vencimiento)
+        self._entradas: "OrderedDict[Tuple[str, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(mensaje: str) -> Tuple[str, int]:
+        """Clave de cache: mensaje normalizado + versión de los datos de la clínica."""
+        return normalizar_texto(mensaje), datos_clinica.VERSION_DATOS
+
+    def obtener(self, mensaje: str) -> Optional[str]:
+        """
+        Busca una respuesta vigente para el mensaje.
+
+        Args:
+            mensaje: Mensaje del usuario
+
+        Returns:
+            Respuesta guardada o None
+        """
+        if self.max_entradas <= 0:
+            return None
+
+        clave = self.clave(mensaje)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[1] < time.monotonic():
+                if entrada is not None:
+                    del self._entradas[clave]
+                self.fallos += 1
+                return None
+
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, mensaje: str, respuesta: str):
+        """
+        Guarda la respuesta, desalojando la menos usada si la cache está llena.
+
+        Args:
+            mensaje: Mensaje del usuario
+            respuesta: Respuesta generada por el modelo
+        """
+        if self.max_entradas <= 0:
+            return
+
+        clave = self.clave(mensaje)
+        with self._lock:
+            self._entradas[clave] = (respuesta, time.monotonic() + self.ttl_segundos)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        """Descarta todas las respuestas guardadas."""
+        with self._lock:
+            self._entradas.clear()
+
+    def memoria_bytes(self) -> int:
+        """Estima la memoria ocupada por las entradas (claves, respuestas y tuplas)."""
+        with self._lock:
+            total = sys.getsizeof(self._entradas)
+            for clave, entrada in self._entradas.items():
+                total += sys.getsizeof(clave) + sys.getsizeof(clave[0])
+                total += sys.getsizeof(entrada) + sys.getsizeof(entrada[0])
+            return total
+
+    def estadisticas(self) -> Dict:
+        """
+        Retorna el uso de la cache.
+
+        Returns:
+            Diccionario con entradas, aciertos, fallos, tasa_acierto y memoria_bytes
+        """
+        with self._lock:
+            entradas = len(self._entradas)
+            aciertos, fallos = self.aciertos, self.fallos
+        total = aciertos + fallos
+        return {
+            "entradas": entradas,
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "tasa_acierto": aciertos / total if total else 0.0,
+            "memoria_bytes": self.memoria_bytes()
+        }
+
+
+# Cache compartida por todas las sesiones del proceso
+cache_respuestas = CacheRespuestas()
@@ -101,12 +101,16 @@ class CallManager:
         if self._es_despedida(input_usuario):
             return self.finalizar_llamada(), False
 
-        # Procesar con el asistente
-        respuesta = self.assistant.procesar_mensaje(input_usuario)
-
-        # Reproducir respuesta si está habilitada la voz
         if self.use_voice and self.voice_handler:
-            self.voice_handler.text_to_speech(respuesta)
+            # Reproducir cada frase apenas está lista
+            frases = []
+            for frase in self.assistant.procesar_mensaje_stream(input_usuario):
+                self.voice_handler.text_to_speech(frase)
+                frases.append(frase)
+            respuesta = " ".join(frases)
+        else:
+            # Procesar con el asistente
+            respuesta = self.assistant.procesar_mensaje(input_usuario)
 
         self.message_count += 1
 
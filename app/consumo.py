@@ -0,0 +1,198 @@
+"""
+Consumo - Contabilidad de tokens, latencia y costo de las llamadas a OpenAI
+Registra el uso de cada llamada por turno y por sesión, y lo acumula para todo
+el proceso, así se pueden detectar los turnos que exceden los objetivos.
+"""
+
+import os
+import logging
+from threading import Lock
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Precios en USD por millón de tokens ("cacheada": entrada servida desde la
+# cache de prompts del proveedor)
+PRECIOS_MODELOS = {
+    "gpt-4o-mini": {"entrada": 0.15, "cacheada": 0.075, "salida": 0.60},
+    "gpt-4o": {"entrada": 2.50, "cacheada": 1.25, "salida": 10.00},
+    "gpt-4.1-mini": {"entrada": 0.40, "cacheada": 0.10, "salida": 1.60},
+    "gpt-4.1-nano": {"entrada": 0.10, "cacheada": 0.025, "salida": 0.40},
+    "gpt-4.1": {"entrada": 2.00, "cacheada": 0.50, "salida": 8.00},
+}
+
+# Objetivos por turno; los turnos que los superan se registran en el log
+SLO_LATENCIA_TURNO_MS = float(os.getenv("SLO_LATENCIA_TURNO_MS", "3000"))
+SLO_COSTO_TURNO_USD = float(os.getenv("SLO_COSTO_TURNO_USD", "0.002"))
+
+
+def _precio_modelo(modelo: str) -> Dict[str, float]:
+    """Busca el precio del modelo (acepta versiones con fecha, ej. gpt-4o-mini-2024-07-18)."""
+    for nombre in sorted(PRECIOS_MODELOS, key=len, reverse=True):
+        if modelo.startswith(nombre):
+            return PRECIOS_MODELOS[nombre]
+    return {"entrada": 0.0, "cacheada": 0.0, "salida": 0.0}
+
+
+def estimar_costo(modelo: str, tokens_entrada: int, tokens_salida: int, tokens_cacheados: int = 0) -> float:
+    """
+    Estima el costo de una llamada.
+
+    Args:
+        modelo: Nombre del modelo
+        tokens_entrada: Tokens del prompt (incluidos los cacheados)
+        tokens_salida: Tokens de la respuesta
+        tokens_cacheados: Tokens del prompt que se sirvieron desde la cache
+
+    Returns:
+        Costo estimado en USD
+    """
+    precio = _precio_modelo(modelo)
+    tokens_cacheados = min(tokens_cacheados, tokens_entrada)
+    return (
+        (tokens_entrada - tokens_cacheados) * precio["entrada"]
+        + tokens_cacheados * precio["cacheada"]
+        + tokens_salida * precio["salida"]
+    ) / 1_000_000
+
+
+def _tokens_cacheados(usage) -> int:
+    """Tokens del prompt servidos desde la cache (usage.prompt_tokens_details.cached_tokens)."""
+    detalles = getattr(usage, "prompt_tokens_details", None)
+    return getattr(detalles, "cached_tokens", 0) or 0
+
+
+def _registro_vacio() -> Dict:
+    """Acumulador vacío de consumo."""
+    return {
+        "llamadas": 0,
+        "tokens_entrada": 0,
+        "tokens_cacheados": 0,
+        "tokens_salida": 0,
+        "latencia_modelo_ms": 0.0,
+        "costo_usd": 0.0,
+        "etapas": {}
+    }
+
+
+_CAMPOS = ("llamadas", "tokens_entrada", "tokens_cacheados", "tokens_salida", "latencia_modelo_ms", "costo_usd")
+
+
+def _acumular(registro: Dict, etapa: str, valores: tuple):
+    """Suma una llamada a un acumulador (total y por etapa); valores sigue el orden de _CAMPOS."""
+    por_etapa = registro["etapas"].setdefault(etapa, {campo: 0 for campo in _CAMPOS})
+    for campo, valor in zip(_CAMPOS, valores):
+        registro[campo] += valor
+        por_etapa[campo] += valor
+
+
+def _copiar(registro: Dict) -> Dict:
+    """Copia un acumulador (incluidas las etapas)."""
+    copia = dict(registro)
+    copia["etapas"] = {etapa: dict(valores) for etapa, valores in registro["etapas"].items()}
+    return copia
+
+
+# ==================== ACUMULADO DEL PROCESO ====================
+
+_consumo_global = _registro_vacio()
+_lock_global = Lock()
+
+
+def obtener_consumo_global() -> Dict:
+    """Retorna el consumo acumulado de todas las sesiones del proceso."""
+    with _lock_global:
+        return _copiar(_consumo_global)
+
+
+# ==================== CONSUMO POR SESIÓN ====================
+
+class RegistroConsumo:
+    """
+    Acumula el consumo de una sesión.
+
+    Guarda solo el turno en curso y el total de la sesión, así ocupa lo mismo
+    sin importar cuántos turnos dure la conversación.
+    """
+
+    __slots__ = ("_lock", "_turno", "_ultimo", "_total")
+
+    def __init__(self):
+        """Inicializa el registro vacío."""
+        self._lock = Lock()
+        self._turno = -1
+        self._ultimo = _registro_vacio()
+        self._total = _registro_vacio()
+
+    def nuevo_turno(self) -> int:
+        """
+        Abre el registro de un nuevo turno.
+
+        Returns:
+            Índice del turno (para asignarle llamadas que terminan más tarde)
+        """
+        with self._lock:
+            self._turno += 1
+            self._ultimo = _registro_vacio()
+            return self._turno
+
+    def registrar(self, turno: int, etapa: str, modelo: str, usage, latencia_ms: float):
+        """
+        Registra una llamada al modelo.
+
+        Args:
+            turno: Índice devuelto por nuevo_turno() (si ya no es el turno en
+                curso, la llamada solo suma al total de la sesión)
+            etapa: Etapa del turno ("extraccion", "respuesta", ...)
+            modelo: Modelo usado
+            usage: Objeto usage de la respuesta de OpenAI (puede ser None)
+            latencia_ms: Duración de la llamada en milisegundos
+        """
+        tokens_entrada = getattr(usage, "prompt_tokens", 0) or 0
+        tokens_salida = getattr(usage, "completion_tokens", 0) or 0
+        cacheados = _tokens_cacheados(usage)
+        costo = estimar_costo(modelo, tokens_entrada, tokens_salida, cacheados)
+        valores = (1, tokens_entrada, cacheados, tokens_salida, latencia_ms, costo)
+
+        with self._lock:
+            if turno == self._turno:
+                _acumular(self._ultimo, etapa, valores)
+            _acumular(self._total, etapa, valores)
+
+        with _lock_global:
+            _acumular(_consumo_global, etapa, valores)
+
+        logger.debug(
+            f"Consumo {etapa} ({modelo}): {tokens_entrada} entrada ({cacheados} cacheados), "
+            f"{tokens_salida} salida, {latencia_ms:.0f} ms, ${costo:.6f}"
+        )
+
+    def ultimo_turno(self, turno: int = None) -> Optional[Dict]:
+        """
+        Retorna el consumo del último turno.
+
+        Args:
+            turno: Índice devuelto por nuevo_turno(); si ya no es el turno en
+                curso retorna None (default: el turno en curso)
+        """
+        with self._lock:
+            if turno is not None and turno != self._turno:
+                return None
+            return _copiar(self._ultimo)
+
+    def total(self) -> Dict:
+        """Retorna el consumo acumulado de la sesión."""
+        with self._lock:
+            total = _copiar(self._total)
+            total["turnos"] = self._turno + 1
+        return total
+
+    def verificar_slo(self, turno: int, latencia_turno_ms: float):
+        """Registra en el log los turnos que superan los objetivos de latencia o costo."""
+        with self._lock:
+            costo = self._ultimo["costo_usd"] if turno == self._turno else 0.0
+        if latencia_turno_ms > SLO_LATENCIA_TURNO_MS or costo > SLO_COSTO_TURNO_USD:
+            logger.warning(
+                f"Turno fuera de objetivo: {latencia_turno_ms:.0f} ms "
+                f"(objetivo {SLO_LATENCIA_TURNO_MS:.0f}), ${costo:.6f} (objetivo ${SLO_COSTO_TURNO_USD})"
+            )
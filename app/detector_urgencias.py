@@ -0,0 +1,201 @@
+"""
+Detector de Urgencias - Detección local e instantánea de síntomas graves
+Evalúa cada mensaje con un léxico ponderado de síntomas, precompilado en un
+índice por primera palabra para recorrer el mensaje una sola vez, descartando los síntomas negados ("no tengo dolor de
+pecho"). Si el puntaje alcanza el umbral se activa el protocolo de urgencia sin
+esperar al modelo; los síntomas de una cláusula que cuenta un antecedente ("el
+año pasado tuve un infarto") no suman y dejan el caso como dudoso; la extracción con el modelo queda como verificación
+secundaria para los casos dudosos.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+
+# Puntaje a partir del cual el mensaje es una urgencia
+UMBRAL_URGENCIA = 1.0
+
+# Puntaje (o peso de un síntoma negado) a partir del cual el caso es dudoso y
+# se espera la extracción del modelo antes de responder
+UMBRAL_DUDA = 0.4
+
+# Palabras anteriores al síntoma donde se busca una negación
+VENTANA_NEGACION = 3
+
+NEGACIONES = {"no", "sin", "nunca", "ni", "tampoco", "jamas", "nada"}
+
+# Síntomas y su peso (sobre el texto normalizado; "*" acepta cualquier terminación)
+LEXICO_URGENCIAS: Dict[str, float] = {
+    # Cardiovasculares y respiratorios
+    "dolor de pecho": 1.0, "dolor en el pecho": 1.0, "me duele el pecho": 1.0,
+    "opresion en el pecho": 1.0, "presion en el pecho": 1.0, "infarto": 1.0,
+    "ataque cardiaco": 1.0, "ataque al corazon": 1.0,
+    "no puedo respirar": 1.0, "no puede respirar": 1.0, "me falta el aire": 1.0,
+    "le falta el aire": 1.0, "falta de aire": 0.8, "me ahogo": 1.0, "se ahoga": 1.0,
+    "se me cierra la garganta": 1.0, "anafila*": 1.0,
+    "palpitaciones": 0.5, "pecho": 0.5, "respirar": 0.4, "ahogo": 0.6,
+    "sudor frio": 0.7, "sudando frio": 0.7, "transpirando frio": 0.7,
+    # Neurológicos
+    "acv": 1.0, "derrame cerebral": 1.0, "convulsi*": 1.0,
+    "desmay*": 1.0, "perdi el conocimiento": 1.0, "perdio el conocimiento": 1.0,
+    "inconsciente": 1.0, "no reacciona": 1.0, "no puedo hablar": 1.0, "no puede hablar": 1.0,
+    "cara caida": 1.0, "se le cayo la cara": 1.0, "paralis*": 1.0, "no puedo mover": 0.8,
+    "no siento el brazo": 0.8, "no siento la pierna": 0.8, "entumec*": 0.4,
+    "hormigueo": 0.3, "vision borrosa": 0.4, "golpe en la cabeza": 0.8,
+    # Sangrado, traumatismos e intoxicaciones
+    "hemorragia": 1.0, "sangra mucho": 1.0, "sangrado abundante": 1.0, "mucha sangre": 1.0,
+    "sangr*": 0.5, "accidente": 0.6, "golpe fuerte": 0.6, "fractura": 0.5, "quebre": 0.5,
+    "quemadura grave": 1.0, "intoxicacion": 0.8, "sobredosis": 1.0, "envenen*": 1.0,
+    "me quiero matar": 1.0, "suicid*": 1.0, "quitarme la vida": 1.0,
+    # Generales
+    "emergencia": 0.7, "urgencia": 0.6, "urgente": 0.4, "grave": 0.4,
+    "dolor muy fuerte": 0.6, "dolor intenso": 0.5, "fiebre alta": 0.4,
+    "mareo*": 0.3, "vomit*": 0.3, "duele": 0.3, "dolor": 0.3,
+}
+
+# Modificadores que aumentan el puntaje si ya hay algún síntoma
+INTENSIFICADORES: Dict[str, float] = {
+    "mucho": 0.2, "muy fuerte": 0.3, "de repente": 0.3, "ahora mismo": 0.3,
+    "no para": 0.3, "cada vez peor": 0.3, "insoportable": 0.4,
+}
+
+# Indicios de que la cláusula cuenta un antecedente y no algo que pasa ahora
+# ("el año pasado tuve un infarto, necesito un control"): sus síntomas no
+# suman al puntaje y el caso queda dudoso para que decida el modelo. "Desde
+# hace dos meses" es un síntoma que sigue, no un antecedente
+_ANTECEDENTE = re.compile(
+    r"\b(?:tuve una?|tuvimos|el año pasado|(?<!desde )hace (?:\w+ )?(?:años?|mes(?:es)?)|"
+    r"de (?:chic|niñ)[oa]|control(?:es)?|chequeo|antecedentes?|historia clinica|me operaron)\b"
+)
+
+# Indicios de que la cláusula habla del presente aunque mencione un antecedente
+_PRESENTE = re.compile(r"\b(?:ahora|hoy|recien|de repente|en este momento)\b")
+
+# Separadores de cláusula: la negación no cruza comas, puntos ni un "pero"
+_SEPARADOR_CLAUSULAS = re.compile(r"[,.;:!?¡¿\n]+|\bpero\b")
+
+# Misma normalización que config.texto.normalizar_texto, con una tabla fija
+# de acentos en lugar de unicodedata para que cada evaluación tome microsegundos
+_SIN_ACENTOS = str.maketrans("áéíóúüàèìòù", "aeiouuaeiou")
+_PALABRA = re.compile(r"[a-z0-9ñ]+")
+
+
+# Letras iniciales con las que se indexan los términos con "*" (todos los
+# prefijos del léxico tienen al menos este largo)
+LARGO_CABEZA = 3
+
+
+def _indexar(lexico: Dict[str, float]) -> Tuple[Dict, Dict]:
+    """
+    Precompila el léxico para buscarlo palabra por palabra.
+
+    Returns:
+        Tupla (frases indexadas por su primera palabra, de la más larga a la
+        más corta; prefijos de los términos con "*" indexados por sus
+        primeras letras)
+    """
+    indice: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+    prefijos: Dict[str, List[Tuple[str, str]]] = {}
+    for termino in lexico:
+        if termino.endswith("*"):
+            prefijo = termino[:-1]
+            prefijos.setdefault(prefijo[:LARGO_CABEZA], []).append((prefijo, termino))
+        else:
+            palabras = tuple(termino.split())
+            indice.setdefault(palabras[0], []).append((palabras, termino))
+    for frases in indice.values():
+        frases.sort(key=lambda frase: len(frase[0]), reverse=True)
+    return indice, prefijos
+
+
+_INDICE_SINTOMAS, _PREFIJOS_SINTOMAS = _indexar(LEXICO_URGENCIAS)
+_INDICE_INTENSIFICADORES, _PREFIJOS_INTENSIFICADORES = _indexar(INTENSIFICADORES)
+
+
+def _buscar(tokens: List[str], indice: Dict, prefijos: Dict) -> List[Tuple[int, str]]:
+    """Retorna (posición, término) de cada término encontrado, tomando la frase más larga."""
+    encontrados = []
+    i = 0
+    while i < len(tokens):
+        largo = 1
+        termino = None
+        for palabras, candidato in indice.get(tokens[i], ()):
+            if tuple(tokens[i:i + len(palabras)]) == palabras:
+                termino, largo = candidato, len(palabras)
+                break
+        if termino is None:
+            for prefijo, candidato in prefijos.get(tokens[i][:LARGO_CABEZA], ()):
+                if tokens[i].startswith(prefijo):
+                    termino = candidato
+                    break
+        if termino is not None:
+            encontrados.append((i, termino))
+        i += largo
+    return encontrados
+
+
+class EvaluacionUrgencia(NamedTuple):
+    """Resultado de evaluar un mensaje."""
+
+    puntaje: float
+    terminos: Tuple[str, ...]
+    negados: Tuple[str, ...]
+    antecedentes: Tuple[str, ...] = ()
+
+    @property
+    def urgente(self) -> bool:
+        """El puntaje alcanza para activar el protocolo de urgencia sin el modelo."""
+        return self.puntaje >= UMBRAL_URGENCIA
+
+    @property
+    def dudosa(self) -> bool:
+        """Hay indicios (o síntomas relevantes negados) pero no alcanzan: conviene verificar con el modelo."""
+        if self.urgente:
+            return False
+        return self.puntaje >= UMBRAL_DUDA or any(
+            LEXICO_URGENCIAS[t] >= UMBRAL_DUDA for t in self.negados + self.antecedentes
+        )
+
+
+def _negado(tokens: List[str], posicion: int) -> bool:
+    """Indica si hay una negación en las palabras anteriores al síntoma."""
+    return any(token in NEGACIONES for token in tokens[max(posicion - VENTANA_NEGACION, 0):posicion])
+
+
+def evaluar_urgencia(mensaje: str) -> EvaluacionUrgencia:
+    """
+    Evalúa si un mensaje describe una urgencia médica.
+
+    Args:
+        mensaje: Mensaje del paciente
+
+    Returns:
+        EvaluacionUrgencia con el puntaje, los síntomas encontrados, los negados
+        y los contados como antecedentes
+    """
+    puntaje = 0.0
+    terminos: List[str] = []
+    negados: List[str] = []
+    antecedentes: List[str] = []
+
+    for clausula in _SEPARADOR_CLAUSULAS.split(mensaje.lower().translate(_SIN_ACENTOS)):
+        tokens = _PALABRA.findall(clausula)
+        if not tokens:
+            continue
+
+        sintomas = _buscar(tokens, _INDICE_SINTOMAS, _PREFIJOS_SINTOMAS)
+        antecedente = bool(sintomas) and _ANTECEDENTE.search(clausula) and not _PRESENTE.search(clausula)
+        for posicion, termino in sintomas:
+            if _negado(tokens, posicion):
+                negados.append(termino)
+            elif antecedente:
+                antecedentes.append(termino)
+            else:
+                terminos.append(termino)
+                puntaje += LEXICO_URGENCIAS[termino]
+
+        if terminos:
+            for _, termino in _buscar(tokens, _INDICE_INTENSIFICADORES, _PREFIJOS_INTENSIFICADORES):
+                puntaje += INTENSIFICADORES[termino]
+
+    return EvaluacionUrgencia(round(puntaje, 2), tuple(terminos), tuple(negados), tuple(antecedentes))
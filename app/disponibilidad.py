@@ -0,0 +1,351 @@
+"""
+Disponibilidad - Turnos libres calculados con mapas de bits
+Convierte los días y horarios de atención de cada médico (ESPECIALIDADES) en
+una plantilla semanal de bits: un entero por día de la semana con un bit por
+turno de DURACION_TURNO_MINUTOS. Los turnos ocupados de cada médico y día son
+otro entero, así que los libres de un día son `plantilla & ~ocupados` y buscar
+los próximos turnos de una especialidad recorre enteros en vez de filas. Cada
+reserva o cancelación actualiza un bit.
+"""
+
+import re
+import time
+from datetime import date, datetime
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from config.texto import normalizar_texto
+
+# Días de la semana normalizados, en el orden de date.weekday()
+DIAS_SEMANA = ("lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo")
+
+MINUTOS_DIA = 24 * 60
+
+# "8:00 a 13:00", "9 a 14.30", "8:00 a 12:00 y 14:00 a 18:00"
+_PATRON_RANGO = re.compile(r"(\d{1,2})(?:[:.](\d{2}))?\s*(?:a|-)\s*(\d{1,2})(?:[:.](\d{2}))?")
+
+
+def rangos_horario(horario: str) -> List[Tuple[int, int]]:
+    """
+    Convierte un horario de atención en rangos de minutos desde la medianoche.
+
+    Args:
+        horario: Texto como "8:00 a 13:00" (admite varios rangos)
+
+    Returns:
+        Lista de tuplas (inicio, fin) en minutos
+
+    Raises:
+        ValueError: Si el horario no tiene ningún rango reconocible
+    """
+    rangos = [
+        (int(h1) * 60 + int(m1 or 0), int(h2) * 60 + int(m2 or 0))
+        for h1, m1, h2, m2 in _PATRON_RANGO.findall(horario)
+    ]
+    if not rangos:
+        raise ValueError(f"Horario no válido: {horario!r}")
+    return rangos
+
+
+def dias_de_atencion(dias: Iterable[str]) -> Tuple[int, ...]:
+    """Índices de date.weekday() de los días de atención ("Miércoles" -> 2)."""
+    return tuple(DIAS_SEMANA.index(normalizar_texto(dia)) for dia in dias)
+
+
+def _bits(mascara: int) -> Iterator[int]:
+    """Posiciones de los bits encendidos, de menor a mayor."""
+    while mascara:
+        menor = mascara & -mascara
+        yield menor.bit_length() - 1
+        mascara ^= menor
+
+
+class Hueco(NamedTuple):
+    """Un turno libre."""
+
+    fecha: str
+    hora: str
+    medico: str
+    especialidad: str
+
+
+class MotorDisponibilidad:
+    """Plantillas semanales y turnos ocupados por médico, como enteros de bits."""
+
+    def __init__(self, especialidades: Dict[str, Dict], duracion: int = 30, feriados: Iterable[str] = ()):
+        """
+        Arma las plantillas semanales.
+
+        Args:
+            especialidades: Especialidades con sus médicos ("dias" y "horario"),
+                con el formato de ESPECIALIDADES
+            duracion: Minutos de cada turno
+            feriados: Fechas ISO en las que no se atiende
+        """
+        if MINUTOS_DIA % duracion:
+            raise ValueError(f"La duración del turno debe dividir el día: {duracion}")
+        self.duracion = duracion
+        self.turnos_por_dia = MINUTOS_DIA // duracion
+        self._mascara_dia = (1 << self.turnos_por_dia) - 1
+        self._feriados: Set[int] = {date.fromisoformat(f).toordinal() for f in feriados}
+
+        self._medicos: List[Tuple[str, str]] = []
+        self._indice: Dict[str, int] = {}
+        self._por_especialidad: Dict[str, List[int]] = {}
+        # Plantilla de cada médico por día de la semana (7 enteros de turnos_por_dia bits)
+        self._plantillas: List[Tuple[int, ...]] = []
+        for clave, especialidad in especialidades.items():
+            for medico in especialidad["medicos"]:
+                semanal = 0
+                for dia in dias_de_atencion(medico["dias"]):
+                    for inicio, fin in rangos_horario(medico["horario"]):
+                        # Turnos de la grilla que empiezan en el rango y terminan antes del fin
+                        primero = -(-inicio // duracion)
+                        ultimo = (fin - duracion) // duracion
+                        if ultimo >= primero:
+                            tramo = ((1 << (ultimo - primero + 1)) - 1) << primero
+                            semanal |= tramo << (dia * self.turnos_por_dia)
+                indice = len(self._medicos)
+                self._medicos.append((clave, medico["nombre"]))
+                self._indice[medico["nombre"]] = indice
+                self._por_especialidad.setdefault(clave, []).append(indice)
+                self._plantillas.append(tuple(
+                    (semanal >> (dia * self.turnos_por_dia)) & self._mascara_dia for dia in range(7)
+                ))
+        self._todos = list(range(len(self._medicos)))
+
+        # (médico, día ordinal) -> bits de turnos confirmados
+        self._ocupados: Dict[Tuple[int, int], int] = {}
+        # (médico, día ordinal) -> {bit: vencimiento} de las reservas sin confirmar
+        self._reservas: Dict[Tuple[int, int], Dict[int, float]] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._medicos)
+
+    # ==================== CONVERSIONES ====================
+
+    def hora(self, turno: int) -> str:
+        """Hora "HH:MM" del turno de la grilla."""
+        minutos = turno * self.duracion
+        return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+    def turno(self, hora: str) -> int:
+        """Turno de la grilla que empieza a la hora "HH:MM"."""
+        horas, minutos = hora.split(":")
+        return (int(horas) * 60 + int(minutos)) // self.duracion
+
+    def _plantilla(self, medico: int, dia: int) -> int:
+        """Turnos de atención del médico en el día ordinal (ninguno si es feriado)."""
+        if dia in self._feriados:
+            return 0
+        # El día ordinal 1 (1/1/0001) fue lunes
+        return self._plantillas[medico][(dia - 1) % 7]
+
+    def _tomados(self, clave: Tuple[int, int], ahora: float) -> int:
+        """Bits confirmados más las reservas vigentes."""
+        tomados = self._ocupados.get(clave, 0)
+        reservas = self._reservas.get(clave)
+        if reservas:
+            for bit, vence in list(reservas.items()):
+                if vence > ahora:
+                    tomados |= 1 << bit
+        return tomados
+
+    # ==================== ACTUALIZACIONES ====================
+
+    def ocupar(self, medico: str, fecha: str, hora: str, vence: float = None):
+        """
+        Marca un turno como tomado.
+
+        Args:
+            medico: Nombre del médico
+            fecha: Fecha ISO
+            hora: Hora "HH:MM"
+            vence: Vencimiento (epoch) de una reserva sin confirmar; None si está confirmado
+        """
+        indice = self._indice.get(medico)
+        if indice is None:
+            return
+        clave = (indice, date.fromisoformat(fecha).toordinal())
+        bit = self.turno(hora)
+        with self._lock:
+            reservas = self._reservas.get(clave)
+            if reservas is not None:
+                reservas.pop(bit, None)
+                if vence is None:
+                    # Se aprovecha para olvidar las reservas vencidas del mismo día
+                    for otro in [b for b, v in reservas.items() if v <= time.time()]:
+                        del reservas[otro]
+                if not reservas:
+                    del self._reservas[clave]
+            if vence is None:
+                self._ocupados[clave] = self._ocupados.get(clave, 0) | (1 << bit)
+            else:
+                self._reservas.setdefault(clave, {})[bit] = vence
+
+    def liberar(self, medico: str, fecha: str, hora: str):
+        """Marca un turno como libre (cancelación o reserva liberada)."""
+        indice = self._indice.get(medico)
+        if indice is None:
+            return
+        clave = (indice, date.fromisoformat(fecha).toordinal())
+        bit = self.turno(hora)
+        with self._lock:
+            ocupados = self._ocupados.get(clave, 0) & ~(1 << bit)
+            if ocupados:
+                self._ocupados[clave] = ocupados
+            else:
+                self._ocupados.pop(clave, None)
+            reservas = self._reservas.get(clave)
+            if reservas is not None:
+                reservas.pop(bit, None)
+                if not reservas:
+                    del self._reservas[clave]
+
+    def reemplazar_dia(self, fecha: str, tomados: Iterable[Tuple[str, str, Optional[float]]]):
+        """
+        Reemplaza los turnos tomados de un día (por ejemplo, al releerlos de la agenda).
+
+        Args:
+            fecha: Fecha ISO
+            tomados: Tuplas (medico, hora, vencimiento o None si está confirmado)
+        """
+        dia = date.fromisoformat(fecha).toordinal()
+        ocupados: Dict[Tuple[int, int], int] = {}
+        reservas: Dict[Tuple[int, int], Dict[int, float]] = {}
+        for medico, hora, vence in tomados:
+            indice = self._indice.get(medico)
+            if indice is None:
+                continue
+            clave = (indice, dia)
+            if vence is None:
+                ocupados[clave] = ocupados.get(clave, 0) | (1 << self.turno(hora))
+            else:
+                reservas.setdefault(clave, {})[self.turno(hora)] = vence
+        with self._lock:
+            for clave in [c for c in self._ocupados if c[1] == dia]:
+                del self._ocupados[clave]
+            for clave in [c for c in self._reservas if c[1] == dia]:
+                del self._reservas[clave]
+            self._ocupados.update(ocupados)
+            self._reservas.update(reservas)
+
+    # ==================== CONSULTAS ====================
+
+    def proximo_vencimiento(self, ahora: float = None) -> Optional[float]:
+        """Momento (time.time()) en que vence la próxima reserva vigente, o None si no hay."""
+        ahora = ahora if ahora is not None else time.time()
+        with self._lock:
+            return min(
+                (vence for reservas in self._reservas.values() for vence in reservas.values() if vence > ahora),
+                default=None
+            )
+
+    def _medicos_de(self, especialidad: str = None, medico: str = None) -> List[int]:
+        if medico is not None:
+            indice = self._indice.get(medico)
+            return [indice] if indice is not None else []
+        if especialidad is not None:
+            return self._por_especialidad.get(especialidad, [])
+        return self._todos
+
+    def _libres_dia(self, medicos: List[int], dia: int, desde: int, ahora: float) -> Iterator[Hueco]:
+        """Turnos libres de un día ordenados por hora (y por médico dentro de la misma hora)."""
+        libres = []
+        union = 0
+        for indice in medicos:
+            mascara = self._plantilla(indice, dia)
+            if not mascara:
+                continue
+            mascara &= ~self._tomados((indice, dia), ahora) & ~((1 << desde) - 1)
+            if mascara:
+                libres.append((indice, mascara))
+                union |= mascara
+        if not union:
+            return
+        fecha = date.fromordinal(dia).isoformat()
+        for bit in _bits(union):
+            hora = self.hora(bit)
+            for indice, mascara in libres:
+                if mascara >> bit & 1:
+                    especialidad, nombre = self._medicos[indice]
+                    yield Hueco(fecha, hora, nombre, especialidad)
+
+    def atiende(self, fecha: str, especialidad: str = None, medico: str = None) -> bool:
+        """
+        Indica si hay atención el día según las plantillas, sin mirar lo ocupado.
+
+        Args:
+            fecha: Fecha ISO
+            especialidad: Clave de ESPECIALIDADES (None: cualquiera, o sea si la clínica abre)
+            medico: Nombre del médico (None: cualquiera)
+
+        Returns:
+            False si es feriado o ningún médico atiende ese día de la semana
+        """
+        dia = date.fromisoformat(fecha).toordinal()
+        return any(self._plantilla(indice, dia) for indice in self._medicos_de(especialidad, medico))
+
+    def libres(self, fecha: str, especialidad: str = None, medico: str = None, desde_hora: str = None) -> List[Hueco]:
+        """
+        Turnos libres de un día.
+
+        Args:
+            fecha: Fecha ISO
+            especialidad: Clave de ESPECIALIDADES (None: todas)
+            medico: Nombre del médico (None: todos)
+            desde_hora: Solo turnos posteriores a esta hora ("HH:MM")
+
+        Returns:
+            Lista de Hueco ordenada por hora
+        """
+        desde = self.turno(desde_hora) + 1 if desde_hora else 0
+        dia = date.fromisoformat(fecha).toordinal()
+        return list(self._libres_dia(self._medicos_de(especialidad, medico), dia, desde, time.time()))
+
+    def proximos(self, especialidad: str = None, cantidad: int = 5, desde: datetime = None,
+                 dias: int = 90, medico: str = None) -> List[Hueco]:
+        """
+        Próximos turnos libres a partir de un momento, recorriendo semanas si hace falta.
+
+        Args:
+            especialidad: Clave de ESPECIALIDADES (None: todas)
+            cantidad: Cantidad de turnos
+            desde: Momento desde el que se buscan (default: ahora)
+            dias: Días hacia adelante en los que se busca
+            medico: Nombre del médico (None: todos)
+
+        Returns:
+            Lista de Hueco en orden cronológico (menos de `cantidad` si no alcanzan)
+        """
+        desde = desde or datetime.now()
+        medicos = self._medicos_de(especialidad, medico)
+        ahora = time.time()
+        primero = desde.date().toordinal()
+        # El primer día solo cuentan los turnos posteriores al momento pedido
+        desde_turno = (desde.hour * 60 + desde.minute) // self.duracion + 1
+
+        resultado: List[Hueco] = []
+        for dia in range(primero, primero + dias):
+            for hueco in self._libres_dia(medicos, dia, desde_turno if dia == primero else 0, ahora):
+                resultado.append(hueco)
+                if len(resultado) >= cantidad:
+                    return resultado
+        return resultado
+
+    def plantilla(self, desde: date, dias: int) -> Iterator[Tuple[str, str, str, str]]:
+        """
+        Todos los turnos de atención de un período, sin descontar los tomados.
+
+        Yields:
+            Tuplas (especialidad, medico, fecha ISO, hora)
+        """
+        primero = desde.toordinal()
+        for indice, (especialidad, nombre) in enumerate(self._medicos):
+            for dia in range(primero, primero + dias):
+                mascara = self._plantilla(indice, dia)
+                if mascara:
+                    fecha = date.fromordinal(dia).isoformat()
+                    for bit in _bits(mascara):
+                        yield especialidad, nombre, fecha, self.hora(bit)
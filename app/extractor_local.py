@@ -0,0 +1,281 @@
+"""
+Extractor Local - Extracción determinística de datos del paciente
+Resuelve sin llamar a OpenAI los mensajes cortos y predecibles ("sí", "gracias",
+"tengo OSDE", "mi DNI es 12345678") y solo deriva al modelo los casos dudosos.
+"""
+
+import os
+import re
+import sys
+import logging
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import datos_clinica
+from config.texto import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== PATRONES ====================
+
+# DNI: 7 u 8 dígitos, con o sin puntos/espacios ("12.345.678", "12 345 678")
+PATRON_DNI = re.compile(r"\b(\d{1,2})[ .]?(\d{3})[ .]?(\d{3})\b")
+
+# Horarios sueltos ("a las 10", "14:30"); se consumen pero no se extraen
+PATRON_HORA = re.compile(r"\b\d{1,2}(?: \d{2})?\b")
+
+# Nombre dictado explícitamente (se busca sobre el texto original)
+PATRON_NOMBRE = re.compile(
+    r"(?:me llamo|mi nombre es)\s+([A-Za-zÁÉÍÓÚÜÑáéíóúüñ]+(?:\s+[A-Za-zÁÉÍÓÚÜÑáéíóúüñ]+){0,3})",
+    re.IGNORECASE
+)
+
+# Palabras que cortan la captura del nombre ("me llamo Ana y tengo OSDE")
+CORTES_NOMBRE = {"y", "e", "tengo", "con", "mi", "dni", "soy", "quiero", "necesito", "para", "por", "que"}
+
+FRANJAS_HORARIAS = ["por la mañana", "a la mañana", "de la mañana", "por la tarde", "a la tarde", "de la tarde"]
+
+FECHAS = [
+    ("pasado mañana", "pasado mañana"),
+    ("mañana", "mañana"),
+    ("hoy", "hoy"),
+]
+
+DIAS_SEMANA = {
+    "lunes": "lunes",
+    "martes": "martes",
+    "miercoles": "miércoles",
+    "jueves": "jueves",
+    "viernes": "viernes",
+    "sabado": "sábado",
+}
+
+SIN_COBERTURA = ["no tengo obra social", "no tengo prepaga", "no tengo cobertura", "sin obra social", "particular"]
+
+TIPOS_CONSULTA = {
+    "turno": "turno",
+    "resultado": "resultados",
+    "resultados": "resultados",
+    "certificado": "certificado",
+    "receta": "certificado",
+}
+
+ALIAS_ESPECIALIDADES = {
+    "pediatra": "pediatria",
+    "clinico": "clinica_medica",
+    "medico clinico": "clinica_medica",
+    "oculista": "oftalmologia",
+}
+
+# Palabras que no aportan datos: si el mensaje solo contiene esto (además de lo
+# extraído), la pasada local es concluyente
+PALABRAS_RELLENO = {
+    "si", "no", "ok", "okey", "dale", "bueno", "buenas", "buenos", "buen", "dia", "dias",
+    "tardes", "noches", "hola", "gracias", "muchas", "perfecto", "genial", "listo", "claro",
+    "correcto", "exacto", "de", "acuerdo", "esta", "bien", "me", "mi", "es", "el", "la",
+    "las", "los", "lo", "un", "una", "a", "y", "o", "con", "para", "por", "favor", "en",
+    "tengo", "quiero", "necesito", "queria", "quisiera", "sacar", "pedir", "que", "soy",
+    "afiliado", "afiliada", "obra", "social", "prepaga", "dni", "documento", "numero", "nro",
+    "viene", "sirve", "puede", "ser", "seria", "hora", "horas", "hs", "dr", "dra", "doctor",
+    "doctora", "medico", "medica", "consulta", "del", "al", "vale", "eh", "este", "ah",
+    "senor", "señor", "señora", "sra", "sr", "tambien", "entonces", "ahi", "va",
+    "otro", "otra", "ahora",
+}
+
+
+# ==================== ÍNDICES (se construyen una sola vez) ====================
+
+# Cada índice guarda la versión de datos con la que se construyó
+_indice_coberturas: Optional[Tuple[int, List[Tuple[re.Pattern, str]]]] = None
+_indice_especialidades: Optional[Tuple[int, List[Tuple[re.Pattern, str]]]] = None
+
+
+def _patron_palabra(texto_normalizado: str) -> re.Pattern:
+    """Compila un patrón que busca el texto como palabra completa."""
+    return re.compile(rf"\b{re.escape(texto_normalizado)}\b")
+
+
+def _obtener_indice_coberturas() -> List[Tuple[re.Pattern, str]]:
+    """Retorna los patrones de coberturas (nombre completo, primera palabra y alias)."""
+    global _indice_coberturas
+    if _indice_coberturas is None or _indice_coberturas[0] != datos_clinica.VERSION_DATOS:
+        indice = []
+        for nombre in datos_clinica.OBRAS_SOCIALES + datos_clinica.PREPAGAS:
+            normalizado = normalizar_texto(nombre)
+            indice.append((_patron_palabra(normalizado), nombre))
+            primera = normalizado.split()[0]
+            if primera != normalizado and len(primera) >= 4:
+                indice.append((_patron_palabra(primera), nombre))
+        for nombre, alias in datos_clinica.ALIAS_COBERTURAS.items():
+            for forma in alias:
+                indice.append((_patron_palabra(normalizar_texto(forma)), nombre))
+        # Los nombres más largos primero ("osdepym" antes que "osde")
+        indice.sort(key=lambda item: len(item[0].pattern), reverse=True)
+        _indice_coberturas = (datos_clinica.VERSION_DATOS, indice)
+    return _indice_coberturas[1]
+
+
+def _obtener_indice_especialidades() -> List[Tuple[re.Pattern, str]]:
+    """Retorna los patrones de especialidades (nombre, clave y profesional)."""
+    global _indice_especialidades
+    if _indice_especialidades is None or _indice_especialidades[0] != datos_clinica.VERSION_DATOS:
+        alias = dict(ALIAS_ESPECIALIDADES)
+        for key, esp in datos_clinica.ESPECIALIDADES.items():
+            nombre = normalizar_texto(esp["nombre"])
+            alias[nombre] = key
+            alias[key.replace("_", " ")] = key
+            # "cardiologia" -> "cardiologo" / "cardiologa"
+            if nombre.endswith("logia"):
+                alias[nombre[:-2] + "o"] = key
+                alias[nombre[:-2] + "a"] = key
+        indice = [(_patron_palabra(texto), key) for texto, key in alias.items()]
+        indice.sort(key=lambda item: len(item[0].pattern), reverse=True)
+        _indice_especialidades = (datos_clinica.VERSION_DATOS, indice)
+    return _indice_especialidades[1]
+
+
+def buscar_especialidad(texto: str) -> Optional[str]:
+    """
+    Busca una especialidad de la clínica en un texto libre.
+
+    Args:
+        texto: Texto a analizar (ej. "cardiólogo", "clínica médica")
+
+    Returns:
+        Clave de la especialidad en ESPECIALIDADES o None
+    """
+    normalizado = f" {normalizar_texto(texto)} "
+    for patron, especialidad in _obtener_indice_especialidades():
+        if patron.search(normalizado):
+            return especialidad
+    return None
+
+
+# ==================== ESTADÍSTICAS ====================
+
+_estadisticas = {"mensajes": 0, "resueltos_localmente": 0}
+_lock_estadisticas = Lock()
+
+
+def obtener_estadisticas() -> Dict:
+    """
+    Retorna el uso del extractor local en este proceso.
+
+    Returns:
+        Diccionario con mensajes, resueltos_localmente y tasa_acierto
+    """
+    with _lock_estadisticas:
+        mensajes = _estadisticas["mensajes"]
+        resueltos = _estadisticas["resueltos_localmente"]
+    return {
+        "mensajes": mensajes,
+        "resueltos_localmente": resueltos,
+        "tasa_acierto": resueltos / mensajes if mensajes else 0.0
+    }
+
+
+def reiniciar_estadisticas():
+    """Pone en cero los contadores del extractor local."""
+    with _lock_estadisticas:
+        _estadisticas["mensajes"] = 0
+        _estadisticas["resueltos_localmente"] = 0
+
+
+# ==================== EXTRACCIÓN ====================
+
+def _consumir(texto: str, patron: re.Pattern) -> Tuple[Optional[re.Match], str]:
+    """Busca el patrón y lo elimina del texto restante."""
+    match = patron.search(texto)
+    if match:
+        texto = texto[:match.start()] + " " + texto[match.end():]
+    return match, texto
+
+
+def _extraer_nombre(mensaje: str) -> Optional[str]:
+    """Extrae el nombre cuando el paciente lo dicta explícitamente."""
+    match = PATRON_NOMBRE.search(mensaje)
+    if not match:
+        return None
+    palabras = []
+    for palabra in match.group(1).split():
+        if palabra.lower() in CORTES_NOMBRE:
+            break
+        palabras.append(palabra.capitalize())
+    return " ".join(palabras) or None
+
+
+def extraer_datos(mensaje: str) -> Tuple[Dict, bool]:
+    """
+    Extrae datos del paciente con reglas locales.
+
+    Args:
+        mensaje: Mensaje del usuario
+
+    Returns:
+        Tupla (datos: dict con los campos encontrados,
+               concluyente: True si no hace falta consultar al modelo)
+    """
+    datos = {}
+    restante = f" {normalizar_texto(mensaje)} "
+
+    nombre = _extraer_nombre(mensaje)
+    if nombre:
+        datos["nombre_completo"] = nombre
+        restante = restante.replace(" me llamo ", " ").replace(" mi nombre es ", " ")
+        for parte in normalizar_texto(nombre).split():
+            _, restante = _consumir(restante, _patron_palabra(parte))
+
+    match, restante = _consumir(restante, PATRON_DNI)
+    if match:
+        datos["dni"] = "".join(match.groups())
+
+    for frase in SIN_COBERTURA:
+        match, restante = _consumir(restante, _patron_palabra(frase))
+        if match:
+            datos["cobertura"] = "particular"
+            break
+    if "cobertura" not in datos:
+        for patron, cobertura in _obtener_indice_coberturas():
+            match, restante = _consumir(restante, patron)
+            if match:
+                datos["cobertura"] = cobertura
+                break
+
+    for patron, especialidad in _obtener_indice_especialidades():
+        match, restante = _consumir(restante, patron)
+        if match:
+            datos["especialidad"] = especialidad
+            break
+
+    for franja in FRANJAS_HORARIAS:
+        _, restante = _consumir(restante, _patron_palabra(franja))
+    for palabra, fecha in FECHAS:
+        match, restante = _consumir(restante, _patron_palabra(palabra))
+        if match:
+            datos["fecha_preferida"] = fecha
+            break
+    if "fecha_preferida" not in datos:
+        for palabra, dia in DIAS_SEMANA.items():
+            match, restante = _consumir(restante, _patron_palabra(palabra))
+            if match:
+                datos["fecha_preferida"] = dia
+                break
+
+    for palabra, tipo in TIPOS_CONSULTA.items():
+        match, restante = _consumir(restante, _patron_palabra(palabra))
+        if match and "tipo_consulta" not in datos:
+            datos["tipo_consulta"] = tipo
+
+    restante = PATRON_HORA.sub(" ", restante)
+    concluyente = all(palabra in PALABRAS_RELLENO for palabra in restante.split())
+
+    with _lock_estadisticas:
+        _estadisticas["mensajes"] += 1
+        if concluyente:
+            _estadisticas["resueltos_localmente"] += 1
+
+    logger.debug(f"Extracción local: {datos} (concluyente: {concluyente})")
+
+    return datos, concluyente
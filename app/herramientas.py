@@ -0,0 +1,256 @@
+"""
+Herramientas - Funciones de la clínica expuestas al modelo como tools
+En lugar de pegar médicos, coberturas y turnos en el prompt del sistema, el
+modelo los consulta cuando los necesita y el asistente ejecuta la función
+localmente.
+"""
+
+import os
+import sys
+import json
+import logging
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import datos_clinica
+from app import extractor_local
+
+logger = logging.getLogger(__name__)
+
+# Cantidad máxima de idas y vueltas con herramientas en un mismo turno
+MAX_RONDAS_HERRAMIENTAS = 4
+
+# Turnos que puede pedir el modelo en una consulta de próximos turnos
+MAX_PROXIMOS_TURNOS = 10
+
+# Definiciones en el formato de tools de chat.completions
+HERRAMIENTAS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "verificar_cobertura",
+            "description": "Verifica si la clínica trabaja con una obra social o prepaga.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "cobertura": {"type": "string", "description": "Nombre de la obra social o prepaga"}
+                },
+                "required": ["cobertura"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "consultar_especialidad",
+            "description": "Lista los médicos de una especialidad con sus días y horarios de atención.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "especialidad": {"type": "string", "description": "Especialidad o profesional (ej. cardiología, pediatra)"}
+                },
+                "required": ["especialidad"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "obtener_turnos_disponibles",
+            "description": "Retorna la fecha y los horarios libres de un día, opcionalmente de una especialidad.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "cuando": {"type": "string", "enum": ["hoy", "manana", "pasado_manana"]},
+                    "especialidad": {"type": "string", "description": "Especialidad pedida por el paciente, si ya la dijo"}
+                },
+                "required": ["cuando"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "proximos_turnos",
+            "description": "Retorna los próximos turnos libres (fecha, hora y médico) desde ahora, aunque sean de otras semanas.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "especialidad": {"type": "string", "description": "Especialidad pedida por el paciente"},
+                    "cantidad": {"type": "integer", "description": "Cantidad de turnos (máximo 10)"}
+                },
+                "required": ["especialidad"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "confirmar_turno",
+            "description": (
+                "Reserva el turno. Usar solo cuando el paciente aceptó fecha y hora "
+                "y ya se tienen su nombre y DNI."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "fecha": {"type": "string", "description": "Fecha en formato dd/mm/aaaa"},
+                    "hora": {"type": "string", "description": "Hora en formato HH:MM"},
+                    "especialidad": {"type": "string"},
+                    "medico": {"type": "string", "description": "Nombre del médico, si el paciente eligió uno"}
+                },
+                "required": ["fecha", "hora", "especialidad"]
+            }
+        }
+    }
+]
+
+
+# ==================== IMPLEMENTACIONES ====================
+
+def _verificar_cobertura(asistente, cobertura: str) -> Dict:
+    """Consulta la cobertura con el helper del asistente."""
+    acepta, mensaje = asistente.verificar_cobertura(cobertura)
+    return {"acepta": acepta, "mensaje": mensaje}
+
+
+def _consultar_especialidad(asistente, especialidad: str) -> Dict:
+    """Retorna los médicos de la especialidad pedida."""
+    clave = extractor_local.buscar_especialidad(especialidad)
+    if clave is None:
+        return {
+            "encontrada": False,
+            "especialidades_disponibles": datos_clinica.obtener_especialidades_disponibles()
+        }
+    return {
+        "encontrada": True,
+        "especialidad": datos_clinica.ESPECIALIDADES[clave]["nombre"],
+        "medicos": datos_clinica.obtener_medicos_por_especialidad(clave)
+    }
+
+
+def _obtener_turnos_disponibles(asistente, cuando: str, especialidad: str = None) -> Dict:
+    """Retorna los turnos libres del día pedido."""
+    turnos = asistente.obtener_turnos_disponibles(cuando, especialidad)
+    if turnos is None:
+        return {"error": f"Día no válido: {cuando}"}
+    resultado = {"fecha": turnos["fecha"], "disponibles": turnos["disponibles"]}
+    # Sin esto el modelo no distingue un día completo de uno en que no se atiende
+    if not turnos["abierto"]:
+        resultado["motivo"] = "La clínica no atiende ese día"
+    elif not turnos["atiende"]:
+        resultado["motivo"] = "La especialidad no atiende ese día"
+    return resultado
+
+
+def _proximos_turnos(asistente, especialidad: str, cantidad: int = 5) -> Dict:
+    """Retorna los próximos turnos libres de la especialidad."""
+    turnos = asistente.proximos_turnos(especialidad, max(1, min(int(cantidad), MAX_PROXIMOS_TURNOS)))
+    return {"turnos": turnos} if turnos else {"turnos": [], "mensaje": "No hay turnos libres en la agenda"}
+
+
+def _confirmar_turno(asistente, fecha: str, hora: str, especialidad: str, medico: str = None) -> Dict:
+    """Confirma el turno con el helper del asistente (falla si el horario ya no está libre)."""
+    mensaje = asistente.confirmar_turno(fecha, hora, especialidad, medico)
+    return {"confirmado": asistente.patient_data["turno_confirmado"] is not None, "mensaje": mensaje}
+
+
+# Herramientas que cambian la agenda o los datos del paciente: no se ejecutan
+# si el turno se abandonó por una urgencia (ver AIAssistant.turno_cancelado)
+HERRAMIENTAS_CON_EFECTOS = {"confirmar_turno"}
+
+_DESPACHO: Dict[str, Callable[..., Dict]] = {
+    "verificar_cobertura": _verificar_cobertura,
+    "consultar_especialidad": _consultar_especialidad,
+    "obtener_turnos_disponibles": _obtener_turnos_disponibles,
+    "proximos_turnos": _proximos_turnos,
+    "confirmar_turno": _confirmar_turno,
+}
+
+
+# ==================== DESPACHO ====================
+
+def ejecutar_herramienta(asistente, nombre: str, argumentos: str) -> str:
+    """
+    Ejecuta una herramienta pedida por el modelo.
+
+    Args:
+        asistente: Instancia de AIAssistant de la sesión
+        nombre: Nombre de la herramienta
+        argumentos: Argumentos en JSON, tal como los envía el modelo
+
+    Returns:
+        Resultado en JSON (con un campo "error" si no se pudo ejecutar)
+    """
+    funcion = _DESPACHO.get(nombre)
+    if funcion is None:
+        return json.dumps({"error": f"Herramienta desconocida: {nombre}"}, ensure_ascii=False)
+    if nombre in HERRAMIENTAS_CON_EFECTOS and asistente.turno_cancelado():
+        logger.warning(f"Herramienta {nombre} descartada: el turno se abandonó por una urgencia")
+        return json.dumps({"error": "Consulta interrumpida por una urgencia"}, ensure_ascii=False)
+
+    try:
+        parametros = json.loads(argumentos or "{}")
+        resultado = funcion(asistente, **parametros)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Argumentos inválidos para {nombre}: {e}")
+        resultado = {"error": "Argumentos inválidos"}
+
+    logger.info(f"Herramienta {nombre}({argumentos}) -> {resultado}")
+    return json.dumps(resultado, ensure_ascii=False)
+
+
+def llamadas_de_mensaje(mensaje) -> List[Dict]:
+    """Convierte los tool_calls de un mensaje del modelo en {"id", "name", "arguments"}."""
+    return [
+        {"id": llamada.id, "name": llamada.function.name, "arguments": llamada.function.arguments}
+        for llamada in getattr(mensaje, "tool_calls", None) or []
+    ]
+
+
+def acumular_llamada_stream(llamadas: Dict[int, Dict], parcial):
+    """
+    Une los fragmentos de un tool_call recibidos por stream.
+
+    Args:
+        llamadas: Llamadas acumuladas hasta ahora, por índice
+        parcial: Fragmento (delta.tool_calls[i]) recibido en el chunk
+    """
+    llamada = llamadas.setdefault(parcial.index, {"id": "", "name": "", "arguments": ""})
+    if parcial.id:
+        llamada["id"] = parcial.id
+    if parcial.function is not None:
+        llamada["name"] += parcial.function.name or ""
+        llamada["arguments"] += parcial.function.arguments or ""
+
+
+def mensajes_resultados(asistente, llamadas: List[Dict]) -> List[Dict]:
+    """
+    Ejecuta las llamadas a herramientas y arma los mensajes para devolverle al modelo.
+
+    Args:
+        asistente: Instancia de AIAssistant de la sesión
+        llamadas: Lista de {"id", "name", "arguments"}
+
+    Returns:
+        Mensaje del asistente con los tool_calls seguido de un mensaje "tool" por llamada
+    """
+    mensajes = [{
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": llamada["id"],
+                "type": "function",
+                "function": {"name": llamada["name"], "arguments": llamada["arguments"]}
+            }
+            for llamada in llamadas
+        ]
+    }]
+    for llamada in llamadas:
+        mensajes.append({
+            "role": "tool",
+            "tool_call_id": llamada["id"],
+            "content": ejecutar_herramienta(asistente, llamada["name"], llamada["arguments"])
+        })
+    return mensajes
@@ -0,0 +1,206 @@
+"""
+Historial - Gestión del historial que se envía al modelo
+Mantiene el prompt del sistema, los últimos turnos y los datos del paciente, y
+resume los turnos más viejos para que los tokens de entrada no crezcan sin límite.
+
+La ventana se arma de lo más estable a lo más variable (prompt del sistema,
+resumen, conversación y al final el contexto del turno) para que el prefijo se
+repita entre llamadas y aproveche la cache de prompts del proveedor.
+"""
+
+import os
+import json
+import logging
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    tiktoken = None
+
+from app.sesion import mensaje_para_api
+
+logger = logging.getLogger(__name__)
+
+# Largo máximo de cada mensaje dentro del resumen
+LARGO_LINEA_RESUMEN = 120
+
+# Cantidad máxima de líneas del resumen; las más viejas se descartan porque
+# los datos importantes ya viajan en patient_data
+MAX_LINEAS_RESUMEN = 20
+
+# Con un modelo de resumen, se condensan las líneas cuando llegan a esta cantidad
+LINEAS_PARA_CONDENSAR = 6
+
+_codificador = None
+
+
+def estimar_tokens(texto: str) -> int:
+    """
+    Estima la cantidad de tokens de un texto.
+
+    Usa tiktoken si está instalado; si no, aproxima 1 token cada 4 caracteres.
+    """
+    global _codificador
+    if TIKTOKEN_AVAILABLE:
+        if _codificador is None:
+            _codificador = tiktoken.get_encoding("o200k_base")
+        return len(_codificador.encode(texto))
+    return len(texto) // 4 + 1
+
+
+def tokens_mensajes(mensajes: List[Dict[str, str]]) -> int:
+    """Estima los tokens de una lista de mensajes (con 4 tokens de overhead c/u)."""
+    return sum(estimar_tokens(msg["content"]) + 4 for msg in mensajes)
+
+
+class GestorHistorial:
+    """Arma la ventana de mensajes que se envía al modelo en cada turno."""
+
+    def __init__(self, max_tokens: int = None, turnos_recientes: int = None):
+        """
+        Inicializa el gestor.
+
+        Args:
+            max_tokens: Presupuesto de tokens de la conversación (sin el prompt del sistema)
+            turnos_recientes: Cantidad de turnos (usuario + asistente) que nunca se resumen
+        """
+        self.max_tokens = max_tokens or int(os.getenv("HISTORIAL_MAX_TOKENS", "1500"))
+        self.turnos_recientes = turnos_recientes or int(os.getenv("HISTORIAL_TURNOS_RECIENTES", "4"))
+
+        # Resumen acumulado y cantidad de mensajes ya incorporados a él
+        self.resumen: List[str] = []
+        self.mensajes_resumidos = 0
+
+        # El resumen puede condensarse en segundo plano mientras se arma un turno
+        self._lock = Lock()
+        self._condensando = False
+
+    def reiniciar(self):
+        """Descarta el resumen acumulado (nueva conversación)."""
+        with self._lock:
+            self.resumen = []
+            self.mensajes_resumidos = 0
+
+    def requiere_condensar(self) -> bool:
+        """Indica si el resumen tiene suficientes líneas sueltas para condensarlas con un modelo."""
+        with self._lock:
+            return not self._condensando and len(self.resumen) >= LINEAS_PARA_CONDENSAR
+
+    def condensar(self, resumidor: Callable[[str], Optional[str]]):
+        """
+        Reemplaza las líneas del resumen por un texto condensado.
+
+        Pensado para correr en segundo plano: si mientras tanto se agregaron
+        líneas, se conservan a continuación del texto condensado.
+
+        Args:
+            resumidor: Función que recibe las líneas y devuelve el texto condensado (None si falla)
+        """
+        with self._lock:
+            if self._condensando:
+                return
+            self._condensando = True
+            lineas = list(self.resumen)
+
+        try:
+            texto = resumidor("\n".join(lineas))
+        finally:
+            with self._lock:
+                self._condensando = False
+
+        if not texto:
+            return
+        with self._lock:
+            # Si se reinició la conversación o se descartaron líneas, no aplica
+            if self.resumen[:len(lineas)] == lineas:
+                self.resumen = [f"- {' '.join(texto.split())}"] + self.resumen[len(lineas):]
+
+    def preparar(
+        self,
+        historial: List[Dict[str, str]],
+        patient_data: Dict,
+        contexto_turno: Optional[str] = None
+    ) -> Tuple[List[Dict[str, str]], Dict]:
+        """
+        Arma los mensajes a enviar respetando el presupuesto de tokens.
+
+        Args:
+            historial: Historial completo de la conversación
+            patient_data: Datos estructurados del paciente
+            contexto_turno: Datos variables del turno (fecha, hora, turnos libres)
+
+        Returns:
+            Tupla (mensajes para la API, métricas de tokens)
+        """
+        sistema = [msg for msg in historial if msg["role"] == "system"]
+        conversacion = [msg for msg in historial if msg["role"] != "system"]
+
+        with self._lock:
+            # Los últimos turnos siempre se envían completos
+            minimo_recientes = self.turnos_recientes * 2
+            pendientes = conversacion[self.mensajes_resumidos:]
+
+            while (
+                len(pendientes) > minimo_recientes
+                and tokens_mensajes(pendientes) > self.max_tokens
+            ):
+                self._resumir(pendientes[0])
+                pendientes = pendientes[1:]
+                self.mensajes_resumidos += 1
+
+            resumen = list(self.resumen)
+            mensajes_resumidos = self.mensajes_resumidos
+
+        mensajes = [mensaje_para_api(msg) for msg in sistema]
+        if resumen:
+            mensajes.append({
+                "role": "system",
+                "content": "RESUMEN DE LA CONVERSACIÓN PREVIA:\n" + "\n".join(resumen)
+            })
+
+        mensajes.extend(mensaje_para_api(msg) for msg in pendientes)
+
+        # Lo que cambia en cada turno va al final, justo antes del último
+        # mensaje del paciente, para no romper el prefijo cacheado
+        contexto = self._contexto_final(patient_data, contexto_turno)
+        if contexto is not None:
+            posicion = len(mensajes)
+            if pendientes and pendientes[-1]["role"] == "user":
+                posicion -= 1
+            mensajes.insert(posicion, contexto)
+
+        tokens_completo = tokens_mensajes(historial)
+        tokens_enviados = tokens_mensajes(mensajes)
+        metricas = {
+            "tokens_historial_completo": tokens_completo,
+            "tokens_enviados": tokens_enviados,
+            "tokens_ahorrados": max(tokens_completo - tokens_enviados, 0),
+            "mensajes_resumidos": mensajes_resumidos
+        }
+
+        return mensajes, metricas
+
+    @staticmethod
+    def _contexto_final(patient_data: Dict, contexto_turno: Optional[str]) -> Optional[Dict[str, str]]:
+        """Mensaje con el contexto del turno y los datos ya recolectados (None si no hay nada)."""
+        partes = [contexto_turno] if contexto_turno else []
+        datos_conocidos = {k: v for k, v in patient_data.items() if v not in (None, False)}
+        if datos_conocidos:
+            partes.append(f"DATOS YA RECOLECTADOS DEL PACIENTE: {json.dumps(datos_conocidos, ensure_ascii=False)}")
+        if not partes:
+            return None
+        return {"role": "system", "content": "\n\n".join(partes)}
+
+    def _resumir(self, mensaje: Dict[str, str]):
+        """Incorpora un mensaje al resumen en forma compacta (con el lock tomado)."""
+        rol = "Paciente" if mensaje["role"] == "user" else "Asistente"
+        contenido = " ".join(mensaje["content"].split())
+        if len(contenido) > LARGO_LINEA_RESUMEN:
+            contenido = contenido[:LARGO_LINEA_RESUMEN - 3] + "..."
+        self.resumen.append(f"- {rol}: {contenido}")
+        if len(self.resumen) > MAX_LINEAS_RESUMEN:
+            self.resumen.pop(0)
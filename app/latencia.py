@@ -0,0 +1,337 @@
+"""
+Latencia - Presupuesto de tiempo por turno para las llamadas a OpenAI
+Cada turno tiene un plazo total (Twilio corta el webhook si la respuesta
+demora). Las llamadas se hacen con el tiempo que queda, se reintentan los
+errores transitorios con backoff y jitter, y opcionalmente se lanza una
+llamada duplicada (cobertura) si la primera supera el umbral de latencia.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from threading import Lock
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from app.openai_client import hilos_llamadas
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errores que vale la pena reintentar (APITimeoutError hereda de APIConnectionError)
+ERRORES_TRANSITORIOS = (APIConnectionError, RateLimitError, InternalServerError)
+
+# Tiempo mínimo para que tenga sentido lanzar una llamada
+MINIMO_LLAMADA_SEGUNDOS = 0.3
+
+# Backoff entre reintentos (se multiplica por 2 en cada intento, con jitter)
+BACKOFF_BASE_SEGUNDOS = 0.2
+BACKOFF_MAXIMO_SEGUNDOS = 2.0
+
+# Cantidad de latencias recientes para estimar el p95
+VENTANA_LATENCIAS = 200
+MINIMO_MUESTRAS_P95 = 20
+
+# Pool donde corren las llamadas (y sus coberturas) para poder cortarlas por plazo;
+# del tamaño del pool de conexiones salvo que AI_COBERTURA_WORKERS diga otra cosa
+_EJECUTOR_COBERTURA = ThreadPoolExecutor(
+    max_workers=hilos_llamadas("AI_COBERTURA_WORKERS"),
+    thread_name_prefix="cobertura"
+)
+
+
+class PresupuestoAgotado(Exception):
+    """No queda tiempo en el turno para llamar al modelo."""
+
+
+# ==================== ESTADÍSTICAS DEL PROCESO ====================
+
+_latencias = deque(maxlen=VENTANA_LATENCIAS)
+_estadisticas = {"llamadas": 0, "reintentos": 0, "coberturas": 0, "coberturas_ganadas": 0, "agotados": 0}
+_lock_estadisticas = Lock()
+
+
+def _contar(campo: str):
+    """Incrementa un contador de estadísticas."""
+    with _lock_estadisticas:
+        _estadisticas[campo] += 1
+
+
+def _registrar_latencia(segundos: float):
+    """Guarda la latencia de una llamada exitosa."""
+    with _lock_estadisticas:
+        _estadisticas["llamadas"] += 1
+        _latencias.append(segundos)
+
+
+def p95_observado() -> Optional[float]:
+    """Retorna el p95 de las latencias recientes en segundos (None si hay pocas muestras)."""
+    with _lock_estadisticas:
+        muestras = sorted(_latencias)
+    if len(muestras) < MINIMO_MUESTRAS_P95:
+        return None
+    return muestras[int(len(muestras) * 0.95) - 1]
+
+
+def obtener_estadisticas() -> Dict:
+    """
+    Retorna los contadores de reintentos, coberturas y presupuestos agotados.
+
+    Returns:
+        Diccionario con llamadas, reintentos, coberturas, coberturas_ganadas,
+        agotados y p95_ms
+    """
+    with _lock_estadisticas:
+        estadisticas = dict(_estadisticas)
+    p95 = p95_observado()
+    estadisticas["p95_ms"] = p95 * 1000 if p95 is not None else None
+    return estadisticas
+
+
+# ==================== PRESUPUESTO ====================
+
+class PresupuestoTurno:
+    """Plazo total de un turno."""
+
+    def __init__(self, segundos: float):
+        """
+        Inicializa el presupuesto.
+
+        Args:
+            segundos: Tiempo total disponible para el turno
+        """
+        self.segundos = segundos
+        self.vence = time.monotonic() + segundos
+
+    def restante(self) -> float:
+        """Segundos que quedan del turno."""
+        return max(self.vence - time.monotonic(), 0.0)
+
+    def verificar(self) -> float:
+        """Retorna el tiempo restante o lanza PresupuestoAgotado si no alcanza para una llamada."""
+        restante = self.restante()
+        if restante < MINIMO_LLAMADA_SEGUNDOS:
+            _contar("agotados")
+            raise PresupuestoAgotado(f"Quedan {restante * 1000:.0f} ms del turno")
+        return restante
+
+
+class PoliticaLlamadas:
+    """Plazo, reintentos y cobertura de las llamadas al modelo."""
+
+    def __init__(self, presupuesto_segundos: float = None, reintentos: int = None, umbral_cobertura: str = None):
+        """
+        Inicializa la política.
+
+        Args:
+            presupuesto_segundos: Plazo de cada turno (default: AI_PRESUPUESTO_TURNO_SEGUNDOS o 8)
+            reintentos: Reintentos ante errores transitorios (default: AI_REINTENTOS o 2)
+            umbral_cobertura: Milisegundos tras los que se lanza una llamada
+                duplicada; "p95" usa el p95 observado y "0" lo desactiva
+                (default: AI_COBERTURA_UMBRAL_MS o "0")
+        """
+        self.presupuesto_segundos = presupuesto_segundos or float(os.getenv("AI_PRESUPUESTO_TURNO_SEGUNDOS", "8"))
+        self.reintentos = reintentos if reintentos is not None else int(os.getenv("AI_REINTENTOS", "2"))
+        self.umbral_cobertura = (umbral_cobertura or os.getenv("AI_COBERTURA_UMBRAL_MS", "0")).strip().lower()
+
+    def nuevo_presupuesto(self) -> PresupuestoTurno:
+        """Abre el presupuesto de un turno."""
+        return PresupuestoTurno(self.presupuesto_segundos)
+
+    def _umbral_cobertura_segundos(self) -> Optional[float]:
+        """Umbral a partir del cual se lanza la llamada duplicada (None: sin cobertura)."""
+        if self.umbral_cobertura == "p95":
+            return p95_observado()
+        try:
+            umbral_ms = float(self.umbral_cobertura)
+        except ValueError:
+            return None
+        return umbral_ms / 1000 if umbral_ms > 0 else None
+
+    @staticmethod
+    def _espera_reintento(intento: int) -> float:
+        """Backoff exponencial con jitter para el intento dado."""
+        espera = min(BACKOFF_BASE_SEGUNDOS * 2 ** intento, BACKOFF_MAXIMO_SEGUNDOS)
+        return random.uniform(espera / 2, espera)
+
+    # ==================== SÍNCRONO ====================
+
+    def llamar(
+        self,
+        llamada: Callable[[float], T],
+        presupuesto: PresupuestoTurno,
+        cobertura: bool = True
+    ) -> T:
+        """
+        Ejecuta una llamada dentro del presupuesto del turno.
+
+        Args:
+            llamada: Función que recibe el timeout en segundos y hace el pedido
+            presupuesto: Presupuesto del turno
+            cobertura: Permitir la llamada duplicada si la primera se demora
+
+        Returns:
+            Resultado de la llamada
+
+        Raises:
+            PresupuestoAgotado: Si se terminó el tiempo del turno
+        """
+        intento = 0
+        while True:
+            restante = presupuesto.verificar()
+            try:
+                return self._llamar_con_cobertura(llamada, presupuesto, restante, cobertura)
+            except ERRORES_TRANSITORIOS as e:
+                if intento >= self.reintentos:
+                    raise
+                espera = self._espera_reintento(intento)
+                if espera + MINIMO_LLAMADA_SEGUNDOS > presupuesto.restante():
+                    _contar("agotados")
+                    raise PresupuestoAgotado(f"Sin tiempo para reintentar: {e}") from e
+                intento += 1
+                _contar("reintentos")
+                logger.warning(f"Error transitorio de OpenAI ({e}), reintento {intento} en {espera * 1000:.0f} ms")
+                time.sleep(espera)
+
+    def _llamar_con_cobertura(
+        self,
+        llamada: Callable[[float], T],
+        presupuesto: PresupuestoTurno,
+        restante: float,
+        cobertura: bool
+    ) -> T:
+        """
+        Hace la llamada y, si supera el umbral, lanza un duplicado; gana la primera que responde.
+
+        La llamada corre en el pool aunque no haya cobertura, así el plazo se
+        cumple aunque el servidor tarde más que el timeout de lectura.
+        """
+        umbral = self._umbral_cobertura_segundos() if cobertura else None
+        inicio = time.monotonic()
+        principal = _EJECUTOR_COBERTURA.submit(llamada, restante)
+        pendientes = {principal}
+
+        if umbral is not None and umbral < restante:
+            terminadas, _ = wait(pendientes, timeout=umbral)
+            if not terminadas and presupuesto.restante() >= MINIMO_LLAMADA_SEGUNDOS:
+                _contar("coberturas")
+                logger.info(f"Llamada demorada más de {umbral * 1000:.0f} ms, se lanza una cobertura")
+                pendientes.add(_EJECUTOR_COBERTURA.submit(llamada, presupuesto.restante()))
+
+        ultimo_error: Optional[BaseException] = None
+        while pendientes:
+            terminadas, pendientes = wait(pendientes, timeout=presupuesto.restante(), return_when=FIRST_COMPLETED)
+            if not terminadas:
+                break
+            for futuro in terminadas:
+                if futuro.exception() is None:
+                    if futuro is not principal:
+                        _contar("coberturas_ganadas")
+                    _registrar_latencia(time.monotonic() - inicio)
+                    return futuro.result()
+                ultimo_error = futuro.exception()
+
+        if ultimo_error is not None and not pendientes:
+            raise ultimo_error
+        _contar("agotados")
+        raise PresupuestoAgotado("Ninguna llamada respondió dentro del plazo")
+
+    # ==================== ASÍNCRONO ====================
+
+    async def llamar_async(
+        self,
+        llamada: Callable[[float], Awaitable[T]],
+        presupuesto: PresupuestoTurno,
+        cobertura: bool = True
+    ) -> T:
+        """
+        Versión asíncrona de llamar(); la llamada perdedora se cancela.
+
+        Args:
+            llamada: Función que recibe el timeout en segundos y devuelve la corrutina del pedido
+            presupuesto: Presupuesto del turno
+            cobertura: Permitir la llamada duplicada si la primera se demora
+
+        Returns:
+            Resultado de la llamada
+        """
+        intento = 0
+        while True:
+            restante = presupuesto.verificar()
+            try:
+                return await self._llamar_con_cobertura_async(llamada, presupuesto, restante, cobertura)
+            except ERRORES_TRANSITORIOS as e:
+                if intento >= self.reintentos:
+                    raise
+                espera = self._espera_reintento(intento)
+                if espera + MINIMO_LLAMADA_SEGUNDOS > presupuesto.restante():
+                    _contar("agotados")
+                    raise PresupuestoAgotado(f"Sin tiempo para reintentar: {e}") from e
+                intento += 1
+                _contar("reintentos")
+                logger.warning(f"Error transitorio de OpenAI ({e}), reintento {intento} en {espera * 1000:.0f} ms")
+                await asyncio.sleep(espera)
+
+    async def _llamar_con_cobertura_async(
+        self,
+        llamada: Callable[[float], Awaitable[T]],
+        presupuesto: PresupuestoTurno,
+        restante: float,
+        cobertura: bool
+    ) -> T:
+        """Versión asíncrona de _llamar_con_cobertura."""
+        umbral = self._umbral_cobertura_segundos() if cobertura else None
+        inicio = time.monotonic()
+        principal = asyncio.ensure_future(llamada(restante))
+        pendientes = {principal}
+
+        try:
+            if umbral is not None and umbral < restante:
+                terminadas, _ = await asyncio.wait(pendientes, timeout=umbral)
+                if not terminadas and presupuesto.restante() >= MINIMO_LLAMADA_SEGUNDOS:
+                    _contar("coberturas")
+                    logger.info(f"Llamada demorada más de {umbral * 1000:.0f} ms, se lanza una cobertura")
+                    pendientes.add(asyncio.ensure_future(llamada(presupuesto.restante())))
+
+            ultimo_error: Optional[BaseException] = None
+            while pendientes:
+                terminadas, pendientes = await asyncio.wait(
+                    pendientes, timeout=presupuesto.restante(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not terminadas:
+                    break
+                for tarea in terminadas:
+                    if tarea.exception() is None:
+                        if tarea is not principal:
+                            _contar("coberturas_ganadas")
+                        _registrar_latencia(time.monotonic() - inicio)
+                        return tarea.result()
+                    ultimo_error = tarea.exception()
+
+            if ultimo_error is not None and not pendientes:
+                raise ultimo_error
+            _contar("agotados")
+            raise PresupuestoAgotado("Ninguna llamada respondió dentro del plazo")
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+
+
+_politica_compartida: Optional[PoliticaLlamadas] = None
+_lock_politica = Lock()
+
+
+def obtener_politica() -> PoliticaLlamadas:
+    """Retorna la política por defecto del proceso (se configura desde .env y la comparten todas las sesiones)."""
+    global _politica_compartida
+    if _politica_compartida is None:
+        with _lock_politica:
+            if _politica_compartida is None:
+                _politica_compartida = PoliticaLlamadas()
+    return _politica_compartida
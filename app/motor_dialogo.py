@@ -0,0 +1,503 @@
+"""
+Motor de Diálogo - Flujo determinístico para sacar turnos
+Conduce el pedido de turno (nombre, cobertura, especialidad, fecha, horario y
+DNI) como una máquina de estados sobre patient_data: elige el próximo dato que
+falta y arma la pregunta con las plantillas de EJEMPLOS_RESPUESTAS, sin llamar
+al modelo. El modelo solo interviene cuando el mensaje no se entiende con las
+reglas locales o el paciente se sale del guion (preguntas, cambios de planes).
+"""
+
+import os
+import re
+import sys
+import random
+import logging
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import prompts, datos_clinica
+from config.texto import normalizar_texto
+from app.extractor_local import PALABRAS_RELLENO
+from app import detector_urgencias, perfiles
+
+logger = logging.getLogger(__name__)
+
+
+# Orden en que se piden los datos (el DNI al final, como en PROMPT_FLUJO_CONVERSACION)
+SLOTS_TURNO = ("nombre_completo", "cobertura", "especialidad", "fecha_preferida", "hora", "dni")
+
+# Plantilla con la que se pide cada dato (el horario se ofrece con los turnos libres)
+PLANTILLAS_SLOT = {
+    "nombre_completo": "solicitar_nombre",
+    "cobertura": "solicitar_cobertura",
+    "especialidad": "solicitar_especialidad",
+    "fecha_preferida": "solicitar_fecha",
+    "dni": "solicitar_dni",
+}
+
+# Fechas que el motor sabe resolver contra la agenda (el resto queda para el modelo)
+FECHAS_AGENDA = {
+    "hoy": "hoy", "mañana": "manana", "manana": "manana",
+    "pasado mañana": "pasado_manana", "pasado manana": "pasado_manana",
+}
+
+# Horarios que se ofrecen por vez
+MAX_TURNOS_OFRECIDOS = 3
+
+# Turnos libres que se buscan hacia adelante cuando el día pedido está completo
+MAX_PROXIMOS_BUSCADOS = 20
+
+# Hora de corte entre turnos de mañana y de tarde
+HORA_TARDE = 13
+
+FRANJA_MANANA = re.compile(r"\b(?:a|por|de) la mañana\b")
+FRANJA_TARDE = re.compile(r"\b(?:a|por|de) la tarde\b")
+
+# "a las 10", "14:30", "16.30 hs"
+PATRON_HORARIO = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\b")
+
+ORDINALES = {
+    "primera": 0, "primero": 0, "segunda": 1, "segundo": 1,
+    "tercera": 2, "tercero": 2, "ultima": -1, "ultimo": -1,
+}
+
+AFIRMACIONES = {
+    "si", "dale", "correcto", "perfecto", "ok", "okey", "bueno", "exacto", "listo",
+    "claro", "confirmo", "vale", "genial", "acuerdo", "bien",
+}
+
+_PLACEHOLDER = re.compile(r"\[([^\]]+)\]")
+
+
+@dataclass(slots=True)
+class EstadoDialogo:
+    """Estado del flujo de turno de una sesión."""
+
+    # Dato o confirmación que se le pidió al paciente en el último turno
+    pendiente: Optional[str] = None
+    # Fecha (dd/mm/aaaa) y horarios ofrecidos
+    fecha: Optional[str] = None
+    turnos_ofrecidos: Tuple[str, ...] = ()
+    # Horario elegido entre los ofrecidos
+    hora: Optional[str] = None
+    # Perfil guardado del número: se carga recién cuando el paciente dice un DNI que coincide
+    perfil: Optional[Dict[str, str]] = None
+
+    def reiniciar(self):
+        """Vuelve al comienzo del flujo."""
+        self.pendiente = None
+        self.fecha = None
+        self.turnos_ofrecidos = ()
+        self.hora = None
+        self.perfil = None
+
+
+# ==================== ESTADÍSTICAS ====================
+
+_estadisticas = {"turnos_reserva": 0, "resueltos_sin_modelo": 0}
+_lock_estadisticas = Lock()
+
+
+def obtener_estadisticas() -> Dict:
+    """
+    Retorna el uso del motor de diálogo en este proceso.
+
+    Returns:
+        Diccionario con turnos_reserva (turnos dentro de un pedido de turno),
+        resueltos_sin_modelo y tasa_acierto
+    """
+    with _lock_estadisticas:
+        turnos = _estadisticas["turnos_reserva"]
+        resueltos = _estadisticas["resueltos_sin_modelo"]
+    return {
+        "turnos_reserva": turnos,
+        "resueltos_sin_modelo": resueltos,
+        "tasa_acierto": resueltos / turnos if turnos else 0.0
+    }
+
+
+def reiniciar_estadisticas():
+    """Pone en cero los contadores del motor de diálogo."""
+    with _lock_estadisticas:
+        _estadisticas["turnos_reserva"] = 0
+        _estadisticas["resueltos_sin_modelo"] = 0
+
+
+def _contar(resuelto: bool):
+    with _lock_estadisticas:
+        _estadisticas["turnos_reserva"] += 1
+        if resuelto:
+            _estadisticas["resueltos_sin_modelo"] += 1
+
+
+# ==================== PLANTILLAS ====================
+
+def renderizar(
+    tipo: str,
+    valores: Dict[str, str] = None,
+    con_pregunta: bool = False,
+    usar_todos: bool = False
+) -> str:
+    """
+    Arma una respuesta con una de las plantillas de EJEMPLOS_RESPUESTAS.
+
+    Args:
+        tipo: Clave de la plantilla (ej. "solicitar_dni")
+        valores: Reemplazos de los marcadores ("nombre" -> "[nombre]")
+        con_pregunta: Usar solo las variantes que terminan en pregunta
+        usar_todos: Preferir las variantes que mencionan todos los valores
+
+    Returns:
+        Texto de la respuesta
+    """
+    valores = valores or {}
+    plantillas = prompts.obtener_ejemplo_respuesta(tipo)
+    completas = [
+        plantilla for plantilla in plantillas
+        if all(marcador in valores for marcador in _PLACEHOLDER.findall(plantilla))
+        and (not con_pregunta or plantilla.endswith("?"))
+    ]
+    candidatas = [p for p in completas if set(_PLACEHOLDER.findall(p)) == set(valores)] if usar_todos else completas
+    # Si ninguna variante encaja con los valores, se usa una menos específica
+    # (o una sin marcadores) antes que cortar el turno
+    candidatas = candidatas or completas or [p for p in plantillas if not _PLACEHOLDER.search(p)]
+    plantilla = random.choice(candidatas)
+    return _PLACEHOLDER.sub(lambda match: valores[match.group(1)], plantilla)
+
+
+def _enumerar(horarios: Tuple[str, ...]) -> str:
+    """("10:00", "14:30", "16:00") -> "10:00, 14:30 o 16:00"."""
+    if len(horarios) == 1:
+        return horarios[0]
+    return f"{', '.join(horarios[:-1])} o {horarios[-1]}"
+
+
+def _nombre_especialidad(especialidad: str) -> str:
+    """Nombre para mostrar de una especialidad (clave o texto libre)."""
+    return datos_clinica.ESPECIALIDADES.get(especialidad, {}).get("nombre", especialidad)
+
+
+# ==================== INTERPRETACIÓN ====================
+
+# Palabras que no aparecen en un nombre y sí al contar un síntoma o un estado
+# ("estoy mareada", "tengo fiebre"); el léxico de urgencias se revisa aparte
+PALABRAS_NO_NOMBRE = {
+    "estoy", "esta", "tengo", "tiene", "siento", "me", "le", "duele", "dolor", "fiebre", "tos",
+    "gripe", "sangrando", "sangre", "mareado", "mareada", "vomitando", "herido", "herida",
+    "quemado", "quemada", "golpe", "mal", "ayuda", "auxilio",
+}
+
+
+def _palabras_sin_relleno(mensaje: str) -> List[str]:
+    """Palabras del mensaje que no son muletillas ni números."""
+    return [p for p in normalizar_texto(mensaje).split() if p not in PALABRAS_RELLENO and not p.isdigit()]
+
+
+def _interpretar_nombre(mensaje: str) -> Optional[str]:
+    """
+    Toma el mensaje como nombre cuando se acaba de pedir y el paciente
+    responde solo con él ("Juan Pérez", "soy María José Gómez").
+
+    Nunca toma como nombre un mensaje con síntomas ("estoy sangrando mucho").
+    """
+    evaluacion = detector_urgencias.evaluar_urgencia(mensaje)
+    if evaluacion.terminos or evaluacion.negados:
+        return None
+    if any(palabra in PALABRAS_NO_NOMBRE for palabra in normalizar_texto(mensaje).split()):
+        return None
+    palabras = [p.strip(".,;!¡") for p in mensaje.split()]
+    while palabras and normalizar_texto(palabras[0]) in PALABRAS_RELLENO:
+        palabras.pop(0)
+    if not 1 <= len(palabras) <= 4:
+        return None
+    if any(not p.isalpha() or normalizar_texto(p) in PALABRAS_RELLENO for p in palabras):
+        return None
+    return " ".join(p.capitalize() for p in palabras)
+
+
+def _interpretar_hora(mensaje: str, ofrecidos: Tuple[str, ...]) -> Optional[str]:
+    """Busca en el mensaje uno de los horarios ofrecidos ("a las 4", "14:30", "la primera")."""
+    for match in PATRON_HORARIO.finditer(mensaje):
+        hora, minutos = int(match.group(1)), match.group(2)
+        candidatos = [
+            turno for turno in ofrecidos
+            if int(turno[:2]) in (hora, hora + 12) and (minutos is None or turno[3:] == minutos)
+        ]
+        if len(candidatos) == 1:
+            return candidatos[0]
+    for palabra in normalizar_texto(mensaje).split():
+        if palabra in ORDINALES and ofrecidos:
+            indice = ORDINALES[palabra]
+            if indice < len(ofrecidos):
+                return ofrecidos[indice]
+    return None
+
+
+def _es_afirmacion(mensaje: str) -> Optional[bool]:
+    """True si el paciente confirma, False si niega, None si no queda claro."""
+    palabras = normalizar_texto(mensaje).split()
+    if not palabras:
+        return None
+    if palabras[0] == "no":
+        return False
+    if any(palabra in AFIRMACIONES for palabra in palabras):
+        return True
+    return None
+
+
+# ==================== FLUJO ====================
+
+def _proximo_slot(patient_data, estado: EstadoDialogo) -> Optional[str]:
+    """Primer dato del flujo que todavía falta, o None si ya están todos."""
+    if estado.perfil:
+        # Con una sola pregunta (el DNI) se verifica quién es y se cargan los demás datos
+        return "perfil"
+    for slot in SLOTS_TURNO:
+        valor = estado.hora if slot == "hora" else patient_data[slot]
+        if not valor:
+            return slot
+    return None
+
+
+def _ofrecer_turnos(asistente, mensaje: str) -> Optional[str]:
+    """
+    Ofrece los horarios libres de la fecha pedida (o del próximo día con lugar,
+    aunque sea de otra semana).
+
+    Returns:
+        Respuesta con los horarios, o None si la fecha no se puede resolver localmente
+    """
+    estado = asistente.dialogo
+    cuando = FECHAS_AGENDA.get(normalizar_texto(asistente.patient_data["fecha_preferida"]))
+    if cuando is None:
+        return None
+
+    normalizado = normalizar_texto(mensaje)
+    franja_manana = FRANJA_MANANA.search(normalizado) is not None
+    franja_tarde = FRANJA_TARDE.search(normalizado) is not None
+
+    def _en_franja(turnos: List, hora=lambda turno: turno) -> List:
+        """Turnos de la franja pedida (todos si no pidió o si no hay ninguno en la franja)."""
+        if franja_manana == franja_tarde:
+            return turnos
+        return [t for t in turnos if (int(hora(t)[:2]) >= HORA_TARDE) == franja_tarde] or turnos
+
+    turnos = asistente.obtener_turnos_disponibles(cuando, asistente.patient_data["especialidad"])
+    fecha = turnos["fecha"] if turnos else None
+    libres = tuple(_en_franja(turnos["disponibles"])[:MAX_TURNOS_OFRECIDOS]) if turnos else ()
+    pedido_sin_lugar = not libres
+    if pedido_sin_lugar:
+        # Se ofrece el primer día con lugar, aunque sea de otra semana
+        proximos = asistente.proximos_turnos(asistente.patient_data["especialidad"], MAX_PROXIMOS_BUSCADOS)
+        proximos = _en_franja(proximos, lambda turno: turno["hora"])
+        if not proximos:
+            return None
+        fecha = proximos[0]["fecha"]
+        libres = tuple(dict.fromkeys(t["hora"] for t in proximos if t["fecha"] == fecha))[:MAX_TURNOS_OFRECIDOS]
+
+    estado.fecha, estado.turnos_ofrecidos, estado.pendiente = fecha, libres, "hora"
+    if pedido_sin_lugar:
+        alternativa = f"el {fecha} a las {_enumerar(libres)}"
+        # Un domingo o feriado no está "completo": la clínica no atiende
+        if turnos and not turnos.get("abierto", True):
+            return renderizar("dia_cerrado", {"alternativa": alternativa})
+        if turnos and not turnos.get("atiende", True):
+            especialidad = _nombre_especialidad(asistente.patient_data["especialidad"])
+            return renderizar("dia_sin_atencion", {"alternativa": alternativa, "especialidad": especialidad})
+        return renderizar("dia_completo", {"alternativa": alternativa})
+    return renderizar("ofrecer_turnos", {"fecha": fecha, "horarios": _enumerar(libres)})
+
+
+def _acuse_cobertura(cobertura: str) -> Tuple[str, bool]:
+    """
+    Respuesta a la cobertura que acaba de indicar el paciente.
+
+    Returns:
+        Tupla (texto, True si se puede seguir con el flujo sin esperar respuesta)
+    """
+    precio = str(datos_clinica.PRECIOS["consulta_particular"])
+    if cobertura == "particular":
+        return renderizar("cobertura_particular", {"precio": precio}), True
+    acepta, _, nombre = datos_clinica.verificar_cobertura(cobertura)
+    if acepta:
+        valores = {"obra social": nombre, "prepaga": nombre, "cobertura": nombre}
+        return renderizar("cobertura_aceptada", valores), True
+    return renderizar("cobertura_no_aceptada", {"precio": precio, "cobertura": cobertura}, con_pregunta=True), False
+
+
+# Qué hacer después de interpretar el mensaje
+SEGUIR, ESPERAR, CONFIRMAR = "seguir", "esperar", "confirmar"
+
+
+def _interpretar(asistente, mensaje: str, datos_locales: Dict, concluyente: bool) -> Optional[Tuple[str, List[str]]]:
+    """
+    Incorpora la respuesta del paciente según lo que se le pidió.
+
+    Returns:
+        Tupla (SEGUIR con la próxima pregunta, ESPERAR la respuesta a los
+        acuses o CONFIRMAR el turno; frases a decir antes), o None si el
+        mensaje no se entiende localmente o se sale del flujo
+    """
+    estado = asistente.dialogo
+    patient_data = asistente.patient_data
+    acuses: List[str] = []
+
+    if estado.perfil and patient_data["dni"]:
+        _verificar_perfil(patient_data, estado)
+
+    if "fecha_preferida" in datos_locales:
+        # Nueva fecha: los horarios ofrecidos antes (y la reserva) ya no valen
+        estado.hora, estado.turnos_ofrecidos = None, ()
+        asistente.liberar_reserva()
+
+    if estado.pendiente == "nombre_completo" and not concluyente and not datos_locales:
+        nombre = _interpretar_nombre(mensaje)
+        if nombre is None:
+            return None
+        patient_data["nombre_completo"] = nombre
+
+    elif estado.pendiente == "hora" and estado.turnos_ofrecidos and not {"fecha_preferida", "dni"} & set(datos_locales):
+        hora = _interpretar_hora(mensaje, estado.turnos_ofrecidos)
+        if hora is None:
+            if not concluyente:
+                return None
+            if PATRON_HORARIO.search(mensaje):
+                # Pidió un horario que no está entre los libres
+                alternativa = f"a las {_enumerar(estado.turnos_ofrecidos)}"
+                return ESPERAR, [renderizar("no_disponible", {"alternativa": alternativa}, usar_todos=True)]
+        elif not concluyente and not all(p in ORDINALES for p in _palabras_sin_relleno(mensaje)):
+            return None
+        elif asistente.reservar_turno(estado.fecha, hora, patient_data["especialidad"]):
+            estado.hora = hora
+        else:
+            # Otro paciente lo tomó mientras este elegía
+            estado.turnos_ofrecidos = tuple(t for t in estado.turnos_ofrecidos if t != hora)
+            if not estado.turnos_ofrecidos:
+                return SEGUIR, acuses
+            alternativa = f"a las {_enumerar(estado.turnos_ofrecidos)}"
+            return ESPERAR, [renderizar("no_disponible", {"alternativa": alternativa}, usar_todos=True)]
+
+    elif estado.pendiente == "perfil" and estado.perfil:
+        # No dijo el DNI: si no lo quiere dar, sigue como paciente nuevo
+        if not concluyente or _es_afirmacion(mensaje) is not False:
+            return None
+        perfiles.registrar_confirmacion(len(estado.perfil), False, dni_dado=False)
+        estado.perfil = None
+
+    elif estado.pendiente in ("confirmacion", "particular"):
+        afirma = _es_afirmacion(mensaje) if concluyente else None
+        if afirma is not True:
+            # Un "no" o algo ambiguo abre la conversación: sigue el modelo
+            if afirma is False and estado.pendiente == "confirmacion":
+                estado.hora, estado.turnos_ofrecidos = None, ()
+                asistente.liberar_reserva()
+            return None
+        if estado.pendiente == "confirmacion":
+            return CONFIRMAR, acuses
+
+    elif not concluyente:
+        return None
+
+    if "cobertura" in datos_locales:
+        acuse, continuar = _acuse_cobertura(datos_locales["cobertura"])
+        acuses.append(acuse)
+        if not continuar:
+            # Sin convenio: se espera que acepte la consulta particular
+            estado.pendiente = "particular"
+            return ESPERAR, acuses
+    return SEGUIR, acuses
+
+
+def responder(asistente, mensaje: str, datos_locales: Dict, concluyente: bool) -> Optional[str]:
+    """
+    Responde un turno del pedido de turno sin llamar al modelo.
+
+    Args:
+        asistente: AIAssistant de la sesión (patient_data, dialogo y helpers de agenda)
+        mensaje: Mensaje del usuario
+        datos_locales: Datos que el extractor local ya incorporó a patient_data
+        concluyente: Si la extracción local entendió todo el mensaje
+
+    Returns:
+        Respuesta armada con plantillas, o None si el turno lo tiene que resolver el modelo
+    """
+    patient_data = asistente.patient_data
+    estado = asistente.dialogo
+    if (
+        patient_data["tipo_consulta"] != "turno"
+        or patient_data["turno_confirmado"] is not None
+        or patient_data["sintomas_graves"]
+    ):
+        return None
+
+    respuesta = None
+    # Las preguntas del paciente quedan para el modelo
+    interpretacion = None if "?" in mensaje else _interpretar(asistente, mensaje, datos_locales, concluyente)
+    if interpretacion is not None:
+        accion, acuses = interpretacion
+        if accion == CONFIRMAR:
+            estado.pendiente = None
+            respuesta = asistente.confirmar_turno(
+                estado.fecha, estado.hora, _nombre_especialidad(patient_data["especialidad"])
+            )
+            if patient_data["turno_confirmado"] is None:
+                # El horario se ocupó (venció la reserva): se ofrecen los que quedan
+                estado.hora, estado.turnos_ofrecidos = None, ()
+                respuesta = _siguiente_pregunta(asistente, mensaje, [respuesta])
+        elif accion == ESPERAR:
+            respuesta = " ".join(acuses)
+        else:
+            respuesta = _siguiente_pregunta(asistente, mensaje, acuses)
+
+    if respuesta is None:
+        estado.pendiente = None
+    _contar(respuesta is not None)
+    logger.debug(f"Motor de diálogo: {estado.pendiente or 'deriva al modelo'}")
+    return respuesta
+
+
+def _verificar_perfil(patient_data, estado: EstadoDialogo):
+    """
+    Carga el perfil del número si el DNI que dio el paciente es el guardado;
+    si no coincide (otra persona con el mismo teléfono) lo descarta. Lo que
+    el paciente ya dijo en la sesión no se pisa.
+    """
+    perfil, estado.perfil = estado.perfil, None
+    coincide = re.sub(r"\D", "", patient_data["dni"]) == re.sub(r"\D", "", perfil["dni"])
+    if coincide:
+        for campo, valor in perfil.items():
+            if not patient_data[campo]:
+                patient_data[campo] = valor
+    perfiles.registrar_confirmacion(len(perfil), coincide)
+
+
+def _siguiente_pregunta(asistente, mensaje: str, acuses: List[str]) -> Optional[str]:
+    """Arma la pregunta por el próximo dato que falta, o la confirmación final."""
+    patient_data = asistente.patient_data
+    estado = asistente.dialogo
+    slot = _proximo_slot(patient_data, estado)
+
+    if slot == "perfil":
+        # No se lee ningún dato guardado antes de saber quién escribe
+        estado.pendiente = slot
+        pregunta = renderizar("confirmar_perfil")
+    elif slot == "hora":
+        pregunta = _ofrecer_turnos(asistente, mensaje)
+        if pregunta is None:
+            return None
+    elif slot is not None:
+        estado.pendiente = slot
+        pregunta = renderizar(PLANTILLAS_SLOT[slot])
+    else:
+        estado.pendiente = "confirmacion"
+        valores = {
+            "nombre": patient_data["nombre_completo"],
+            "fecha": estado.fecha,
+            "día": estado.fecha,
+            "hora": estado.hora,
+        }
+        pregunta = renderizar("confirmar_datos", valores)
+
+    return " ".join(acuses + [pregunta])
@@ -0,0 +1,191 @@
+"""
+OpenAI Client - Cliente de OpenAI compartido por todo el proceso
+Todas las sesiones (y la transcripción con Whisper) usan el mismo cliente y el
+mismo pool de conexiones HTTP, así se reutilizan las conexiones TLS abiertas.
+
+El backend es cualquier servidor compatible con la API de OpenAI: se elige con
+LLM_BACKEND ("openai" o "local", el servidor simulado de app/backend_simulado.py)
+y OPENAI_BASE_URL. También se puede registrar un cliente propio con
+registrar_cliente() (por ejemplo, en pruebas de carga).
+"""
+
+import os
+import logging
+from threading import Lock
+from typing import Optional
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Cargar variables de entorno
+load_dotenv()
+
+_cliente: Optional[OpenAI] = None
+_cliente_async: Optional[AsyncOpenAI] = None
+_lock_cliente = Lock()
+
+# Backends conocidos: URL base por defecto y si exigen API key
+BACKENDS = {
+    "openai": {"base_url": None, "requiere_api_key": True},
+    "local": {"base_url": "http://127.0.0.1:8089/v1", "requiere_api_key": False},
+}
+
+
+def _configuracion_pool() -> dict:
+    """Lee la configuración del pool de conexiones desde el entorno."""
+    return {
+        "max_connections": int(os.getenv("OPENAI_POOL_MAX_CONEXIONES", "100")),
+        "max_keepalive_connections": int(os.getenv("OPENAI_POOL_MAX_KEEPALIVE", "20")),
+        "keepalive_expiry": float(os.getenv("OPENAI_KEEPALIVE_SEGUNDOS", "60")),
+        "timeout": float(os.getenv("OPENAI_TIMEOUT_SEGUNDOS", "30")),
+        "connect_timeout": float(os.getenv("OPENAI_CONNECT_TIMEOUT_SEGUNDOS", "5")),
+        "max_retries": int(os.getenv("OPENAI_MAX_REINTENTOS", "2")),
+    }
+
+
+def hilos_llamadas(variable: str) -> int:
+    """
+    Hilos de un pool que hace llamadas al modelo.
+
+    Por defecto son tantos como conexiones del pool HTTP: con menos, los
+    turnos esperan en la cola del pool mientras se les acaba el presupuesto.
+
+    Args:
+        variable: Variable de entorno que lo fija explícitamente
+    """
+    return int(os.getenv(variable) or _configuracion_pool()["max_connections"])
+
+
+def _configuracion_backend() -> dict:
+    """
+    Lee el backend desde el entorno.
+
+    Returns:
+        Diccionario con nombre, base_url (None: la de OpenAI) y api_key
+
+    Raises:
+        ValueError: Si el backend no existe o falta la API key que exige
+    """
+    nombre = os.getenv("LLM_BACKEND", "openai").strip().lower()
+    if nombre not in BACKENDS:
+        raise ValueError(f"LLM_BACKEND desconocido: {nombre} (opciones: {', '.join(BACKENDS)})")
+    backend = BACKENDS[nombre]
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        if backend["requiere_api_key"]:
+            raise ValueError("OPENAI_API_KEY no encontrada en variables de entorno")
+        # El SDK exige una key aunque el servidor no la valide
+        api_key = "sin-api-key"
+
+    return {
+        "nombre": nombre,
+        "base_url": os.getenv("OPENAI_BASE_URL") or backend["base_url"],
+        "api_key": api_key,
+    }
+
+
+def registrar_cliente(cliente=None, cliente_async=None):
+    """
+    Reemplaza los clientes compartidos por otros compatibles con la API de OpenAI.
+
+    Args:
+        cliente: Cliente síncrono (chat.completions, audio.transcriptions, with_options)
+        cliente_async: Cliente asíncrono con la misma interfaz
+    """
+    global _cliente, _cliente_async
+    with _lock_cliente:
+        if cliente is not None:
+            _cliente = cliente
+        if cliente_async is not None:
+            _cliente_async = cliente_async
+    logger.info("Cliente de modelo registrado manualmente")
+
+
+def obtener_cliente() -> OpenAI:
+    """
+    Retorna el cliente de OpenAI del proceso, creándolo la primera vez.
+
+    Se crea de forma perezosa para que cada worker de gunicorn abra su propio
+    pool después del fork.
+
+    Returns:
+        Instancia compartida de OpenAI
+    """
+    global _cliente
+    if _cliente is None:
+        with _lock_cliente:
+            if _cliente is None:
+                backend = _configuracion_backend()
+                config = _configuracion_pool()
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=config["max_connections"],
+                        max_keepalive_connections=config["max_keepalive_connections"],
+                        keepalive_expiry=config["keepalive_expiry"]
+                    ),
+                    timeout=httpx.Timeout(config["timeout"], connect=config["connect_timeout"])
+                )
+                _cliente = OpenAI(
+                    api_key=backend["api_key"],
+                    base_url=backend["base_url"],
+                    http_client=http_client,
+                    max_retries=config["max_retries"]
+                )
+                logger.info(
+                    f"Cliente OpenAI compartido creado (backend {backend['nombre']}, "
+                    f"{backend['base_url'] or 'api.openai.com'}): {config}"
+                )
+
+    return _cliente
+
+
+def obtener_cliente_async() -> AsyncOpenAI:
+    """
+    Retorna el cliente asíncrono de OpenAI del proceso, creándolo la primera vez.
+
+    Usa la misma configuración de pool que obtener_cliente(). Debe usarse
+    siempre desde el mismo event loop.
+
+    Returns:
+        Instancia compartida de AsyncOpenAI
+    """
+    global _cliente_async
+    if _cliente_async is None:
+        with _lock_cliente:
+            if _cliente_async is None:
+                backend = _configuracion_backend()
+                config = _configuracion_pool()
+                http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=config["max_connections"],
+                        max_keepalive_connections=config["max_keepalive_connections"],
+                        keepalive_expiry=config["keepalive_expiry"]
+                    ),
+                    timeout=httpx.Timeout(config["timeout"], connect=config["connect_timeout"])
+                )
+                _cliente_async = AsyncOpenAI(
+                    api_key=backend["api_key"],
+                    base_url=backend["base_url"],
+                    http_client=http_client,
+                    max_retries=config["max_retries"]
+                )
+                logger.info(
+                    f"Cliente OpenAI asíncrono compartido creado (backend {backend['nombre']}, "
+                    f"{backend['base_url'] or 'api.openai.com'}): {config}"
+                )
+
+    return _cliente_async
+
+
+def cerrar_cliente():
+    """Cierra el cliente compartido y libera sus conexiones."""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is not None:
+            _cliente.close()
+            _cliente = None
+            logger.info("Cliente OpenAI compartido cerrado")
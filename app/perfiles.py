@@ -0,0 +1,323 @@
+"""
+Perfiles - Datos de pacientes que ya consultaron, por número de teléfono
+Guarda nombre, DNI y cobertura de cada número en SQLite, con una cache LRU en
+memoria adelante, para precargar patient_data cuando el mismo número vuelve a
+escribir o llamar. Así el paciente solo dice su DNI en vez de dictar todos sus
+datos de nuevo; el resto del perfil no se usa ni se lee hasta que el DNI coincide.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Campos de patient_data que se recuerdan entre sesiones
+CAMPOS_PERFIL: Tuple[str, ...] = ("nombre_completo", "dni", "cobertura")
+
+RUTA_POR_DEFECTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "perfiles.db")
+
+_NO_TELEFONO = re.compile(r"[^\d+]")
+
+
+def normalizar_telefono(telefono: str) -> str:
+    """
+    Clave del perfil: el número sin prefijo de canal ni separadores, para que
+    "whatsapp:+54 9 11 ..." y "+54911..." (llamada) compartan perfil.
+    """
+    return _NO_TELEFONO.sub("", telefono.split(":")[-1])
+
+
+@dataclass(slots=True, frozen=True)
+class PerfilPaciente:
+    """Datos recordados de un número de teléfono."""
+
+    nombre_completo: Optional[str] = None
+    dni: Optional[str] = None
+    cobertura: Optional[str] = None
+
+    def datos(self) -> Dict[str, str]:
+        """Campos con valor, listos para precargar patient_data."""
+        return {campo: getattr(self, campo) for campo in CAMPOS_PERFIL if getattr(self, campo)}
+
+
+class AlmacenPerfiles:
+    """Perfiles en SQLite con una cache LRU en memoria."""
+
+    def __init__(self, ruta: str = None, max_cache: int = None):
+        """
+        Inicializa el almacén.
+
+        Args:
+            ruta: Archivo SQLite (default: PERFILES_DB desde .env, o data/perfiles.db;
+                ":memory:" para no persistir)
+            max_cache: Perfiles que se mantienen en memoria (default:
+                PERFILES_CACHE_MAX desde .env, o 1000)
+        """
+        self.ruta = ruta or os.getenv("PERFILES_DB") or RUTA_POR_DEFECTO
+        self.max_cache = max_cache if max_cache is not None else int(os.getenv("PERFILES_CACHE_MAX", "1000"))
+
+        if self.ruta != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+
+        # Una sola conexión compartida por los hilos; el lock serializa el acceso
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute(
+            """
+            CREATE TABLE IF NOT EXISTS perfiles (
+                telefono TEXT PRIMARY KEY,
+                nombre_completo TEXT,
+                dni TEXT,
+                cobertura TEXT,
+                actualizado REAL NOT NULL
+            )
+            """
+        )
+        self._conexion.commit()
+
+        # telefono -> perfil (None también se guarda: el número no tiene perfil)
+        self._cache: "OrderedDict[str, Optional[PerfilPaciente]]" = OrderedDict()
+        self._lock = Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _recordar(self, telefono: str, perfil: Optional[PerfilPaciente]):
+        """Guarda el perfil en la cache LRU (con el lock tomado)."""
+        if self.max_cache <= 0:
+            return
+        self._cache[telefono] = perfil
+        self._cache.move_to_end(telefono)
+        while len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+
+    def _leer(self, clave: str, contar: bool) -> Optional[PerfilPaciente]:
+        """
+        Perfil de un número ya normalizado, desde la cache LRU o la base (con el lock tomado).
+
+        Args:
+            clave: Número normalizado
+            contar: Registrar el acierto o fallo en las estadísticas (solo
+                las búsquedas de las sesiones, no las lecturas internas)
+        """
+        if clave in self._cache:
+            self._cache.move_to_end(clave)
+            if contar:
+                self.aciertos += 1
+            return self._cache[clave]
+
+        if contar:
+            self.fallos += 1
+        fila = self._conexion.execute(
+            "SELECT nombre_completo, dni, cobertura FROM perfiles WHERE telefono = ?",
+            (clave,)
+        ).fetchone()
+        perfil = PerfilPaciente(*fila) if fila else None
+        self._recordar(clave, perfil)
+        return perfil
+
+    def obtener(self, telefono: str) -> Optional[PerfilPaciente]:
+        """
+        Busca el perfil de un número.
+
+        Args:
+            telefono: Número tal como llega del webhook
+
+        Returns:
+            PerfilPaciente o None si el número nunca dejó datos
+        """
+        with self._lock:
+            return self._leer(normalizar_telefono(telefono), contar=True)
+
+    def guardar(self, telefono: str, datos: Dict) -> bool:
+        """
+        Actualiza el perfil con los datos no nulos; solo escribe si algo cambió.
+
+        Args:
+            telefono: Número tal como llega del webhook
+            datos: patient_data (o un dict con los CAMPOS_PERFIL)
+
+        Returns:
+            True si se escribió en la base
+        """
+        clave = normalizar_telefono(telefono)
+        with self._lock:
+            anterior = self._leer(clave, contar=False) or PerfilPaciente()
+        valores = {campo: datos.get(campo) or getattr(anterior, campo) for campo in CAMPOS_PERFIL}
+        if not any(valores.values()):
+            return False
+        perfil = PerfilPaciente(**valores)
+        if perfil == anterior:
+            return False
+
+        with self._lock:
+            self._conexion.execute(
+                """
+                INSERT INTO perfiles (telefono, nombre_completo, dni, cobertura, actualizado)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(telefono) DO UPDATE SET
+                    nombre_completo = excluded.nombre_completo,
+                    dni = excluded.dni,
+                    cobertura = excluded.cobertura,
+                    actualizado = excluded.actualizado
+                """,
+                (clave, perfil.nombre_completo, perfil.dni, perfil.cobertura, time.time())
+            )
+            self._conexion.commit()
+            self._recordar(clave, perfil)
+        return True
+
+    def olvidar(self, telefono: str):
+        """Borra el perfil de un número (por pedido del paciente)."""
+        clave = normalizar_telefono(telefono)
+        with self._lock:
+            self._conexion.execute("DELETE FROM perfiles WHERE telefono = ?", (clave,))
+            self._conexion.commit()
+            self._cache.pop(clave, None)
+
+    def estadisticas(self) -> Dict:
+        """
+        Retorna el uso del almacén.
+
+        Returns:
+            Diccionario con perfiles, en_cache, aciertos, fallos y tasa_acierto
+        """
+        with self._lock:
+            perfiles = self._conexion.execute("SELECT COUNT(*) FROM perfiles").fetchone()[0]
+            en_cache = len(self._cache)
+            aciertos, fallos = self.aciertos, self.fallos
+        total = aciertos + fallos
+        return {
+            "perfiles": perfiles,
+            "en_cache": en_cache,
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "tasa_acierto": aciertos / total if total else 0.0
+        }
+
+
+_almacen: Optional[AlmacenPerfiles] = None
+_lock_almacen = Lock()
+
+
+def obtener_almacen() -> AlmacenPerfiles:
+    """Retorna el almacén de perfiles del proceso (se configura desde .env)."""
+    global _almacen
+    if _almacen is None:
+        with _lock_almacen:
+            if _almacen is None:
+                _almacen = AlmacenPerfiles()
+    return _almacen
+
+
+# ==================== SESIONES ====================
+
+_estadisticas = {"sesiones": 0, "recurrentes": 0, "campos_precargados": 0, "turnos_ahorrados": 0}
+_lock_estadisticas = Lock()
+
+
+def _contar(**incrementos: int):
+    with _lock_estadisticas:
+        for clave, valor in incrementos.items():
+            _estadisticas[clave] += valor
+
+
+def obtener_estadisticas() -> Dict:
+    """
+    Retorna cuánto se aprovecharon los perfiles en este proceso.
+
+    Returns:
+        Diccionario con sesiones, recurrentes, campos_precargados,
+        turnos_ahorrados (preguntas que no hubo que hacer, descontando la
+        confirmación) y turnos_ahorrados_por_recurrente
+    """
+    with _lock_estadisticas:
+        estadisticas = dict(_estadisticas)
+    recurrentes = estadisticas["recurrentes"]
+    estadisticas["turnos_ahorrados_por_recurrente"] = (
+        estadisticas["turnos_ahorrados"] / recurrentes if recurrentes else 0.0
+    )
+    return estadisticas
+
+
+def reiniciar_estadisticas():
+    """Pone en cero los contadores de perfiles."""
+    with _lock_estadisticas:
+        for clave in _estadisticas:
+            _estadisticas[clave] = 0
+
+
+def _habilitados() -> bool:
+    """Los perfiles se pueden desactivar con PERFILES_HABILITADOS=false."""
+    return os.getenv("PERFILES_HABILITADOS", "true").lower() in ("1", "true", "si", "sí")
+
+
+def precargar(asistente, telefono: str) -> int:
+    """
+    Deja el perfil del número en el estado del motor de diálogo de una sesión nueva.
+
+    No toca patient_data: el motor le pide el DNI al paciente y recién si
+    coincide con el del perfil carga los demás datos. Los perfiles sin DNI
+    no se precargan (no hay con qué verificarlos).
+
+    Args:
+        asistente: AIAssistant recién creado
+        telefono: Número tal como llega del webhook
+
+    Returns:
+        Cantidad de campos precargados
+    """
+    _contar(sesiones=1)
+    if not telefono or not _habilitados():
+        return 0
+    try:
+        perfil = obtener_almacen().obtener(telefono)
+    except sqlite3.Error as e:
+        logger.error(f"Error leyendo el perfil de {telefono}: {e}")
+        return 0
+    if perfil is None or not perfil.dni:
+        return 0
+
+    datos = perfil.datos()
+    asistente.dialogo.perfil = datos
+    _contar(recurrentes=1, campos_precargados=len(datos))
+    logger.info(f"Perfil precargado para {telefono}: {', '.join(datos)}")
+    return len(datos)
+
+
+def registrar_confirmacion(campos: int, confirmado: bool, dni_dado: bool = True):
+    """
+    Registra la verificación del perfil con el DNI.
+
+    La pregunta es la del DNI: si coincide reemplaza las preguntas de los demás
+    campos; si no coincide no se ahorra nada, y si el paciente no lo quiso dar
+    cuesta esa pregunta de más.
+    """
+    if confirmado:
+        _contar(turnos_ahorrados=campos - 1)
+    elif not dni_dado:
+        _contar(turnos_ahorrados=-1)
+
+
+def guardar_sesion(asistente, telefono: str):
+    """
+    Guarda en el perfil los datos que el paciente dio en la sesión (solo
+    escribe en la base si cambió algo, así se puede llamar en cada turno).
+
+    Args:
+        asistente: AIAssistant de la sesión
+        telefono: Número tal como llega del webhook
+    """
+    if not telefono or not _habilitados():
+        return
+    try:
+        obtener_almacen().guardar(telefono, asistente.patient_data)
+    except sqlite3.Error as e:
+        logger.error(f"Error guardando el perfil de {telefono}: {e}")
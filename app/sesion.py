@@ -0,0 +1,105 @@
+"""
+Sesión - Representación compacta del estado de cada conversación
+Con miles de sesiones vivas, cada byte por sesión cuenta: los datos del
+paciente y los mensajes usan objetos con __slots__ en vez de diccionarios, y el
+prompt del sistema es un único objeto compartido por todas las sesiones.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+# Roles internados: todas las sesiones apuntan a las mismas cadenas
+ROL_SISTEMA = "system"
+ROL_USUARIO = "user"
+ROL_ASISTENTE = "assistant"
+_ROLES = {ROL_SISTEMA: ROL_SISTEMA, ROL_USUARIO: ROL_USUARIO, ROL_ASISTENTE: ROL_ASISTENTE}
+
+
+@dataclass(slots=True)
+class DatosPaciente:
+    """
+    Datos extraídos del paciente.
+
+    Se comporta como un diccionario de claves fijas (datos["dni"],
+    datos.get(...), datos.items()) para no cambiar el código que lo consulta.
+    """
+
+    nombre_completo: Optional[str] = None
+    dni: Optional[str] = None
+    cobertura: Optional[str] = None
+    tipo_consulta: Optional[str] = None
+    especialidad: Optional[str] = None
+    fecha_preferida: Optional[str] = None
+    sintomas_graves: bool = False
+    turno_confirmado: Optional[Dict] = None
+
+    def __getitem__(self, clave: str) -> Any:
+        if clave not in CAMPOS_PACIENTE:
+            raise KeyError(clave)
+        return getattr(self, clave)
+
+    def __setitem__(self, clave: str, valor: Any):
+        if clave not in CAMPOS_PACIENTE:
+            raise KeyError(clave)
+        setattr(self, clave, valor)
+
+    def __contains__(self, clave: object) -> bool:
+        return clave in CAMPOS_PACIENTE
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CAMPOS_PACIENTE)
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        """Igual que dict.get."""
+        return getattr(self, clave) if clave in CAMPOS_PACIENTE else default
+
+    def keys(self) -> Tuple[str, ...]:
+        """Nombres de los campos."""
+        return CAMPOS_PACIENTE
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Pares (campo, valor), como dict.items."""
+        return ((clave, getattr(self, clave)) for clave in CAMPOS_PACIENTE)
+
+    def copy(self) -> Dict:
+        """Copia como diccionario (para exponer fuera del asistente o serializar)."""
+        return {clave: getattr(self, clave) for clave in CAMPOS_PACIENTE}
+
+
+CAMPOS_PACIENTE: Tuple[str, ...] = tuple(campo.name for campo in fields(DatosPaciente))
+
+
+@dataclass(slots=True, frozen=True)
+class Mensaje:
+    """Mensaje del historial; se lee como dict (msg["role"], msg["content"])."""
+
+    role: str
+    content: str
+
+    def __getitem__(self, clave: str) -> str:
+        if clave == "role":
+            return self.role
+        if clave == "content":
+            return self.content
+        raise KeyError(clave)
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        """Igual que dict.get."""
+        return self[clave] if clave in ("role", "content") else default
+
+
+def crear_mensaje(rol: str, contenido: str) -> Mensaje:
+    """Crea un mensaje con el rol internado."""
+    return Mensaje(_ROLES.get(rol, rol), contenido)
+
+
+def mensaje_para_api(mensaje: Union[Mensaje, Dict[str, str]]) -> Dict[str, str]:
+    """
+    Convierte un mensaje del historial al formato de la API de OpenAI.
+
+    Los diccionarios (como el prompt del sistema compartido) se devuelven
+    tal cual, sin copiarlos.
+    """
+    if isinstance(mensaje, Mensaje):
+        return {"role": mensaje.role, "content": mensaje.content}
+    return mensaje
@@ -11,6 +11,7 @@ from twilio.rest import Client
 from dotenv import load_dotenv
 
 from .ai_assistant import AIAssistant
+from . import perfiles
 
 # Cargar variables de entorno
 load_dotenv()
@@ -28,18 +29,22 @@ TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 call_sessions = {}
 
 
-def get_or_create_session(call_sid: str) -> AIAssistant:
+def get_or_create_session(call_sid: str, from_number: str = None) -> AIAssistant:
     """
     Obtiene o crea una sesión de asistente para una llamada.
 
     Args:
         call_sid: ID único de la llamada de Twilio
+        from_number: Número que llama (para precargar su perfil)
 
     Returns:
         Instancia de AIAssistant
     """
     if call_sid not in call_sessions:
-        call_sessions[call_sid] = AIAssistant()
+        assistant = AIAssistant()
+        # Si el número ya llamó antes, se precargan sus datos
+        perfiles.precargar(assistant, from_number)
+        call_sessions[call_sid] = assistant
         logger.info(f"Nueva sesión de llamada creada: {call_sid}")
 
     return call_sessions[call_sid]
@@ -68,7 +73,7 @@ def voice_webhook():
         response = VoiceResponse()
 
         # Obtener o crear sesión
-        assistant = get_or_create_session(call_sid)
+        assistant = get_or_create_session(call_sid, from_number)
 
         # Saludo inicial
         saludo = assistant.obtener_saludo_inicial()
@@ -158,8 +163,10 @@ def process_speech():
 
         # Procesar mensaje con el asistente
         respuesta_texto = assistant.procesar_mensaje(speech_result)
+        perfiles.guardar_sesion(assistant, request.values.get('From', ''))
 
         logger.info(f"[{call_sid}] Asistente responde: {respuesta_texto[:100]}...")
+        logger.info(f"[{call_sid}] Tiempos del turno: {assistant.obtener_metricas_turno()}")
 
         # Crear respuesta de voz
         response = VoiceResponse()
@@ -15,6 +15,8 @@ import requests
 
 from .ai_assistant import AIAssistant
 from .voice_handler import VoiceHandler
+from .openai_client import obtener_cliente
+from . import perfiles
 
 # Cargar variables de entorno
 load_dotenv()
@@ -47,7 +49,10 @@ def get_or_create_session(phone_number: str) -> AIAssistant:
         Instancia de AIAssistant
     """
     if phone_number not in user_sessions:
-        user_sessions[phone_number] = AIAssistant()
+        assistant = AIAssistant()
+        # Si el número ya consultó antes, se precargan sus datos
+        perfiles.precargar(assistant, phone_number)
+        user_sessions[phone_number] = assistant
         logger.info(f"Nueva sesión creada para {phone_number}")
 
     return user_sessions[phone_number]
@@ -60,18 +65,21 @@ def clear_session(phone_number: str):
         logger.info(f"Sesión eliminada para {phone_number}")
 
 
-def get_or_create_call_session(call_sid: str) -> AIAssistant:
+def get_or_create_call_session(call_sid: str, phone_number: str = None) -> AIAssistant:
     """
     Obtiene o crea una sesión de asistente para una llamada telefónica.
 
     Args:
         call_sid: SID de la llamada de Twilio
+        phone_number: Número que llama (para precargar su perfil)
 
     Returns:
         Instancia de AIAssistant
     """
     if call_sid not in call_sessions:
-        call_sessions[call_sid] = AIAssistant()
+        assistant = AIAssistant()
+        perfiles.precargar(assistant, phone_number)
+        call_sessions[call_sid] = assistant
         logger.info(f"Nueva sesión de llamada creada para {call_sid}")
 
     return call_sessions[call_sid]
@@ -119,8 +127,7 @@ def whatsapp_webhook():
 
                 try:
                     # Convertir voz a texto usando OpenAI Whisper (mejor para audios de WhatsApp)
-                    from openai import OpenAI
-                    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+                    client = obtener_cliente()
 
                     logger.info(f"Transcribiendo audio con Whisper. Tamaño: {os.path.getsize(temp_audio_path)} bytes")
 
@@ -183,6 +190,7 @@ Puedo ayudarte con:
 
         # Procesar mensaje con el asistente
         response_text = assistant.procesar_mensaje(incoming_msg)
+        perfiles.guardar_sesion(assistant, from_number)
 
         # Enviar respuesta
         resp.message(response_text)
@@ -219,7 +227,7 @@ def voice_webhook():
         resp = VoiceResponse()
 
         # Obtener o crear sesión para esta llamada
-        assistant = get_or_create_call_session(call_sid)
+        assistant = get_or_create_call_session(call_sid, from_number)
 
         # Saludo inicial
         saludo = assistant.obtener_saludo_inicial()
@@ -292,6 +300,7 @@ def voice_gather():
 
         # Procesar mensaje con el asistente
         response_text = assistant.procesar_mensaje(speech_result)
+        perfiles.guardar_sesion(assistant, request.values.get('From', ''))
 
         # Responder al usuario
         gather = Gather(
@@ -311,6 +320,7 @@ def voice_gather():
         resp.redirect('/webhook/voice/gather')
 
         logger.info(f"Respuesta enviada en llamada {call_sid}: {response_text[:50]}...")
+        logger.info(f"Tiempos del turno en llamada {call_sid}: {assistant.obtener_metricas_turno()}")
 
         return Response(str(resp), mimetype='application/xml')
 
@@ -0,0 +1,117 @@
+"""
+Benchmark de contención de la agenda.
+
+Varios procesos (como los workers de gunicorn), cada uno con varios hilos,
+compiten por los mismos turnos: cada paciente simulado consulta los libres de
+un día, elige uno de los tres primeros (donde más se pisan), lo reserva y lo
+confirma. Al final se verifica que ningún turno se haya entregado dos veces y
+se reportan los pedidos por segundo, la latencia de reservar y los conflictos
+(turnos que otro tomó entre la consulta y la reserva).
+
+Uso:
+    python benchmarks/agenda.py [procesos] [hilos] [pacientes por hilo]
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agenda import AgendaTurnos
+
+# Los pacientes eligen entre los primeros horarios libres, como cuando se ofrecen
+HORARIOS_OFRECIDOS = 3
+
+
+def _dia_con_turnos() -> str:
+    """Próximo lunes (el día con más médicos en ESPECIALIDADES)."""
+    hoy = date.today()
+    return (hoy + timedelta(days=7 - hoy.weekday())).isoformat()
+
+
+def _paciente(agenda: AgendaTurnos, fecha: str, titular: str, azar: random.Random):
+    """Un paciente: consulta, elige, reserva y confirma. Retorna (id o None, latencia de reservar)."""
+    libres = agenda.disponibles(fecha)
+    if not libres:
+        return None, 0.0
+    elegido = azar.choice(libres[:HORARIOS_OFRECIDOS])
+    inicio = time.perf_counter()
+    turno = agenda.reservar(titular, fecha, elegido.hora, elegido.especialidad, elegido.medico)
+    latencia = time.perf_counter() - inicio
+    if turno is None or not agenda.confirmar(turno.id, titular, f"Paciente {titular}"):
+        return None, latencia
+    return turno.id, latencia
+
+
+def _worker(ruta: str, fecha: str, proceso: int, hilos: int, pacientes: int, cola):
+    agenda = AgendaTurnos(ruta)
+    agenda.generar(date.fromisoformat(fecha))
+
+    def _hilo(hilo: int):
+        azar = random.Random(proceso * 1000 + hilo)
+        return [_paciente(agenda, fecha, f"p{proceso}-h{hilo}-{n}", azar) for n in range(pacientes)]
+
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        resultados = [r for lista in ejecutor.map(_hilo, range(hilos)) for r in lista]
+    cola.put((resultados, agenda.conflictos))
+
+
+def main():
+    procesos = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    pacientes = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "agenda.db")
+        fecha = _dia_con_turnos()
+        agenda = AgendaTurnos(ruta)
+        agenda.generar(date.fromisoformat(fecha))
+        turnos_del_dia = len(agenda.disponibles(fecha))
+
+        cola = multiprocessing.Queue()
+        inicio = time.perf_counter()
+        trabajadores = [
+            multiprocessing.Process(target=_worker, args=(ruta, fecha, p, hilos, pacientes, cola))
+            for p in range(procesos)
+        ]
+        for trabajador in trabajadores:
+            trabajador.start()
+        salidas = [cola.get() for _ in trabajadores]
+        for trabajador in trabajadores:
+            trabajador.join()
+        duracion = time.perf_counter() - inicio
+
+        resultados = [r for lista, _ in salidas for r in lista]
+        conflictos = sum(c for _, c in salidas)
+        entregados = Counter(turno_id for turno_id, _ in resultados if turno_id is not None)
+        duplicados = [turno_id for turno_id, veces in entregados.items() if veces > 1]
+        confirmados_base = agenda.estadisticas()["turnos"].get("confirmado", 0)
+        latencias = sorted(latencia for turno_id, latencia in resultados if latencia)
+
+    intentos = len(resultados)
+    print("=" * 60)
+    print(f"AGENDA: {procesos} procesos x {hilos} hilos x {pacientes} pacientes = {intentos} pedidos")
+    print(f"Turnos del {fecha}: {turnos_del_dia}")
+    print("=" * 60)
+    print(f"Turnos confirmados:       {sum(entregados.values())} (en la base: {confirmados_base})")
+    print(f"Turnos entregados 2 veces: {len(duplicados)}")
+    print(f"Conflictos:               {conflictos}")
+    print(f"Pacientes sin lugar:      {sum(1 for turno_id, latencia in resultados if not latencia)}")
+    print(f"Pedidos por segundo:      {intentos / duracion:.0f}")
+    if latencias:
+        print(f"Reservar p50:             {latencias[len(latencias) // 2] * 1000:.2f} ms")
+        print(f"Reservar p99:             {latencias[int(len(latencias) * 0.99)] * 1000:.2f} ms")
+
+    assert not duplicados, f"Turnos entregados más de una vez: {duplicados}"
+    assert sum(entregados.values()) == confirmados_base, "Los confirmados no coinciden con la base"
+
+
+if __name__ == "__main__":
+    main()
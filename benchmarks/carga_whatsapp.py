@@ -0,0 +1,109 @@
+"""
+Prueba de carga del webhook de WhatsApp.
+
+Simula usuarios concurrentes que mantienen una conversación completa contra el
+bot (app.whatsapp_bot) y reporta el throughput y los percentiles de latencia.
+Pensado para correr sin red contra el backend simulado:
+
+    python -m app.backend_simulado --latencia lognormal:600:0.4
+    LLM_BACKEND=local gunicorn -w 2 --threads 16 -b 127.0.0.1:5000 app.whatsapp_bot:app
+    python benchmarks/carga_whatsapp.py --usuarios 50 --concurrencia 20
+
+Con --audio cada conversación empieza con un mensaje de voz cuyo MediaUrl
+apunta al backend simulado (se transcribe con su endpoint de transcripción).
+"""
+
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, List
+
+import requests
+
+CONVERSACION = [
+    "Hola, quiero sacar un turno",
+    "Con cardiología",
+    "Tengo obra social OSDE",
+    "Mi nombre es Juan Pérez, DNI 30123456",
+    "Mañana a la tarde si puede ser",
+    "Cuál es el horario de la clínica?",
+    "Gracias, chau",
+]
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    """Percentil p (0 a 100) de una lista ordenada."""
+    if not valores:
+        return 0.0
+    indice = min(int(len(valores) * p / 100), len(valores) - 1)
+    return valores[indice]
+
+
+def _simular_usuario(args, numero: int, latencias: List[float], errores: Dict, lock: Lock):
+    """Envía la conversación completa de un usuario, un mensaje por vez."""
+    sesion = requests.Session()
+    remitente = f"whatsapp:+54911{numero:08d}"
+    mensajes = [{"Body": texto} for texto in CONVERSACION]
+    if args.audio:
+        mensajes.insert(0, {
+            "Body": "",
+            "MediaUrl0": f"{args.backend}/media/audio_{numero}.ogg",
+            "MediaContentType0": "audio/ogg"
+        })
+
+    for datos in mensajes:
+        inicio = time.perf_counter()
+        try:
+            respuesta = sesion.post(args.url, data={"From": remitente, **datos}, timeout=args.timeout)
+            duracion = time.perf_counter() - inicio
+            ok = respuesta.status_code == 200 and "Ocurrió un error" not in respuesta.text
+        except requests.RequestException:
+            duracion = time.perf_counter() - inicio
+            ok = False
+        with lock:
+            latencias.append(duracion)
+            if not ok:
+                errores["cantidad"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del webhook de WhatsApp")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/webhook/whatsapp")
+    parser.add_argument("--backend", default="http://127.0.0.1:8089", help="Backend simulado (para los audios)")
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--audio", action="store_true", help="Empezar cada conversación con un mensaje de voz")
+    args = parser.parse_args()
+
+    latencias: List[float] = []
+    errores = {"cantidad": 0}
+    lock = Lock()
+
+    print("=" * 60)
+    print(f"CARGA: {args.usuarios} usuarios, concurrencia {args.concurrencia}")
+    print("=" * 60)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as ejecutor:
+        for numero in range(args.usuarios):
+            ejecutor.submit(_simular_usuario, args, numero, latencias, errores, lock)
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    print(f"Mensajes enviados: {len(latencias)} ({errores['cantidad']} con error)")
+    print(f"Duración:          {duracion:.1f} s")
+    print(f"Throughput:        {len(latencias) / duracion:.1f} mensajes/s")
+    print(f"Latencia p50:      {_percentil(latencias, 50) * 1000:.0f} ms")
+    print(f"Latencia p95:      {_percentil(latencias, 95) * 1000:.0f} ms")
+    print(f"Latencia p99:      {_percentil(latencias, 99) * 1000:.0f} ms")
+
+    try:
+        print(f"Backend:           {requests.get(f'{args.backend}/estadisticas', timeout=5).json()}")
+    except requests.RequestException:
+        pass
+
+
+if __name__ == "__main__":
+    main()
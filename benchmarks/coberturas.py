@@ -0,0 +1,194 @@
+"""
+Benchmark del índice de coberturas.
+
+Arma un catálogo realista de obras sociales y prepagas argentinas (más de 300,
+como el padrón real) y compara el índice contra la búsqueda lineal por
+subcadenas que usaba verificar_cobertura: aciertos sobre consultas con
+acentos, planes, siglas deletreadas y errores de transcripción, falsos
+positivos sobre coberturas que no están en el catálogo y tiempo por consulta.
+
+Uso:
+    python benchmarks/coberturas.py [repeticiones]
+"""
+
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.indice_coberturas import IndiceCoberturas, UMBRAL_COBERTURA
+
+PREPAGAS = [
+    "OSDE", "Swiss Medical", "Galeno", "Medifé", "Sancor Salud", "Accord Salud",
+    "Prevención Salud", "Omint", "Medicus", "Hospital Italiano Plan de Salud",
+    "Hospital Alemán Plan Médico", "Hospital Británico Plan de Salud", "Avalian",
+    "Federada Salud", "Jerárquicos Salud", "Luis Pasteur", "Premedic", "Boreal Salud",
+    "Docthos", "Bristol Medicine", "Medical's", "Hominis", "Cemic", "Sanatorio Güemes Plan",
+    "Staff Médico", "Prestar Salud", "Corporación Asistencial", "Integral Salud",
+    "Nobis Salud", "Emergencia Médica Integral", "Medife Plus", "Qualitas Salud",
+    "Ospedyc Salud", "Salud Total", "Consolidar Salud", "Medicina Esencial",
+    "Fundación Médica de Mar del Plata", "Círculo Médico de Salta", "Sipssa",
+    "Amffa Salud", "Asistencial Médica Sur", "Vida Salud", "Plan de Salud Austral",
+]
+
+OBRAS_SOCIALES = [
+    "PAMI", "IOMA", "OSECAC", "OSPEDYC", "OSDEPYM", "UOM", "OSPRERA", "OSPE", "OSUTHGRA",
+    "OSPACP", "OSPIM", "OSPJN", "OSPLAD", "OSPECON", "OSMATA", "OSPIA", "OSDIPP",
+    "OSFATLYF", "OSPSA", "OSTEL", "OSPAGA", "OSSEG", "OSPRA", "OSPIT", "OSPIL",
+    "OSCHOCA", "OSDOP", "OSPEP", "OSPIC", "OSPATCA", "OSBA", "OSMEDICA", "OSPM",
+    "OSPAT", "OSPEGAP", "OSPERYH", "OSPIQYP", "OSPIV", "OSJERA", "OSMITA", "OSPAV",
+    "OSPCRA", "OSPEDICA", "OSPESGA", "OSPIF", "OSSACRA", "OSTCARA", "OSAPM", "OSCOMM",
+    "OSETYA", "OSFFENTOS", "OSPAMOZ", "OSPETAX", "OSPIHMP", "OSPIMA", "OSPOCE",
+    "OSPSIP", "OSUNLAR", "OSYAC", "OSAP", "OSCRAIA", "OSEIV", "OSFGPICD", "OSGA",
+    "OSIAD", "OSMMEDT", "OSPACA", "OSPAÑA", "OSPDESCA", "OSPECA", "OSPEVIC", "OSPICA",
+    "OSPIHP", "OSPITDFS", "OSPMA", "OSPRO", "OSPTV", "OSPUAYE", "OSSIMRA", "OSTES",
+    "IOSFA", "IPROSS", "IOSPER", "IAPOS", "APROSS", "OSEP Mendoza", "IPS Salta", "DOSEP",
+    "SEMPRE", "ISSN", "IOSCOR", "INSSSEP", "IPAUSS", "OSEF", "DOSEM", "IASEP", "ISJ",
+    "IOSEP", "SEROS", "OSEP Catamarca", "IPSST", "DOS San Juan", "ISSyS", "OSEP La Rioja",
+    "Obra Social Bancaria Argentina", "Obra Social de Actores", "Obra Social de Músicos",
+    "Obra Social del Poder Judicial", "Dirección de Ayuda Social del Congreso",
+    "Obra Social Ferroviaria", "Obra Social de Farmacéuticos", "Obra Social Aeronavegantes",
+    "Obra Social de Conductores de Taxis", "Obra Social de Camioneros", "Luz y Fuerza",
+    "Unión Personal", "Obra Social Docente", "Obra Social Universitaria", "DOSUBA",
+    "Obra Social de Periodistas", "Obra Social de Empleados Públicos", "Policía Federal",
+    "Obra Social de Petroleros", "Obra Social Portuarios", "Obra Social Marítimos",
+]
+
+# Sectores de las obras sociales sindicales ("Obra Social del Personal de ...")
+SECTORES = [
+    "la Industria del Vidrio", "la Industria Textil", "la Industria del Papel",
+    "la Industria Química", "la Industria del Plástico", "la Industria de la Carne",
+    "la Industria Lechera", "la Industria Maderera", "la Industria del Calzado",
+    "la Industria Gráfica", "la Industria del Tabaco", "la Industria Aceitera",
+    "la Industria Azucarera", "la Industria Fideera", "la Industria Molinera",
+    "la Industria Cervecera", "la Industria del Fósforo", "la Industria Perfumista",
+    "la Industria del Cuero", "la Industria Metalúrgica", "la Industria Naval",
+    "la Industria Vitivinícola", "la Industria del Caucho", "la Industria Cinematográfica",
+    "la Construcción", "Comercio", "Seguros", "Bancos", "la Sanidad", "Aduana",
+    "Correos", "Telecomunicaciones", "Farmacia", "Entidades Deportivas", "Hoteles",
+    "Gastronomía", "Peluquerías", "Panaderías", "Pasteleros", "Heladeros", "Molineros",
+    "Viajantes", "Vendedores Ambulantes", "Guardavidas", "Seguridad Privada", "Maestranza",
+    "Edificios de Renta", "Encargados de Edificios", "Estaciones de Servicio", "Cementerios",
+    "Agua y Saneamiento", "Gas", "Electricidad", "Minería", "Petróleo", "Puertos",
+    "Aeronáuticos", "Ferroviarios", "Transporte de Pasajeros", "Recolección de Residuos",
+    "Limpieza", "Prensa", "Radio y Televisión", "Publicidad", "Espectáculos Públicos",
+    "Casinos", "Hipódromos", "Clubes de Campo", "Actividad Rural", "Fruticultura",
+    "Tareas Rurales", "Floricultores", "Avicultura", "Pesca", "Frigoríficos", "Supermercados",
+    "Mensajería", "Call Centers", "Informática", "Escribanías", "Martilleros",
+]
+PREFIJOS_SINDICALES = ["Obra Social del Personal de", "Obra Social de Trabajadores de", "Obra Social de Empleados de"]
+
+# (consulta como la dicta o escribe el paciente, cobertura esperada)
+CONSULTAS: List[Tuple[str, Optional[str]]] = [
+    ("OSDE", "OSDE"), ("osde 210", "OSDE"), ("OSDE 410", "OSDE"), ("o s d e", "OSDE"),
+    ("Medife", "Medifé"), ("medifé", "Medifé"), ("MEDIFE", "Medifé"),
+    ("swiss medical", "Swiss Medical"), ("swis medical", "Swiss Medical"), ("swiss medical smg20", "Swiss Medical"),
+    ("galeno oro", "Galeno"), ("galeno plata 220", "Galeno"), ("galenno", "Galeno"),
+    ("sancor salud", "Sancor Salud"), ("sancor salu", "Sancor Salud"),
+    ("prevencion salud", "Prevención Salud"), ("prevension salud", "Prevención Salud"),
+    ("omint", "Omint"), ("ommint", "Omint"), ("medicus", "Medicus"), ("medicus azul", "Medicus"),
+    ("hospital italiano", "Hospital Italiano Plan de Salud"), ("plan de salud del hospital italiano", "Hospital Italiano Plan de Salud"),
+    ("hospital aleman", "Hospital Alemán Plan Médico"), ("hospital britanico", "Hospital Británico Plan de Salud"),
+    ("avalian", "Avalian"), ("abalian", "Avalian"), ("federada", "Federada Salud"),
+    ("jerarquicos", "Jerárquicos Salud"), ("luis pasteur", "Luis Pasteur"),
+    ("pami", "PAMI"), ("ioma", "IOMA"), ("i o m a", "IOMA"), ("osecac", "OSECAC"), ("osecak", "OSECAC"),
+    ("osprera", "OSPRERA"), ("ospedyc", "OSPEDYC"), ("osdepym", "OSDEPYM"), ("uom", "UOM"),
+    ("osuthgra", "OSUTHGRA"), ("ospjn", "OSPJN"), ("osplad", "OSPLAD"), ("iosfa", "IOSFA"),
+    ("apross", "APROSS"), ("aprosss", "APROSS"), ("iapos", "IAPOS"), ("iosper", "IOSPER"),
+    ("ips salta", "IPS Salta"), ("osep mendoza", "OSEP Mendoza"), ("osep catamarca", "OSEP Catamarca"),
+    ("obra social bancaria", "Obra Social Bancaria Argentina"), ("bancaria", "Obra Social Bancaria Argentina"),
+    ("obra social de actores", "Obra Social de Actores"), ("la de camioneros", "Obra Social de Camioneros"),
+    ("luz y fuerza", "Luz y Fuerza"), ("union personal", "Unión Personal"), ("dosuba", "DOSUBA"),
+    ("obra social del personal de la industria del vidrio", "Obra Social del Personal de la Industria del Vidrio"),
+    ("personal de la industria textil", "Obra Social del Personal de la Industria Textil"),
+    ("obra social de trabajadores de gastronomia", "Obra Social de Trabajadores de Gastronomía"),
+    ("obra social de empleados de call centers", "Obra Social de Empleados de Call Centers"),
+    ("obra social del personal de la industria lechera", "Obra Social del Personal de la Industria Lechera"),
+    ("obra social del personal de hipodromos", "Obra Social del Personal de Hipódromos"),
+    # Coberturas que no están en el catálogo
+    ("particular", None), ("no tengo", None), ("salud", None), ("medicina prepaga", None),
+    ("obra social", None), ("osdi", None), ("swiss re", None), ("ioma la plata", "IOMA"),
+    ("sanitas", None), ("mapfre", None), ("allianz", None), ("la caja", None), ("banco nacion", None),
+]
+
+
+def catalogo() -> List[Tuple[str, str]]:
+    """Coberturas reales más las obras sociales sindicales por sector."""
+    coberturas = [(nombre, "prepaga") for nombre in PREPAGAS]
+    coberturas += [(nombre, "obra social") for nombre in OBRAS_SOCIALES]
+    # Todos los sectores tienen la del personal; algunos también la de trabajadores o empleados
+    coberturas += [
+        (f"{prefijo} {sector}", "obra social")
+        for numero, sector in enumerate(SECTORES)
+        for prefijo in PREFIJOS_SINDICALES[:1 + numero % 3]
+    ]
+    return coberturas
+
+
+def verificar_lineal(coberturas: List[Tuple[str, str]], consulta: str) -> Optional[str]:
+    """La búsqueda anterior: subcadena en los dos sentidos, en orden de catálogo."""
+    consulta_upper = consulta.upper()
+    for nombre, _ in coberturas:
+        if nombre.upper() in consulta_upper or consulta_upper in nombre.upper():
+            return nombre
+    return None
+
+
+def verificar_indice(indice: IndiceCoberturas, consulta: str) -> Optional[str]:
+    resultado = indice.buscar(consulta)
+    if resultado is None or resultado.puntaje < UMBRAL_COBERTURA:
+        return None
+    return resultado.nombre
+
+
+def _evaluar(nombre: str, buscar, repeticiones: int):
+    aciertos = falsos_positivos = 0
+    errores = []
+    for consulta, esperado in CONSULTAS:
+        obtenido = buscar(consulta)
+        if obtenido == esperado:
+            aciertos += 1
+        else:
+            if obtenido is not None and esperado is None:
+                falsos_positivos += 1
+            errores.append((consulta, esperado, obtenido))
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for consulta, _ in CONSULTAS:
+            buscar(consulta)
+    microsegundos = (time.perf_counter() - inicio) / (repeticiones * len(CONSULTAS)) * 1_000_000
+
+    print(f"\n{nombre}")
+    print(f"  Aciertos:          {aciertos}/{len(CONSULTAS)} ({aciertos / len(CONSULTAS):.1%})")
+    print(f"  Falsos positivos:  {falsos_positivos}")
+    print(f"  Tiempo promedio:   {microsegundos:.1f} µs")
+    return errores
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    coberturas = catalogo()
+    nombres = {nombre for nombre, _ in coberturas}
+    faltantes = [esperado for _, esperado in CONSULTAS if esperado is not None and esperado not in nombres]
+    assert not faltantes, f"Consultas con coberturas fuera del catálogo: {faltantes}"
+
+    inicio = time.perf_counter()
+    indice = IndiceCoberturas(coberturas)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    print("=" * 60)
+    print(f"COBERTURAS: {len(coberturas)} en el catálogo, {len(CONSULTAS)} consultas")
+    print(f"Construcción del índice: {construccion_ms:.1f} ms")
+    print("=" * 60)
+
+    _evaluar("Búsqueda lineal por subcadenas", lambda c: verificar_lineal(coberturas, c), repeticiones)
+    errores = _evaluar("Índice", lambda c: verificar_indice(indice, c), repeticiones)
+    for consulta, esperado, obtenido in errores:
+        print(f"    {consulta!r}: esperado {esperado!r}, obtenido {obtenido!r} ({indice.buscar(consulta)})")
+
+
+if __name__ == "__main__":
+    main()
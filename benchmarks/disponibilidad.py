@@ -0,0 +1,144 @@
+"""
+Benchmark del motor de disponibilidad.
+
+Arma una red de 500 médicos en 25 especialidades con días y horarios variados,
+90 días de agenda con feriados y una ocupación de entre 30% y 95% según la
+especialidad (una completa hasta la última semana), y mide:
+- construcción de las plantillas semanales y carga de los turnos tomados
+- "próximos N turnos libres" por especialidad (p50, p99 y máximo)
+- actualización incremental al reservar y cancelar
+- la misma consulta en SQLite con índice por especialidad y fecha, como referencia
+
+Uso:
+    python benchmarks/disponibilidad.py [médicos] [días] [repeticiones]
+"""
+
+import os
+import sys
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.disponibilidad import MotorDisponibilidad
+
+DURACION = 30
+CANTIDAD = 10
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+HORARIOS = ["8:00 a 13:00", "9:00 a 14:00", "14:00 a 20:00", "10:00 a 18:00", "8:00 a 12:00 y 15:00 a 19:00", "9:00 a 12:00"]
+
+
+def red_de_medicos(medicos: int, azar: random.Random):
+    """ESPECIALIDADES sintéticas: 25 especialidades con los médicos repartidos."""
+    especialidades = {f"especialidad_{i:02d}": {"nombre": f"Especialidad {i}", "medicos": []} for i in range(25)}
+    claves = list(especialidades)
+    for i in range(medicos):
+        especialidades[claves[i % len(claves)]]["medicos"].append({
+            "nombre": f"Dr. Médico {i:03d}",
+            "dias": azar.sample(DIAS[:5], azar.randint(2, 4)) + (["Sábado"] if azar.random() < 0.1 else []),
+            "horario": azar.choice(HORARIOS),
+        })
+    return especialidades
+
+
+def _percentil(valores, p):
+    return valores[min(int(len(valores) * p), len(valores) - 1)]
+
+
+def main():
+    medicos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    dias = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+    repeticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    azar = random.Random(7)
+    especialidades = red_de_medicos(medicos, azar)
+    hoy = date.today()
+    feriados = [(hoy + timedelta(days=d)).isoformat() for d in (11, 40, 73)]
+
+    inicio = time.perf_counter()
+    motor = MotorDisponibilidad(especialidades, DURACION, feriados)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    # Ocupación por especialidad: algunas casi completas para forzar búsquedas
+    # largas, y la última completa salvo la última semana (el peor caso)
+    ocupacion = {clave: 0.3 + 0.65 * i / 24 for i, clave in enumerate(especialidades)}
+    completa = list(especialidades)[-1]
+    ultima_semana = (hoy + timedelta(days=dias - 7)).isoformat()
+    turnos = list(motor.plantilla(hoy, dias))
+    tomados = [
+        t for t in turnos
+        if (t[0] == completa and t[2] < ultima_semana) or azar.random() < ocupacion[t[0]]
+    ]
+
+    inicio = time.perf_counter()
+    for _, medico, fecha, hora in tomados:
+        motor.ocupar(medico, fecha, hora)
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    # Referencia: la misma agenda en SQLite
+    conexion = sqlite3.connect(":memory:")
+    conexion.execute(
+        "CREATE TABLE turnos (id INTEGER PRIMARY KEY, especialidad TEXT, medico TEXT, fecha TEXT, hora TEXT, "
+        "estado TEXT DEFAULT 'libre', UNIQUE (medico, fecha, hora))"
+    )
+    conexion.execute("CREATE INDEX turnos_especialidad ON turnos (especialidad, fecha, hora)")
+    conexion.executemany("INSERT INTO turnos (especialidad, medico, fecha, hora) VALUES (?, ?, ?, ?)", turnos)
+    conexion.executemany(
+        "UPDATE turnos SET estado = 'confirmado' WHERE medico = ? AND fecha = ? AND hora = ?",
+        [(medico, fecha, hora) for _, medico, fecha, hora in tomados]
+    )
+    conexion.commit()
+
+    desde = datetime.combine(hoy, datetime.min.time()).replace(hour=8)
+    tiempos_motor, tiempos_sql = [], []
+    coincidencias = 0
+    for clave in especialidades:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = motor.proximos(clave, CANTIDAD, desde, dias)
+            tiempos_motor.append((time.perf_counter() - inicio) * 1000)
+
+            inicio = time.perf_counter()
+            filas = conexion.execute(
+                "SELECT fecha, hora, medico FROM turnos WHERE especialidad = ? AND estado = 'libre' "
+                "AND (fecha > ? OR (fecha = ? AND hora > ?)) ORDER BY fecha, hora, id LIMIT ?",
+                (clave, hoy.isoformat(), hoy.isoformat(), desde.strftime("%H:%M"), CANTIDAD)
+            ).fetchall()
+            tiempos_sql.append((time.perf_counter() - inicio) * 1000)
+        coincidencias += [(h.fecha, h.hora) for h in resultado] == [(f, h) for f, h, _ in filas]
+
+    # Actualización incremental: reservar y liberar el primer turno libre
+    huecos = [motor.proximos(clave, 1, desde, dias)[0] for clave in especialidades]
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for hueco in huecos:
+            motor.ocupar(hueco.medico, hueco.fecha, hueco.hora)
+            motor.liberar(hueco.medico, hueco.fecha, hueco.hora)
+    actualizacion_us = (time.perf_counter() - inicio) / (repeticiones * len(huecos) * 2) * 1_000_000
+
+    inicio = time.perf_counter()
+    motor.proximos(completa, CANTIDAD, desde, dias)
+    peor_caso_ms = (time.perf_counter() - inicio) * 1000
+
+    tiempos_motor.sort()
+    tiempos_sql.sort()
+    print("=" * 60)
+    print(f"DISPONIBILIDAD: {len(motor)} médicos, {dias} días, {len(turnos)} turnos "
+          f"({len(tomados) / len(turnos):.0%} ocupados)")
+    print("=" * 60)
+    print(f"Construcción de plantillas:  {construccion_ms:.1f} ms")
+    print(f"Carga de turnos tomados:     {carga_ms:.1f} ms ({len(tomados)} turnos)")
+    print(f"Actualización incremental:   {actualizacion_us:.1f} µs por reserva o cancelación")
+    print(f"Próximos {CANTIDAD} turnos (motor):  p50 {_percentil(tiempos_motor, 0.5):.3f} ms, "
+          f"p99 {_percentil(tiempos_motor, 0.99):.3f} ms, máx {tiempos_motor[-1]:.3f} ms")
+    print(f"Próximos {CANTIDAD} turnos (SQLite): p50 {_percentil(tiempos_sql, 0.5):.3f} ms, "
+          f"p99 {_percentil(tiempos_sql, 0.99):.3f} ms, máx {tiempos_sql[-1]:.3f} ms")
+    print(f"Especialidad completa:       {peor_caso_ms:.3f} ms (recorre {dias - 7} días sin lugar)")
+    print(f"Mismo resultado que SQLite:  {coincidencias}/{len(especialidades)} especialidades")
+
+
+if __name__ == "__main__":
+    main()
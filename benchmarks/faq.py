@@ -0,0 +1,185 @@
+"""
+Benchmark del buscador de FAQs.
+
+Arma una base de conocimiento multi-sede (cada tema de FAQ repetido por sede,
+varios miles de entradas) y compara el buscador BM25 contra el recorrido de
+palabras clave que usaba buscar_faq (la primera FAQ con alguna palabra clave
+contenida en la consulta): aciertos en el primer lugar y entre los tres
+primeros, tiempo de construcción y tiempo por consulta.
+
+Uso:
+    python benchmarks/faq.py [sedes] [repeticiones]
+"""
+
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.buscador_faq import BuscadorFAQ
+from config.datos_clinica import PALABRAS_VACIAS_FAQ
+from config.texto import normalizar_texto
+
+SEDES = [
+    "Palermo", "Belgrano", "Caballito", "Recoleta", "Flores", "Almagro", "Villa Urquiza",
+    "Núñez", "Saavedra", "Villa Crespo", "Devoto", "Boedo", "Barracas", "San Telmo",
+    "Monserrat", "Retiro", "Colegiales", "Chacarita", "Liniers", "Mataderos", "Floresta",
+    "Villa Luro", "Parque Chacabuco", "Parque Patricios", "Pompeya", "Constitución",
+    "Balvanera", "San Cristóbal", "Agronomía", "Coghlan", "Villa Ortúzar", "Paternal",
+    "Villa del Parque", "Versalles", "Vélez Sarsfield", "Villa Lugano", "Villa Soldati",
+    "Puerto Madero", "San Nicolás", "Montserrat Sur", "Avellaneda", "Lanús", "Lomas de Zamora",
+    "Quilmes", "Bernal", "Banfield", "Adrogué", "Temperley", "Morón", "Haedo", "Ramos Mejía",
+    "San Justo", "Castelar", "Ituzaingó", "Merlo", "Moreno", "San Miguel", "José C. Paz",
+    "Pilar", "Escobar", "Tigre", "San Isidro", "Martínez", "Olivos", "Vicente López",
+    "Florida", "Munro", "San Martín", "Caseros", "Villa Ballester", "La Plata", "City Bell",
+    "Berazategui", "Florencio Varela", "Ezeiza", "Canning", "Rosario", "Córdoba", "Mendoza",
+    "Mar del Plata", "Neuquén", "Salta", "Tucumán", "Santa Fe", "Paraná",
+]
+
+# (clave, pregunta, respuesta, alias, palabras clave del recorrido anterior)
+TEMAS = [
+    ("como_llegar", "¿Cómo llegar a la sede {sede}?", "La sede {sede} queda sobre la avenida principal. Llegan los colectivos de la zona y hay una estación de tren a pocas cuadras.", ["direccion", "ubicacion", "donde queda", "colectivo", "tren"], ["llegar", "donde", "direccion"]),
+    ("estacionamiento", "¿La sede {sede} tiene estacionamiento?", "La sede {sede} cuenta con estacionamiento propio sin cargo para pacientes durante la consulta.", ["cochera", "estacionar", "auto"], ["estacionamiento", "cochera"]),
+    ("horarios", "¿Cuál es el horario de atención de la sede {sede}?", "La sede {sede} atiende de lunes a viernes de 8 a 20 y los sábados de 8 a 13.", ["horario", "abren", "cierran", "sabados"], ["horario", "abren"]),
+    ("retirar_resultados", "¿Cómo retiro resultados de estudios en la sede {sede}?", "Los resultados se retiran en la recepción de la sede {sede} con DNI o se reciben por email en 48 horas.", ["resultados", "retirar", "estudios", "analisis"], ["resultados", "retirar"]),
+    ("laboratorio", "¿Qué horario tiene el laboratorio de la sede {sede}?", "El laboratorio de la sede {sede} extrae sangre de lunes a sábado de 7 a 10 con ayuno de 8 horas.", ["extraccion", "sangre", "ayuno"], ["laboratorio", "sangre"]),
+    ("formas_pago", "¿Qué formas de pago aceptan en la sede {sede}?", "En la sede {sede} aceptamos efectivo, tarjetas de débito y crédito, transferencias y Mercado Pago.", ["pago", "tarjeta", "efectivo", "transferencia", "cuotas"], ["pago", "tarjeta"]),
+    ("precio_consulta", "¿Cuánto cuesta la consulta particular en la sede {sede}?", "La consulta particular en la sede {sede} tiene un valor fijo que se informa al sacar el turno.", ["precio", "costo", "valor", "cuesta", "arancel"], ["precio", "costo"]),
+    ("coberturas", "¿Qué obras sociales atienden en la sede {sede}?", "La sede {sede} trabaja con las principales obras sociales y prepagas. Consulte su plan en recepción.", ["obra social", "prepaga", "cobertura", "plan"], ["obra social", "prepaga"]),
+    ("primera_vez", "¿Qué debo llevar la primera vez a la sede {sede}?", "Para su primera consulta en la sede {sede} traiga DNI, credencial y estudios previos.", ["primera vez", "llevar", "traer", "nuevo paciente"], ["primera vez", "llevar"]),
+    ("cancelar_turno", "¿Cómo cancelo un turno en la sede {sede}?", "Para cancelar o reprogramar un turno de la sede {sede} avise con 24 horas de anticipación.", ["cancelar", "reagendar", "reprogramar", "cambiar turno"], ["cancelar", "reagendar"]),
+    ("recetas", "¿Puedo pedir recetas en la sede {sede}?", "Las recetas de la sede {sede} se renuevan por WhatsApp para pacientes regulares y se retiran en 48 horas.", ["receta", "medicacion", "renovar"], ["receta"]),
+    ("certificados", "¿Cómo pido un certificado médico en la sede {sede}?", "Los certificados médicos de la sede {sede} se emiten en la consulta con el profesional.", ["certificado", "apto fisico", "constancia"], ["certificado"]),
+    ("vacunacion", "¿La sede {sede} tiene vacunatorio?", "El vacunatorio de la sede {sede} aplica calendario oficial y vacuna antigripal sin turno.", ["vacuna", "vacunatorio", "antigripal"], ["vacuna"]),
+    ("guardia", "¿La sede {sede} tiene guardia?", "La sede {sede} no tiene guardia. Ante una urgencia acuda al hospital más cercano.", ["urgencia", "emergencia", "guardia"], ["guardia", "urgencia"]),
+    ("accesibilidad", "¿La sede {sede} es accesible para sillas de ruedas?", "La sede {sede} tiene rampa de acceso, ascensor y baños adaptados.", ["rampa", "silla de ruedas", "ascensor", "discapacidad"], ["rampa", "ascensor"]),
+    ("telemedicina", "¿La sede {sede} ofrece consultas por videollamada?", "Los profesionales de la sede {sede} atienden por videollamada con turno previo.", ["videollamada", "virtual", "telemedicina", "online"], ["virtual", "videollamada"]),
+    ("pediatria", "¿Hay pediatras en la sede {sede}?", "La sede {sede} tiene consultorios de pediatría con turnos de mañana y tarde.", ["pediatra", "pediatria", "chicos", "niños"], ["pediatra"]),
+    ("imagenes", "¿Hacen radiografías y ecografías en la sede {sede}?", "El servicio de diagnóstico por imágenes de la sede {sede} hace radiografías, ecografías y mamografías.", ["radiografia", "ecografia", "mamografia", "imagenes"], ["radiografia", "ecografia"]),
+    ("kinesiologia", "¿La sede {sede} tiene kinesiología?", "La sede {sede} cuenta con kinesiología y rehabilitación con orden médica.", ["kinesiologo", "rehabilitacion", "sesiones"], ["kinesiologia"]),
+    ("odontologia", "¿Hay odontología en la sede {sede}?", "La sede {sede} atiende odontología general y ortodoncia.", ["dentista", "odontologo", "ortodoncia", "muelas"], ["dentista", "odontologia"]),
+    ("wifi", "¿La sala de espera de la sede {sede} tiene wifi?", "La sala de espera de la sede {sede} tiene wifi gratuito para pacientes.", ["wifi", "internet"], ["wifi"]),
+    ("acompanantes", "¿Puedo ir con un acompañante a la sede {sede}?", "En la sede {sede} se permite un acompañante por paciente.", ["acompañante", "acompañar", "familiar"], ["acompañante"]),
+    ("historia_clinica", "¿Cómo pido mi historia clínica en la sede {sede}?", "La copia de la historia clínica de la sede {sede} se solicita por escrito y se entrega en 10 días hábiles.", ["historia clinica", "copia", "legajo"], ["historia clinica"]),
+    ("factura", "¿Me dan factura en la sede {sede}?", "La sede {sede} emite factura electrónica por cada consulta particular.", ["factura", "comprobante", "recibo"], ["factura"]),
+    ("autorizaciones", "¿Cómo autorizo una práctica en la sede {sede}?", "Las autorizaciones de prácticas en la sede {sede} se gestionan en recepción con la orden médica.", ["autorizacion", "autorizar", "orden medica"], ["autorizacion"]),
+]
+
+# (consulta, tema esperado) en la sede de la consulta
+CONSULTAS = [
+    ("como llego a la sede de {sede}", "como_llegar"),
+    ("donde queda la clinica de {sede}", "como_llegar"),
+    ("en {sede} tienen cochera?", "estacionamiento"),
+    ("se puede estacionar el auto en {sede}", "estacionamiento"),
+    ("a que hora abren en {sede}", "horarios"),
+    ("horario de atencion de {sede} los sabados", "horarios"),
+    ("quiero retirar los resultados de mis estudios en {sede}", "retirar_resultados"),
+    ("hasta que hora hacen extraccion de sangre en {sede}", "laboratorio"),
+    ("necesito ir en ayuno al laboratorio de {sede}?", "laboratorio"),
+    ("puedo pagar con tarjeta de credito en {sede}", "formas_pago"),
+    ("cuanto cuesta una consulta particular en {sede}", "precio_consulta"),
+    ("que prepagas aceptan en {sede}", "coberturas"),
+    ("que tengo que llevar la primera vez a {sede}", "primera_vez"),
+    ("quiero cancelar mi turno de {sede}", "cancelar_turno"),
+    ("necesito reprogramar el turno en {sede}", "cancelar_turno"),
+    ("puedo renovar una receta en {sede}", "recetas"),
+    ("necesito un certificado de apto fisico en {sede}", "certificados"),
+    ("dan la vacuna antigripal en {sede}", "vacunacion"),
+    ("hay guardia en {sede}?", "guardia"),
+    ("en {sede} hay rampa para silla de ruedas", "accesibilidad"),
+    ("atienden por videollamada en {sede}", "telemedicina"),
+    ("hay pediatra para chicos en {sede}", "pediatria"),
+    ("hacen ecografias en {sede}", "imagenes"),
+    ("en {sede} tienen kinesiologo?", "kinesiologia"),
+    ("hay dentista en {sede}", "odontologia"),
+    ("tienen wifi en la sala de espera de {sede}", "wifi"),
+    ("puedo ir acompañado por un familiar a {sede}", "acompanantes"),
+    ("como pido una copia de mi historia clinica en {sede}", "historia_clinica"),
+    ("me dan factura en {sede}?", "factura"),
+    ("como autorizo la orden medica en {sede}", "autorizaciones"),
+]
+
+
+def _clave(sede: str, tema: str) -> str:
+    return f"{normalizar_texto(sede).replace(' ', '_')}:{tema}"
+
+
+def base_conocimiento(sedes: List[str]) -> Tuple[Dict[str, Dict], Dict[str, List[str]], Dict[str, List[str]]]:
+    """FAQs, alias y palabras clave (recorrido anterior) de todas las sedes."""
+    faqs, alias, palabras_clave = {}, {}, {}
+    for sede in sedes:
+        for tema, pregunta, respuesta, sinonimos, claves in TEMAS:
+            clave = _clave(sede, tema)
+            faqs[clave] = {"pregunta": pregunta.format(sede=sede), "respuesta": respuesta.format(sede=sede)}
+            alias[clave] = sinonimos + [sede]
+            palabras_clave[clave] = claves + [normalizar_texto(sede)]
+    return faqs, alias, palabras_clave
+
+
+def buscar_recorrido(palabras_clave: Dict[str, List[str]], consulta: str) -> Optional[str]:
+    """El algoritmo anterior de buscar_faq: la primera FAQ con alguna palabra clave en la consulta."""
+    consulta_lower = consulta.lower()
+    for clave, palabras in palabras_clave.items():
+        if any(palabra in consulta_lower for palabra in palabras):
+            return clave
+    return None
+
+
+def _evaluar(nombre: str, buscar, consultas: List[Tuple[str, str]], repeticiones: int):
+    primeros = entre_tres = 0
+    for consulta, esperado in consultas:
+        ranking = buscar(consulta)
+        if ranking and ranking[0] == esperado:
+            primeros += 1
+        if esperado in ranking[:3]:
+            entre_tres += 1
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for consulta, _ in consultas:
+            buscar(consulta)
+    por_consulta = (time.perf_counter() - inicio) / (repeticiones * len(consultas)) * 1_000_000
+
+    print(f"{nombre}:")
+    print(f"  Acierto en el primer lugar: {primeros / len(consultas):.1%}")
+    print(f"  Acierto entre los 3 primeros: {entre_tres / len(consultas):.1%}")
+    print(f"  Tiempo por consulta: {por_consulta:.1f} µs")
+
+
+def main():
+    cantidad_sedes = int(sys.argv[1]) if len(sys.argv) > 1 else len(SEDES)
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    # Sedes adicionales numeradas para escalar la base más allá de la lista
+    sedes = [SEDES[i % len(SEDES)] + (f" {i // len(SEDES) + 1}" if i >= len(SEDES) else "")
+             for i in range(cantidad_sedes)]
+    faqs, alias, palabras_clave = base_conocimiento(sedes)
+
+    azar = random.Random(42)
+    consultas = []
+    for plantilla, tema in CONSULTAS:
+        for sede in azar.sample(sedes, min(5, len(sedes))):
+            consultas.append((plantilla.format(sede=sede), _clave(sede, tema)))
+
+    inicio = time.perf_counter()
+    buscador = BuscadorFAQ(faqs, alias, PALABRAS_VACIAS_FAQ)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    print("=" * 60)
+    print(f"FAQS: {len(faqs)} entradas ({len(sedes)} sedes x {len(TEMAS)} temas), {len(consultas)} consultas")
+    print(f"Construcción del buscador: {construccion_ms:.1f} ms")
+    print("=" * 60)
+
+    def recorrido(consulta):
+        clave = buscar_recorrido(palabras_clave, consulta)
+        return [clave] if clave else []
+
+    _evaluar("Recorrido de palabras clave", recorrido, consultas, repeticiones)
+    _evaluar("Buscador BM25", lambda c: [r.clave for r in buscador.buscar(c)], consultas, repeticiones)
+
+
+if __name__ == "__main__":
+    main()
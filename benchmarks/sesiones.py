@@ -0,0 +1,84 @@
+"""
+Benchmark de memoria por sesión.
+
+Crea N sesiones de AIAssistant, simula algunos turnos en cada una (sin llamar
+a OpenAI) y reporta los bytes por sesión medidos con tracemalloc. También
+compara el tamaño de los datos del paciente y de los mensajes contra su
+versión en diccionarios.
+
+Uso:
+    python benchmarks/sesiones.py [sesiones] [turnos]
+"""
+
+import os
+import sys
+import time
+import logging
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# El cliente de OpenAI se crea aunque no se hagan llamadas
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+logging.disable(logging.WARNING)
+
+from app.ai_assistant import AIAssistant
+from app.sesion import CAMPOS_PACIENTE, DatosPaciente, crear_mensaje
+
+MENSAJES = [
+    ("Hola, quiero sacar un turno", "¡Hola! Con gusto. ¿Para qué especialidad?"),
+    ("Cardiología, tengo OSDE", "Perfecto, trabajamos con OSDE. ¿Me dice su nombre completo?"),
+    ("Juan Pérez, DNI 30123456", "Gracias Juan. ¿Qué día le queda mejor?"),
+]
+
+
+def _medir(crear, cantidad: int):
+    """Retorna (objetos, bytes por objeto) de crear `cantidad` objetos."""
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    objetos = [crear(i) for i in range(cantidad)]
+    despues = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in despues.compare_to(antes, "filename"))
+    return objetos, total / cantidad
+
+
+def _sesion(turnos: int):
+    """Crea una sesión y le simula turnos sin llamar al modelo."""
+    def crear(i: int) -> AIAssistant:
+        asistente = AIAssistant(modo_combinado=False)
+        for t in range(turnos):
+            usuario, respuesta = MENSAJES[t % len(MENSAJES)]
+            inicio = time.perf_counter()
+            asistente._iniciar_turno(f"{usuario} ({i})")
+            asistente._cerrar_turno(usuario, respuesta, inicio)
+        return asistente
+    return crear
+
+
+def main():
+    sesiones = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    turnos = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print("=" * 60)
+    print(f"MEMORIA POR SESIÓN ({sesiones} sesiones, {turnos} turnos c/u)")
+    print("=" * 60)
+
+    _, por_sesion = _medir(_sesion(turnos), sesiones)
+    print(f"Sesión completa:        {por_sesion:10,.0f} bytes/sesión")
+    print(f"Total estimado:         {por_sesion * sesiones / 1024 / 1024:10,.1f} MB")
+    print()
+
+    _, dict_paciente = _medir(lambda i: {campo: None for campo in CAMPOS_PACIENTE}, sesiones)
+    _, slots_paciente = _medir(lambda i: DatosPaciente(), sesiones)
+    print(f"Datos paciente (dict):  {dict_paciente:10,.0f} bytes")
+    print(f"Datos paciente (slots): {slots_paciente:10,.0f} bytes")
+
+    _, dict_mensaje = _medir(lambda i: {"role": "user", "content": MENSAJES[0][0]}, sesiones)
+    _, slots_mensaje = _medir(lambda i: crear_mensaje("user", MENSAJES[0][0]), sesiones)
+    print(f"Mensaje (dict):         {dict_mensaje:10,.0f} bytes")
+    print(f"Mensaje (slots):        {slots_mensaje:10,.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
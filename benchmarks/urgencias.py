@@ -0,0 +1,131 @@
+"""
+Benchmark del detector local de urgencias.
+
+Evalúa el detector sobre un corpus de frases etiquetadas y reporta precisión,
+exhaustividad, los casos que quedan para verificar con el modelo (dudosos) y
+el tiempo por evaluación en microsegundos.
+
+Uso:
+    python benchmarks/urgencias.py [repeticiones]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.detector_urgencias import evaluar_urgencia
+
+# (frase, es urgencia)
+CORPUS = [
+    # Urgencias
+    ("Tengo un dolor de pecho muy fuerte", True),
+    ("Me duele mucho el pecho y el brazo izquierdo", True),
+    ("Siento una opresión en el pecho desde hace una hora", True),
+    ("Mi papá se desmayó y no reacciona", True),
+    ("No puedo respirar bien, me falta el aire", True),
+    ("Mi hijo está teniendo una convulsión", True),
+    ("Creo que mi mamá está teniendo un ACV, tiene la cara caída", True),
+    ("Mi abuelo no puede hablar y no mueve el brazo", True),
+    ("Me corté con un vidrio y sangra mucho", True),
+    ("Tuvo una hemorragia nasal que no para", True),
+    ("Creo que es un infarto", True),
+    ("Se tomó todas las pastillas, es una sobredosis", True),
+    ("Mi nena se ahoga, se le cierra la garganta", True),
+    ("Perdió el conocimiento después del golpe en la cabeza", True),
+    ("Es una emergencia, se cayó y está inconsciente", True),
+    ("me quiero matar", True),
+    ("tengo una reacción alérgica, anafilaxia, se me cierra la garganta", True),
+    ("mi marido tuvo un ataque al corazón", True),
+    ("de repente empecé con palpitaciones muy fuertes y dolor en el pecho", True),
+    ("no se que me pasa tengo dolor de pecho", True),
+    ("Hola, mi hermano se desmayó en la calle", True),
+    ("tengo presión en el pecho y me mareo", True),
+    ("mi hijo tomó lavandina, creo que es envenenamiento", True),
+    ("Perdí mucha sangre, me sigue sangrando", True),
+    ("Está sudando frío y le duele el brazo izquierdo", True),
+    ("Tuve que venir porque me duele el pecho y me falta el aire", True),
+    ("Me duele el pecho desde hace 2 meses y hoy no puedo respirar", True),
+    ("El año pasado tuve un infarto, pero ahora me duele el pecho", True),
+    # No urgencias
+    ("Hola, quiero sacar un turno con cardiología", False),
+    ("No tengo dolor de pecho, es solo un control", False),
+    ("Necesito un turno para un chequeo, no es nada grave", False),
+    ("¿Atienden urgencias?", False),
+    ("Me duele la rodilla desde hace un mes", False),
+    ("Quiero un turno con el pediatra para mi hijo", False),
+    ("Tengo OSDE, ¿la aceptan?", False),
+    ("¿Cuál es el horario de atención?", False),
+    ("Necesito los resultados de mis análisis de sangre", False),
+    ("Quería pedir un certificado médico", False),
+    ("Mi DNI es 30123456", False),
+    ("Gracias, hasta luego", False),
+    ("¿Tienen aire acondicionado en la sala de espera?", False),
+    ("El dermatólogo atiende los martes?", False),
+    ("tengo un poco de tos y mocos", False),
+    ("Sin dolor, solo quiero hacerme un chequeo del corazón", False),
+    ("Me mareo un poco cuando me levanto rápido", False),
+    ("Nunca me desmayé, pero quiero un control", False),
+    ("Quiero un turno para mañana a la tarde", False),
+    ("¿Cuánto sale la consulta particular?", False),
+    ("Me llamo Juan Pérez", False),
+    ("tengo un dolor de cabeza leve", False),
+    ("mi hija tiene fiebre desde ayer, quiero turno con pediatría", False),
+    ("Me duele la espalda, ¿hay traumatólogo?", False),
+    ("El año pasado tuve un infarto, necesito un control con cardiología", False),
+    ("Hace dos años tuve un ACV, quiero un turno con neurología", False),
+    ("Tengo antecedentes de infarto y quiero hacerme un chequeo", False),
+    ("Me operaron del corazón, necesito los controles con el cardiólogo", False),
+    ("De chico tuve convulsiones, necesito un certificado para el club", False),
+    ("Tengo una quemadura chiquita en la mano", False),
+]
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    verdaderos_positivos = falsos_positivos = falsos_negativos = dudosos = 0
+    errores = []
+    for frase, esperado in CORPUS:
+        evaluacion = evaluar_urgencia(frase)
+        if evaluacion.dudosa:
+            dudosos += 1
+        if evaluacion.urgente and esperado:
+            verdaderos_positivos += 1
+        elif evaluacion.urgente:
+            falsos_positivos += 1
+            errores.append(("falso positivo", frase, evaluacion))
+        elif esperado:
+            falsos_negativos += 1
+            errores.append(("falso negativo" + (" (dudoso)" if evaluacion.dudosa else ""), frase, evaluacion))
+
+    tiempos = []
+    for frase, _ in CORPUS:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            evaluar_urgencia(frase)
+        tiempos.append((time.perf_counter() - inicio) / repeticiones * 1_000_000)
+    tiempos.sort()
+
+    urgencias = sum(1 for _, esperado in CORPUS if esperado)
+    precision = verdaderos_positivos / max(verdaderos_positivos + falsos_positivos, 1)
+    exhaustividad = verdaderos_positivos / max(urgencias, 1)
+
+    print("=" * 60)
+    print(f"DETECTOR DE URGENCIAS ({len(CORPUS)} frases, {urgencias} urgencias)")
+    print("=" * 60)
+    print(f"Precisión:         {precision:.1%}")
+    print(f"Exhaustividad:     {exhaustividad:.1%}")
+    print(f"Falsos positivos:  {falsos_positivos}")
+    print(f"Falsos negativos:  {falsos_negativos}")
+    print(f"Dudosos (modelo):  {dudosos}")
+    print(f"Tiempo promedio:   {sum(tiempos) / len(tiempos):.1f} µs")
+    print(f"Tiempo máximo:     {tiempos[-1]:.1f} µs")
+
+    for tipo, frase, evaluacion in errores:
+        print(f"  {tipo}: {frase!r} -> {evaluacion.puntaje} {evaluacion.terminos}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Buscador de FAQs - Recuperación de preguntas frecuentes con BM25
+Indexa la pregunta, la respuesta y los alias de cada FAQ (normalizados sin
+acentos y reducidos a su raíz: "llego", "llegar" -> "lleg") en listas de
+postings de NumPy. Cada consulta se puntúa contra todas las FAQs con una sola
+suma vectorizada y retorna un ranking con el puntaje BM25 y una confianza
+entre 0 y 1.
+"""
+
+import math
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+import numpy as np
+
+from .texto import normalizar_texto
+
+# Parámetros de BM25: saturación de la frecuencia y normalización por largo
+K1 = 1.2
+B = 0.75
+
+# Cuánto pesa una aparición de la palabra en cada campo de la FAQ
+PESO_ALIAS = 3.0
+PESO_PREGUNTA = 2.0
+PESO_RESPUESTA = 1.0
+
+# Una palabra que solo aparece en la respuesta cubre la mitad para la confianza
+COBERTURA_RESPUESTA = 0.5
+
+# Confianza mínima para dar una FAQ por encontrada en buscar_faq
+UMBRAL_FAQ = 0.5
+
+
+def raiz(palabra: str) -> str:
+    """
+    Raíz aproximada de una palabra normalizada: sin plural, sin terminación de
+    infinitivo ni vocal final ("tarjetas" -> "tarjet", "pagar"/"pago" -> "pag").
+    Las palabras cortas quedan como están.
+    """
+    if len(palabra) > 4 and palabra.endswith("s"):
+        palabra = palabra[:-1]
+    if len(palabra) > 5 and palabra[-2:] in ("ar", "er", "ir"):
+        return palabra[:-2]
+    if len(palabra) > 4 and palabra[-1] in "aeo":
+        return palabra[:-1]
+    return palabra
+
+
+def tokenizar(texto: str, vacias: Set[str] = frozenset()) -> List[str]:
+    """Raíces de las palabras del texto, sin las palabras vacías."""
+    return [raiz(p) for p in normalizar_texto(texto).split() if p not in vacias]
+
+
+class ResultadoFAQ(NamedTuple):
+    """FAQ encontrada para una consulta."""
+
+    clave: str
+    puntaje: float
+    confianza: float
+
+
+class BuscadorFAQ:
+    """Índice BM25 de FAQs con puntuación vectorizada."""
+
+    def __init__(self, faqs: Dict[str, Dict], alias: Dict[str, Iterable[str]] = None,
+                 vacias: Iterable[str] = ()):
+        """
+        Construye el índice.
+
+        Args:
+            faqs: FAQs por clave, cada una con "pregunta" y "respuesta"
+            alias: Otras formas de preguntar cada FAQ, por clave
+                (ej. {"como_llegar": ["direccion", "colectivo"]})
+            vacias: Palabras que no aportan a la búsqueda ("hola", "quiero")
+        """
+        alias = alias or {}
+        self.vacias = frozenset(vacias)
+        self.claves: List[str] = list(faqs)
+
+        # Frecuencia ponderada por campo y cobertura (1 o COBERTURA_RESPUESTA) de cada palabra
+        frecuencias: List[Dict[str, float]] = []
+        coberturas: List[Dict[str, float]] = []
+        for clave in self.claves:
+            faq = faqs[clave]
+            frecuencia: Dict[str, float] = {}
+            cobertura: Dict[str, float] = {}
+            campos = [
+                (faq.get("respuesta", ""), PESO_RESPUESTA, COBERTURA_RESPUESTA),
+                (faq.get("pregunta", ""), PESO_PREGUNTA, 1.0),
+                (" ".join(alias.get(clave, ())), PESO_ALIAS, 1.0),
+            ]
+            for texto, peso, cubre in campos:
+                for palabra in tokenizar(texto, self.vacias):
+                    frecuencia[palabra] = frecuencia.get(palabra, 0.0) + peso
+                    cobertura[palabra] = max(cobertura.get(palabra, 0.0), cubre)
+            frecuencias.append(frecuencia)
+            coberturas.append(cobertura)
+
+        total = len(self.claves)
+        largos = np.array([sum(f.values()) for f in frecuencias], dtype=np.float64)
+        largo_promedio = float(largos.mean()) if total and largos.mean() > 0 else 1.0
+        normalizacion = K1 * (1 - B + B * largos / largo_promedio)
+
+        # Postings por palabra: FAQs donde aparece, con su frecuencia y cobertura
+        postings: Dict[str, List[Tuple[int, float, float]]] = {}
+        for documento, (frecuencia, cobertura) in enumerate(zip(frecuencias, coberturas)):
+            for palabra, valor in frecuencia.items():
+                postings.setdefault(palabra, []).append((documento, valor, cobertura[palabra]))
+
+        # Todas las listas concatenadas en arreglos planos; cada palabra es un tramo
+        self._tramos: Dict[str, Tuple[int, int]] = {}
+        self._idf: Dict[str, float] = {}
+        documentos: List[np.ndarray] = []
+        pesos: List[np.ndarray] = []
+        cubiertos: List[np.ndarray] = []
+        inicio = 0
+        for palabra, lista in postings.items():
+            indices = np.fromiter((d for d, _, _ in lista), dtype=np.int32, count=len(lista))
+            tf = np.fromiter((v for _, v, _ in lista), dtype=np.float64, count=len(lista))
+            cubre = np.fromiter((c for _, _, c in lista), dtype=np.float64, count=len(lista))
+            idf = math.log(1 + (total - len(lista) + 0.5) / (len(lista) + 0.5))
+            documentos.append(indices)
+            pesos.append(idf * tf * (K1 + 1) / (tf + normalizacion[indices]))
+            cubiertos.append(idf * cubre)
+            self._tramos[palabra] = (inicio, inicio + len(lista))
+            self._idf[palabra] = idf
+            inicio += len(lista)
+
+        self._documentos = np.concatenate(documentos) if documentos else np.zeros(0, dtype=np.int32)
+        self._pesos = np.concatenate(pesos) if pesos else np.zeros(0)
+        self._cubiertos = np.concatenate(cubiertos) if cubiertos else np.zeros(0)
+        # Una palabra desconocida pesa como la más rara del índice
+        self._idf_desconocida = max(self._idf.values(), default=1.0)
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    def buscar(self, consulta: str, limite: int = 3) -> List[ResultadoFAQ]:
+        """
+        Busca las FAQs que mejor responden la consulta.
+
+        La confianza es la fracción de la consulta (ponderada por lo poco
+        frecuente de cada palabra) que aparece en la pregunta o los alias de
+        la FAQ; las palabras que solo están en la respuesta cubren la mitad.
+
+        Args:
+            consulta: Mensaje del paciente
+            limite: Cantidad máxima de resultados
+
+        Returns:
+            Lista de ResultadoFAQ ordenada por puntaje (vacía si nada coincide)
+        """
+        palabras = set(tokenizar(consulta, self.vacias))
+        if not palabras or limite <= 0:
+            return []
+
+        tramos = [self._tramos[p] for p in palabras if p in self._tramos]
+        if not tramos:
+            return []
+        peso_consulta = sum(self._idf.get(p, self._idf_desconocida) for p in palabras)
+
+        seleccion = np.concatenate([np.arange(inicio, fin) for inicio, fin in tramos])
+        documentos = self._documentos[seleccion]
+        puntajes = np.bincount(documentos, weights=self._pesos[seleccion], minlength=len(self.claves))
+        cubiertos = np.bincount(documentos, weights=self._cubiertos[seleccion], minlength=len(self.claves))
+
+        candidatos = np.flatnonzero(puntajes)
+        if len(candidatos) > limite:
+            candidatos = candidatos[np.argpartition(puntajes[candidatos], -limite)[-limite:]]
+        candidatos = candidatos[np.argsort(-puntajes[candidatos], kind="stable")]
+
+        return [
+            ResultadoFAQ(
+                self.claves[documento],
+                round(float(puntajes[documento]), 3),
+                round(min(float(cubiertos[documento]) / peso_consulta, 1.0), 3)
+            )
+            for documento in candidatos
+        ]
@@ -4,7 +4,12 @@ Este archivo contiene toda la información que el asistente necesita conocer sob
 Puedes editar estos datos fácilmente para personalizarlos.
 """
 
-from datetime import datetime, timedelta
+from .indice_coberturas import IndiceCoberturas, UMBRAL_COBERTURA
+from .buscador_faq import BuscadorFAQ, UMBRAL_FAQ
+
+# Versión de los datos de la clínica. Se incrementa con marcar_datos_modificados()
+# cuando se editan en caliente, para que se recompilen los prompts y cachés.
+VERSION_DATOS = 0
 
 # ==================== INFORMACIÓN GENERAL ====================
 
@@ -134,6 +139,18 @@ PREPAGAS = [
     "Prevención Salud"
 ]
 
+# Otras formas en que los pacientes nombran cada cobertura (sin acentos ni mayúsculas)
+ALIAS_COBERTURAS = {
+    "Swiss Medical": ["swiss", "smg", "swiss medical group"],
+    "OSECAC": ["empleados de comercio", "obra social de comercio"],
+    "PAMI": ["insssjp"],
+    "UOM": ["union obrera metalurgica", "osuomra"],
+    "OSDEPYM": ["osde pym"],
+    "Sancor Salud": ["sancor"],
+    "Accord Salud": ["accord"],
+    "Prevención Salud": ["prevencion"],
+}
+
 PRECIOS = {
     "consulta_particular": 15000,
     "consulta_pediatria": 12000,
@@ -142,33 +159,19 @@ PRECIOS = {
     "receta": 2000
 }
 
-# ==================== TURNOS DISPONIBLES (MOCK) ====================
-
-def generar_turnos_mock():
-    """
-    Genera turnos ficticios para los próximos 3 días.
-    En una implementación real, esto consultaría una base de datos.
-    """
-    hoy = datetime.now()
-
-    turnos = {
-        "hoy": {
-            "fecha": hoy.strftime("%d/%m/%Y"),
-            "disponibles": []  # Completo
-        },
-        "manana": {
-            "fecha": (hoy + timedelta(days=1)).strftime("%d/%m/%Y"),
-            "disponibles": ["10:00", "14:30", "16:00", "17:30"]
-        },
-        "pasado_manana": {
-            "fecha": (hoy + timedelta(days=2)).strftime("%d/%m/%Y"),
-            "disponibles": ["09:00", "11:30", "15:00", "17:30", "18:30"]
-        }
-    }
+# ==================== AGENDA ====================
 
-    return turnos
+# Duración de cada turno; la agenda (app/agenda.py) arma los turnos de cada
+# médico con sus días y horarios de atención
+DURACION_TURNO_MINUTOS = 30
 
-TURNOS_MOCK = generar_turnos_mock()
+# Feriados nacionales (la clínica no atiende). Los trasladables se agregan cada año.
+FERIADOS = [
+    "2026-01-01", "2026-02-16", "2026-02-17", "2026-03-24", "2026-04-02", "2026-04-03",
+    "2026-05-01", "2026-05-25", "2026-06-20", "2026-07-09", "2026-12-08", "2026-12-25",
+    "2027-01-01", "2027-02-08", "2027-02-09", "2027-03-24", "2027-03-26", "2027-04-02",
+    "2027-05-01", "2027-05-25", "2027-06-20", "2027-07-09", "2027-12-08", "2027-12-25",
+]
 
 # ==================== SERVICIOS ADICIONALES ====================
 
@@ -264,6 +267,11 @@ CONTACTO = {
 
 # ==================== FUNCIONES AUXILIARES ====================
 
+def marcar_datos_modificados():
+    """Indica que los datos de la clínica cambiaron (invalida prompts y cachés)."""
+    global VERSION_DATOS
+    VERSION_DATOS += 1
+
 def obtener_especialidades_disponibles():
     """Retorna una lista con los nombres de todas las especialidades."""
     return [esp["nombre"] for esp in ESPECIALIDADES.values()]
@@ -274,44 +282,93 @@ def obtener_medicos_por_especialidad(especialidad_key):
         return ESPECIALIDADES[especialidad_key]["medicos"]
     return []
 
+# Índice de coberturas con la versión de datos con la que se construyó
+_indice_coberturas = None
+
+
+def obtener_indice_coberturas():
+    """Retorna el índice de coberturas, reconstruido si cambiaron los datos."""
+    global _indice_coberturas
+    if _indice_coberturas is None or _indice_coberturas[0] != VERSION_DATOS:
+        coberturas = [(nombre, "obra social") for nombre in OBRAS_SOCIALES]
+        coberturas += [(nombre, "prepaga") for nombre in PREPAGAS]
+        _indice_coberturas = (VERSION_DATOS, IndiceCoberturas(coberturas, ALIAS_COBERTURAS))
+    return _indice_coberturas[1]
+
+def buscar_cobertura(cobertura):
+    """
+    Busca la cobertura más parecida al texto (tolera acentos, planes y errores de tipeo).
+
+    Returns:
+        ResultadoCobertura (nombre, tipo, puntaje) o None
+    """
+    return obtener_indice_coberturas().buscar(cobertura)
+
 def verificar_cobertura(cobertura):
     """Verifica si la clínica trabaja con la cobertura mencionada."""
-    cobertura_upper = cobertura.upper()
+    resultado = buscar_cobertura(cobertura)
+    if resultado is None or resultado.puntaje < UMBRAL_COBERTURA:
+        return False, None, None
+    return True, resultado.tipo, resultado.nombre
+
+# Otras formas de preguntar cada FAQ (sin acentos); se indexan junto con la pregunta y la respuesta
+PALABRAS_CLAVE_FAQ = {
+    "como_llegar": ["llegar", "llego", "donde", "direccion", "ubicacion", "ubicados", "transporte", "colectivo", "subte", "tren", "estacionamiento"],
+    "retirar_resultados": ["resultados", "retirar", "retiro", "laboratorio", "estudios", "analisis"],
+    "urgencias": ["urgencia", "emergencia", "guardia", "grave"],
+    "formas_pago": ["pago", "pagar", "tarjeta", "efectivo", "transferencia", "precio", "costo", "cuotas", "credito", "debito", "mercado pago"],
+    "primera_vez": ["primera vez", "nuevo paciente", "que llevar", "que traer"],
+    "cancelar_turno": ["cancelar", "reagendar", "cambiar turno", "modificar", "reprogramar"],
+    "recetas_certificados": ["receta", "certificado", "prescripcion"]
+}
 
-    # Verificar obras sociales
-    for os in OBRAS_SOCIALES:
-        if os.upper() in cobertura_upper or cobertura_upper in os.upper():
-            return True, "obra social", os
+# Palabras que no cuentan para la búsqueda de FAQs
+PALABRAS_VACIAS_FAQ = {
+    "a", "al", "como", "con", "cual", "cuales", "cuando", "de", "del", "el", "en", "es", "hay", "la",
+    "las", "lo", "los", "me", "mi", "para", "por", "puedo", "puede", "que", "se", "si",
+    "su", "sus", "un", "una", "y", "o", "ustedes", "clinica", "hola", "buenas", "buen", "dia",
+    "tardes", "quiero", "queria", "necesito", "saber", "consulta", "consultar", "tienen",
+    "favor", "gracias", "aceptan", "atienden", "hacer", "tengo", "voy", "vez", "esta", "estan"
+}
 
-    # Verificar prepagas
-    for pp in PREPAGAS:
-        if pp.upper() in cobertura_upper or cobertura_upper in pp.upper():
-            return True, "prepaga", pp
+# Buscador de FAQs con la versión de datos con la que se construyó
+_buscador_faq = None
 
-    return False, None, None
 
-def obtener_turnos_disponibles(cuando="manana"):
-    """Retorna los turnos disponibles según el día solicitado."""
-    if cuando in TURNOS_MOCK:
-        return TURNOS_MOCK[cuando]
-    return None
+def obtener_buscador_faq():
+    """Retorna el buscador de FAQs, reconstruido si cambiaron los datos."""
+    global _buscador_faq
+    if _buscador_faq is None or _buscador_faq[0] != VERSION_DATOS:
+        _buscador_faq = (VERSION_DATOS, BuscadorFAQ(FAQS, PALABRAS_CLAVE_FAQ, PALABRAS_VACIAS_FAQ))
+    return _buscador_faq[1]
 
-def buscar_faq(consulta):
-    """Busca una FAQ que coincida con la consulta del usuario."""
-    consulta_lower = consulta.lower()
-
-    keywords = {
-        "como_llegar": ["llegar", "donde", "direccion", "ubicacion", "transporte", "colectivo", "subte"],
-        "retirar_resultados": ["resultados", "retirar", "laboratorio", "estudios", "analisis"],
-        "urgencias": ["urgencia", "emergencia", "guardia", "grave"],
-        "formas_pago": ["pago", "tarjeta", "efectivo", "transferencia", "precio", "costo"],
-        "primera_vez": ["primera vez", "nuevo paciente", "que llevar", "que traer"],
-        "cancelar_turno": ["cancelar", "reagendar", "cambiar turno", "modificar"],
-        "recetas_certificados": ["receta", "certificado", "prescripcion"]
-    }
+def buscar_faqs(consulta, limite=3):
+    """
+    Busca las FAQs que mejor responden la consulta, de mayor a menor puntaje.
 
-    for faq_key, words in keywords.items():
-        if any(word in consulta_lower for word in words):
-            return FAQS[faq_key]
+    Returns:
+        Lista de ResultadoFAQ (clave, puntaje, confianza)
+    """
+    return obtener_buscador_faq().buscar(consulta, limite)
 
-    return None
+def buscar_faq_con_puntaje(consulta):
+    """
+    Busca la FAQ que mejor responde la consulta y calcula la confianza.
+
+    La confianza es la fracción de la consulta que explican la pregunta y
+    los alias de la FAQ (ver BuscadorFAQ.buscar).
+
+    Returns:
+        Tupla (clave de la FAQ o None, puntaje entre 0 y 1)
+    """
+    resultados = buscar_faqs(consulta, limite=1)
+    if not resultados:
+        return None, 0.0
+    return resultados[0].clave, resultados[0].confianza
+
+def buscar_faq(consulta):
+    """Busca una FAQ que coincida con la consulta del usuario."""
+    faq_key, confianza = buscar_faq_con_puntaje(consulta)
+    if faq_key is None or confianza < UMBRAL_FAQ:
+        return None
+    return FAQS[faq_key]
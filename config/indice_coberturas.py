@@ -0,0 +1,246 @@
+"""
+Índice de Coberturas - Búsqueda de obras sociales y prepagas por nombre
+Precalcula los nombres y alias normalizados (sin acentos ni signos) en un índice
+invertido por palabra, con un índice de borrados para tolerar errores de
+tipeo o de transcripción ("medife", "osde 210", "swis medical") con una
+distancia de edición acotada. Cada búsqueda retorna la cobertura más parecida
+con un puntaje entre 0 y 1.
+"""
+
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .texto import normalizar_texto
+
+# Puntaje mínimo para dar una cobertura por reconocida
+UMBRAL_COBERTURA = 0.7
+
+# Si las dos mejores coberturas quedan a menos de este margen, la consulta es ambigua
+MARGEN_AMBIGUEDAD = 0.05
+
+# Palabras que no distinguen una cobertura de otra
+PALABRAS_GENERICAS = {
+    "obra", "social", "sociales", "os", "prepaga", "medicina", "de", "del", "la", "las",
+    "el", "los", "y", "e", "para", "personal", "tengo", "mi", "con", "soy", "afiliado", "afiliada",
+}
+
+# Nombres de planes ("OSDE 310", "Galeno Oro"): se ignoran, la cobertura es la misma
+PALABRAS_PLAN = {"plan", "oro", "plata", "bronce", "azul", "plus", "classic", "black", "platinum", "joven"}
+
+
+def maxima_distancia(palabra: str) -> int:
+    """Errores tolerados según el largo: ninguno en siglas cortas, hasta 2 en palabras largas."""
+    if len(palabra) < 5:
+        return 0
+    return 1 if len(palabra) < 9 else 2
+
+
+def distancia_acotada(a: str, b: str, maximo: int) -> int:
+    """
+    Distancia de edición con transposiciones (OSA) entre dos palabras.
+
+    Corta apenas la distancia supera el máximo y en ese caso retorna maximo + 1.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior2: List[int] = []
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        minimo_fila = i
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            valor = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                valor = min(valor, anterior2[j - 2] + 1)
+            actual[j] = valor
+            minimo_fila = min(minimo_fila, valor)
+        if minimo_fila > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return min(anterior[-1], maximo + 1)
+
+
+def _borrados(palabra: str, distancia: int) -> Set[str]:
+    """Variantes de la palabra con hasta `distancia` letras menos."""
+    variantes = {palabra}
+    frontera = {palabra}
+    for _ in range(distancia):
+        frontera = {p[:i] + p[i + 1:] for p in frontera if len(p) > 1 for i in range(len(p))}
+        variantes |= frontera
+    return variantes
+
+
+def tokenizar(texto: str) -> Tuple[str, ...]:
+    """
+    Palabras significativas de un nombre de cobertura.
+
+    Une las siglas deletreadas ("o s d e" -> "osde") y descarta palabras
+    genéricas, números y nombres de planes.
+    """
+    palabras: List[str] = []
+    sigla = ""
+    for palabra in normalizar_texto(texto).split():
+        if len(palabra) == 1 and palabra.isalpha():
+            sigla += palabra
+            continue
+        if sigla:
+            palabras.append(sigla)
+            sigla = ""
+        palabras.append(palabra)
+    if sigla:
+        palabras.append(sigla)
+
+    significativas = tuple(
+        p for p in palabras
+        if p not in PALABRAS_GENERICAS and p not in PALABRAS_PLAN and not any(c.isdigit() for c in p)
+    )
+    return significativas or tuple(palabras)
+
+
+class ResultadoCobertura(NamedTuple):
+    """Cobertura encontrada para una consulta."""
+
+    nombre: str
+    tipo: str
+    puntaje: float
+
+
+class IndiceCoberturas:
+    """Índice de coberturas por palabra, con tolerancia a errores de tipeo."""
+
+    def __init__(self, coberturas: Iterable[Tuple[str, str]], alias: Dict[str, Iterable[str]] = None):
+        """
+        Construye el índice.
+
+        Args:
+            coberturas: Pares (nombre, tipo), ej. ("Medifé", "prepaga")
+            alias: Otras formas de nombrar cada cobertura, por nombre
+                (ej. {"Swiss Medical": ["swiss", "smg"]})
+        """
+        alias = alias or {}
+        self._coberturas: List[Tuple[str, str]] = []
+        # Cada variante es el nombre o un alias tokenizado: (palabras, índice de la cobertura)
+        self._variantes: List[Tuple[Tuple[str, ...], int]] = []
+        self._exactos: Dict[Tuple[str, ...], int] = {}
+        self._por_palabra: Dict[str, List[int]] = {}
+
+        for nombre, tipo in coberturas:
+            indice = len(self._coberturas)
+            self._coberturas.append((nombre, tipo))
+            for forma in [nombre, *alias.get(nombre, ())]:
+                palabras = tokenizar(forma)
+                if not palabras or palabras in self._exactos:
+                    continue
+                self._exactos[palabras] = indice
+                variante = len(self._variantes)
+                self._variantes.append((palabras, indice))
+                for palabra in set(palabras):
+                    self._por_palabra.setdefault(palabra, []).append(variante)
+
+        # Peso de cada palabra: las que aparecen en muchas coberturas ("salud") pesan menos
+        total = max(len(self._variantes), 1)
+        self._pesos = {
+            palabra: math.log(1 + total / len(variantes))
+            for palabra, variantes in self._por_palabra.items()
+        }
+        self._peso_desconocida = math.log(1 + total)
+        self._peso_variantes = [sum(self._pesos[p] for p in palabras) for palabras, _ in self._variantes]
+
+        # Índice de borrados: variante con letras de menos -> palabras del vocabulario
+        self._por_borrado: Dict[str, Set[str]] = {}
+        for palabra in self._por_palabra:
+            for variante in _borrados(palabra, maxima_distancia(palabra)):
+                self._por_borrado.setdefault(variante, set()).add(palabra)
+
+    def __len__(self) -> int:
+        return len(self._coberturas)
+
+    def _similares(self, palabra: str) -> Dict[str, float]:
+        """Palabras del vocabulario parecidas a la dada, con su similitud (1 = igual)."""
+        if palabra in self._por_palabra:
+            return {palabra: 1.0}
+        maximo = maxima_distancia(palabra)
+        if maximo == 0:
+            # Palabras cortas: solo se tolera que falte la última letra ("salu", "swis")
+            if len(palabra) < 4:
+                return {}
+            return {
+                candidata: 1 - 1 / len(candidata)
+                for candidata in self._por_borrado.get(palabra, ())
+                if candidata != palabra and candidata.startswith(palabra)
+            }
+        candidatas: Set[str] = set()
+        for variante in _borrados(palabra, maximo):
+            candidatas.update(self._por_borrado.get(variante, ()))
+        similares = {}
+        for candidata in candidatas:
+            tope = min(maximo, maxima_distancia(candidata))
+            distancia = distancia_acotada(palabra, candidata, tope)
+            if distancia <= tope:
+                similares[candidata] = 1 - distancia / max(len(palabra), len(candidata))
+        return similares
+
+    def buscar(self, texto: str) -> Optional[ResultadoCobertura]:
+        """
+        Busca la cobertura que mejor coincide con el texto.
+
+        El puntaje promedia qué parte del nombre de la cobertura aparece en el
+        texto y qué parte del texto explica ese nombre, ponderando cada palabra
+        por lo poco frecuente que es en el catálogo.
+
+        Args:
+            texto: Nombre dictado o escrito por el paciente (ej. "osde 210")
+
+        Returns:
+            ResultadoCobertura, o None si no hay coincidencias o la consulta es ambigua
+        """
+        palabras = tokenizar(texto)
+        if not palabras:
+            return None
+
+        exacto = self._exactos.get(palabras)
+        if exacto is not None:
+            nombre, tipo = self._coberturas[exacto]
+            return ResultadoCobertura(nombre, tipo, 1.0)
+
+        similares = [self._similares(palabra) for palabra in palabras]
+        candidatas: Set[int] = set()
+        for coincidencias in similares:
+            for palabra in coincidencias:
+                candidatas.update(self._por_palabra[palabra])
+        if not candidatas:
+            return None
+
+        peso_consulta = [
+            max((self._pesos[p] for p in coincidencias), default=self._peso_desconocida)
+            for coincidencias in similares
+        ]
+        peso_total_consulta = sum(peso_consulta)
+        # Mejor similitud de cada palabra del vocabulario con alguna de la consulta
+        similitud_vocabulario: Dict[str, float] = {}
+        for coincidencias in similares:
+            for palabra, similitud in coincidencias.items():
+                if similitud > similitud_vocabulario.get(palabra, 0.0):
+                    similitud_vocabulario[palabra] = similitud
+
+        mejores: Dict[int, float] = {}
+        for variante in candidatas:
+            palabras_variante, cobertura = self._variantes[variante]
+            cubierto_variante = sum(
+                similitud_vocabulario.get(p, 0.0) * self._pesos[p] for p in palabras_variante
+            )
+            cubierto_consulta = 0.0
+            for coincidencias, peso in zip(similares, peso_consulta):
+                if coincidencias:
+                    cubierto_consulta += peso * max(coincidencias.get(p, 0.0) for p in palabras_variante)
+            puntaje = 0.5 * cubierto_variante / self._peso_variantes[variante] + 0.5 * cubierto_consulta / peso_total_consulta
+            if puntaje > mejores.get(cobertura, 0.0):
+                mejores[cobertura] = puntaje
+
+        ranking = sorted(mejores.items(), key=lambda item: item[1], reverse=True)
+        mejor, puntaje = ranking[0]
+        if len(ranking) > 1 and puntaje - ranking[1][1] < MARGEN_AMBIGUEDAD:
+            return None
+        nombre, tipo = self._coberturas[mejor]
+        return ResultadoCobertura(nombre, tipo, round(puntaje, 3))
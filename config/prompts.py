@@ -240,6 +240,19 @@ CASOS ESPECIALES Y CÓMO MANEJARLOS:
    "Para información sobre vacunación y testeos de COVID-19, por favor comuníquese con la línea oficial del Ministerio de Salud al 120 o visite www.argentina.gob.ar/salud"
 """
 
+# ==================== USO DE HERRAMIENTAS ====================
+
+PROMPT_HERRAMIENTAS = """
+CONSULTAS A LA AGENDA:
+No tienes en memoria los médicos, las coberturas ni los turnos: consúltalos con las herramientas.
+- verificar_cobertura: antes de confirmar si se atiende una obra social o prepaga
+- consultar_especialidad: para saber qué médicos atienden y en qué días y horarios
+- obtener_turnos_disponibles: antes de ofrecer cualquier horario
+- proximos_turnos: si el día pedido está completo o el paciente quiere "lo antes posible"
+- confirmar_turno: solo cuando el paciente aceptó fecha y hora y ya tienes su nombre y DNI
+Nunca inventes disponibilidad ni convenios: si no consultaste, no lo afirmes.
+"""
+
 # ==================== EJEMPLOS DE RESPUESTAS ====================
 
 EJEMPLOS_RESPUESTAS = {
@@ -267,6 +280,28 @@ EJEMPLOS_RESPUESTAS = {
         "¿Me dice si tiene obra social o prepaga?"
     ],
 
+    "solicitar_especialidad": [
+        "¿Para qué especialidad necesita el turno?",
+        "¿Con qué especialidad desea atenderse?",
+        "¿Me dice para qué especialidad es el turno?"
+    ],
+
+    "solicitar_fecha": [
+        "¿Para qué día prefiere el turno?",
+        "¿Qué día le quedaría cómodo?",
+        "¿Para cuándo necesita el turno?"
+    ],
+
+    "ofrecer_turnos": [
+        "Para el [fecha] tengo disponible a las [horarios]. ¿Cuál prefiere?",
+        "El [fecha] tengo estos horarios: [horarios]. ¿Cuál le queda mejor?"
+    ],
+
+    "confirmar_perfil": [
+        "Veo que ya nos consultaron desde este número. Para buscar sus datos, ¿me dice su DNI?",
+        "Tenemos datos de una consulta anterior desde este número. Para confirmar que es usted, ¿me indica su número de DNI?"
+    ],
+
     "confirmar_datos": [
         "Perfecto, confirmo: turno para [nombre] el [fecha] a las [hora]. ¿Es correcto?",
         "Entonces quedamos [fecha] a las [hora]. ¿Le parece bien?",
@@ -285,12 +320,38 @@ EJEMPLOS_RESPUESTAS = {
         "Disculpe, ese turno ya fue tomado. ¿Qué le parece [alternativa]?"
     ],
 
+    "dia_completo": [
+        "Para ese día ya no quedan turnos. Tengo disponible [alternativa]. ¿Le sirve?",
+        "Ese día está completo, pero tengo lugar [alternativa]. ¿Le queda bien?"
+    ],
+
+    "dia_cerrado": [
+        "Ese día la clínica está cerrada. Tengo disponible [alternativa]. ¿Le sirve?",
+        "Ese día no atendemos, pero tengo lugar [alternativa]. ¿Le queda bien?"
+    ],
+
+    "dia_sin_atencion": [
+        "Ese día no hay atención de [especialidad]. Tengo disponible [alternativa]. ¿Le sirve?",
+        "[especialidad] no atiende ese día, pero tengo lugar [alternativa]. ¿Le queda bien?"
+    ],
+
     "cobertura_aceptada": [
         "Sí, trabajamos con [obra social]. Con gusto lo atendemos.",
         "Perfecto, aceptamos [prepaga] sin problema.",
         "Excelente, tenemos convenio con [cobertura]."
     ],
 
+    "demora": [
+        "Disculpe, el sistema está un poco lento. ¿Me podría repetir lo último, por favor?",
+        "Perdón, no llegué a procesar su consulta. ¿Me la repite, por favor?",
+        "Disculpe la demora, ¿podría repetirme lo que me dijo?"
+    ],
+
+    "cobertura_particular": [
+        "Perfecto, la consulta particular tiene un costo de $[precio].",
+        "Muy bien, sería una consulta particular, con un costo de $[precio]."
+    ],
+
     "cobertura_no_aceptada": [
         "Lamentablemente no tenemos convenio con esa obra social. La consulta sería particular, con un costo de $[precio]. ¿Desea agendar de todas formas?",
         "Disculpe, no trabajamos con esa cobertura. Podría atenderse de forma particular. ¿Le interesa?",
@@ -326,6 +387,68 @@ Ejemplo:
 }
 """
 
+# ==================== PROMPT PARA RESUMEN DEL HISTORIAL ====================
+
+PROMPT_RESUMEN_HISTORIAL = """
+Resume en 2 o 3 oraciones esta parte de una llamada entre un paciente y la recepción de una clínica.
+Conserva lo que el paciente pidió, lo que se le ofreció, lo que quedó acordado y lo que falta resolver.
+No repitas saludos ni cortesías. Responde solo con el resumen.
+"""
+
+# ==================== PROMPT PARA RESPUESTA COMBINADA ====================
+
+PROMPT_RESPUESTA_COMBINADA = """
+FORMATO DE RESPUESTA:
+Responde con un objeto JSON con dos campos:
+- respuesta: lo que le vas a decir al paciente, con el mismo estilo de siempre
+- datos: los datos del paciente actualizados con el último mensaje
+
+Campos de datos:
+- nombre_completo: Nombre y apellido del paciente
+- dni: Documento de identidad
+- cobertura: Nombre de obra social o prepaga (o "particular" si no tiene)
+- tipo_consulta: turno / resultados / cobertura / informacion / certificado / urgencia
+- especialidad: Si solicita turno, ¿para qué especialidad?
+- fecha_preferida: Si mencionó preferencia de día (hoy / mañana / dia_especifico)
+- sintomas_graves: true/false - si menciona síntomas que requieren urgencia
+
+Si un dato no está disponible, usa null. Si un campo ya tiene valor y no se menciona en el último mensaje, mantén el valor anterior.
+"""
+
+# Esquema para structured outputs (todos los campos son obligatorios en modo strict)
+ESQUEMA_RESPUESTA_COMBINADA = {
+    "name": "respuesta_combinada",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "respuesta": {"type": "string"},
+            "datos": {
+                "type": "object",
+                "properties": {
+                    "nombre_completo": {"type": ["string", "null"]},
+                    "dni": {"type": ["string", "null"]},
+                    "cobertura": {"type": ["string", "null"]},
+                    "tipo_consulta": {
+                        "type": ["string", "null"],
+                        "enum": ["turno", "resultados", "cobertura", "informacion", "certificado", "urgencia", None]
+                    },
+                    "especialidad": {"type": ["string", "null"]},
+                    "fecha_preferida": {"type": ["string", "null"]},
+                    "sintomas_graves": {"type": "boolean"}
+                },
+                "required": [
+                    "nombre_completo", "dni", "cobertura", "tipo_consulta",
+                    "especialidad", "fecha_preferida", "sintomas_graves"
+                ],
+                "additionalProperties": False
+            }
+        },
+        "required": ["respuesta", "datos"],
+        "additionalProperties": False
+    }
+}
+
 # ==================== FUNCIONES AUXILIARES ====================
 
 def obtener_prompt_sistema():
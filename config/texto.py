@@ -0,0 +1,26 @@
+"""
+Utilidades de texto compartidas
+Normalización usada para comparar mensajes de pacientes con los datos de la clínica.
+"""
+
+import re
+import unicodedata
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9ñ]+")
+
+
+def quitar_acentos(texto):
+    """Elimina tildes y diéresis conservando la ñ."""
+    texto = texto.replace("ñ", "\0").replace("Ñ", "\1")
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_acentos.replace("\0", "ñ").replace("\1", "Ñ")
+
+
+def normalizar_texto(texto):
+    """
+    Normaliza un texto para comparaciones: minúsculas, sin acentos,
+    sin signos de puntuación y con espacios simples.
+    """
+    texto = quitar_acentos(texto.lower())
+    return _NO_ALFANUMERICO.sub(" ", texto).strip()
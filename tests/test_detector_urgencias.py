@@ -0,0 +1,67 @@
+"""
+Tests del detector local de urgencias.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.detector_urgencias import evaluar_urgencia
+
+
+@pytest.mark.parametrize("mensaje", [
+    "Tengo un dolor de pecho muy fuerte",
+    "Me duele mucho el pecho y el brazo izquierdo",
+    "No puedo respirar bien, me falta el aire",
+    "Mi hijo está teniendo una convulsión",
+    "me quiero matar",
+    "Es una emergencia, se cayó y está inconsciente",
+])
+def test_urgencias(mensaje):
+    evaluacion = evaluar_urgencia(mensaje)
+    assert evaluacion.urgente
+    assert evaluacion.terminos
+
+
+@pytest.mark.parametrize("mensaje", [
+    "Quiero un turno con el cardiólogo",
+    "¿Qué obras sociales atienden?",
+    "Necesito renovar una receta",
+    "",
+])
+def test_consultas_comunes_no_son_urgencia(mensaje):
+    evaluacion = evaluar_urgencia(mensaje)
+    assert not evaluacion.urgente
+    assert not evaluacion.dudosa
+
+
+def test_sintoma_negado_queda_para_verificar():
+    evaluacion = evaluar_urgencia("No tengo dolor de pecho")
+    assert not evaluacion.urgente
+    assert evaluacion.negados == ("dolor de pecho",)
+    assert evaluacion.dudosa
+
+
+def test_la_negacion_no_cruza_clausulas():
+    evaluacion = evaluar_urgencia("No sé qué me pasa, tengo un dolor de pecho muy fuerte")
+    assert evaluacion.urgente
+
+
+def test_antecedente_no_es_urgencia():
+    evaluacion = evaluar_urgencia("Tuve un infarto el año pasado, quiero un control")
+    assert not evaluacion.urgente
+    assert evaluacion.antecedentes == ("infarto",)
+    assert evaluacion.dudosa
+
+
+def test_antecedente_solo_en_su_clausula():
+    evaluacion = evaluar_urgencia("Tuve un infarto el año pasado, pero ahora me duele el pecho")
+    assert evaluacion.urgente
+    assert evaluacion.antecedentes == ("infarto",)
+
+
+def test_ignora_mayusculas_y_acentos():
+    assert evaluar_urgencia("TENGO UNA CONVULSION").terminos == evaluar_urgencia("tengo una convulsión").terminos
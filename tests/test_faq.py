@@ -0,0 +1,51 @@
+"""
+Tests de la búsqueda de FAQs.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import datos_clinica
+from config.buscador_faq import UMBRAL_FAQ
+
+
+@pytest.mark.parametrize("consulta, clave", [
+    ("¿Dónde queda la clínica?", "como_llegar"),
+    ("como llego", "como_llegar"),
+    ("qué tengo que llevar la primera vez", "primera_vez"),
+])
+def test_encuentra_la_faq(consulta, clave):
+    assert datos_clinica.buscar_faq(consulta) is datos_clinica.FAQS[clave]
+
+
+def test_una_sola_palabra_alcanza():
+    assert datos_clinica.buscar_faq("estacionamiento") is datos_clinica.FAQS["como_llegar"]
+
+
+@pytest.mark.parametrize("consulta", [
+    "hola",
+    "necesito un turno con el cardiologo",
+    "",
+])
+def test_sin_faq(consulta):
+    assert datos_clinica.buscar_faq(consulta) is None
+
+
+def test_confianza_por_debajo_del_umbral():
+    _, confianza = datos_clinica.buscar_faq_con_puntaje("necesito un turno con el cardiologo")
+    assert 0.0 <= confianza < UMBRAL_FAQ
+
+
+def test_sin_coincidencias():
+    assert datos_clinica.buscar_faq_con_puntaje("hola") == (None, 0.0)
+
+
+def test_resultados_ordenados():
+    resultados = datos_clinica.buscar_faqs("como llego y que tengo que llevar", limite=3)
+    assert resultados
+    assert [r.puntaje for r in resultados] == sorted((r.puntaje for r in resultados), reverse=True)
+    assert all(0.0 <= r.confianza <= 1.0 for r in resultados)
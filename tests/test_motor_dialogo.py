@@ -0,0 +1,180 @@
+"""
+Tests del motor de diálogo: interpretación de respuestas, verificación del
+perfil y plantillas.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import motor_dialogo
+from app.motor_dialogo import CONFIRMAR, SEGUIR, EstadoDialogo
+from app.sesion import DatosPaciente
+from config import prompts
+
+
+def crear_asistente(pendiente: str = None, reserva_ok: bool = True, **datos) -> SimpleNamespace:
+    """Lo que el motor usa de AIAssistant, sin modelo ni agenda."""
+    patient_data = DatosPaciente(tipo_consulta="turno", **datos)
+    asistente = SimpleNamespace(
+        patient_data=patient_data,
+        dialogo=EstadoDialogo(pendiente=pendiente),
+        reservas=[],
+        liberadas=0,
+    )
+    asistente.reservar_turno = lambda fecha, hora, especialidad=None: asistente.reservas.append(hora) or reserva_ok
+
+    def liberar_reserva():
+        asistente.liberadas += 1
+
+    asistente.liberar_reserva = liberar_reserva
+    return asistente
+
+
+# ==================== NOMBRE ====================
+
+@pytest.mark.parametrize("mensaje, nombre", [
+    ("Juan Pérez", "Juan Pérez"),
+    ("maría josé gómez", "María José Gómez"),
+])
+def test_interpreta_el_nombre(mensaje, nombre):
+    asistente = crear_asistente("nombre_completo")
+    assert motor_dialogo._interpretar(asistente, mensaje, {}, False) == (SEGUIR, [])
+    assert asistente.patient_data["nombre_completo"] == nombre
+
+
+@pytest.mark.parametrize("mensaje", [
+    "estoy sangrando mucho",
+    "tengo fiebre",
+    "me duele el pecho",
+    "no puedo respirar",
+])
+def test_un_sintoma_no_es_un_nombre(mensaje):
+    asistente = crear_asistente("nombre_completo")
+    assert motor_dialogo._interpretar(asistente, mensaje, {}, False) is None
+    assert asistente.patient_data["nombre_completo"] is None
+
+
+def test_nombre_demasiado_largo():
+    assert motor_dialogo._interpretar_nombre("quisiera saber si me pueden atender hoy") is None
+
+
+# ==================== HORARIO ====================
+
+@pytest.mark.parametrize("mensaje, hora", [
+    ("a las 4", "16:00"),
+    ("9:30", "09:30"),
+    ("la segunda", "09:30"),
+    ("el último", "16:00"),
+])
+def test_elige_un_horario_ofrecido(mensaje, hora):
+    asistente = crear_asistente("hora")
+    asistente.dialogo.turnos_ofrecidos = ("09:00", "09:30", "16:00")
+    assert motor_dialogo._interpretar(asistente, mensaje, {}, False) == (SEGUIR, [])
+    assert asistente.dialogo.hora == hora
+    assert asistente.reservas == [hora]
+
+
+def test_horario_tomado_por_otro_paciente():
+    asistente = crear_asistente("hora", reserva_ok=False)
+    asistente.dialogo.turnos_ofrecidos = ("09:00", "09:30")
+    accion, acuses = motor_dialogo._interpretar(asistente, "la primera", {}, False)
+    assert asistente.dialogo.hora is None
+    assert asistente.dialogo.turnos_ofrecidos == ("09:30",)
+    assert "09:30" in acuses[0]
+
+
+def test_horario_que_no_se_ofrecio():
+    asistente = crear_asistente("hora")
+    asistente.dialogo.turnos_ofrecidos = ("09:00", "09:30")
+    accion, acuses = motor_dialogo._interpretar(asistente, "a las 18", {}, True)
+    assert accion == motor_dialogo.ESPERAR
+    assert asistente.dialogo.hora is None
+    assert asistente.reservas == []
+
+
+# ==================== CONFIRMACIÓN ====================
+
+def test_confirma_el_turno():
+    asistente = crear_asistente("confirmacion")
+    assert motor_dialogo._interpretar(asistente, "sí, perfecto", {}, True) == (CONFIRMAR, [])
+
+
+def test_rechazar_la_confirmacion_libera_la_reserva():
+    asistente = crear_asistente("confirmacion")
+    asistente.dialogo.hora, asistente.dialogo.turnos_ofrecidos = "09:00", ("09:00",)
+    assert motor_dialogo._interpretar(asistente, "no", {}, True) is None
+    assert asistente.dialogo.hora is None
+    assert asistente.liberadas == 1
+
+
+def test_respuesta_ambigua_queda_para_el_modelo():
+    asistente = crear_asistente("confirmacion")
+    assert motor_dialogo._interpretar(asistente, "mmm", {}, False) is None
+
+
+# ==================== PERFIL ====================
+
+PERFIL = {"nombre_completo": "Juan Pérez", "dni": "30123456", "cobertura": "OSDE"}
+
+
+def test_perfil_se_carga_si_el_dni_coincide():
+    asistente = crear_asistente("perfil", dni="30.123.456")
+    asistente.dialogo.perfil = dict(PERFIL)
+    motor_dialogo._interpretar(asistente, "30.123.456", {"dni": "30.123.456"}, True)
+    assert asistente.dialogo.perfil is None
+    assert asistente.patient_data["nombre_completo"] == "Juan Pérez"
+    assert asistente.patient_data["cobertura"] == "OSDE"
+
+
+def test_perfil_se_descarta_si_el_dni_no_coincide():
+    asistente = crear_asistente("perfil", dni="28999111")
+    asistente.dialogo.perfil = dict(PERFIL)
+    motor_dialogo._interpretar(asistente, "28999111", {"dni": "28999111"}, True)
+    assert asistente.dialogo.perfil is None
+    assert asistente.patient_data["nombre_completo"] is None
+    assert asistente.patient_data["cobertura"] is None
+
+
+def test_la_pregunta_del_perfil_no_lee_datos_guardados():
+    asistente = crear_asistente()
+    asistente.dialogo.perfil = dict(PERFIL)
+    pregunta = motor_dialogo._siguiente_pregunta(asistente, "quiero un turno", [])
+    assert asistente.dialogo.pendiente == "perfil"
+    assert "Juan" not in pregunta and "OSDE" not in pregunta
+
+
+# ==================== PLANTILLAS ====================
+
+def test_renderizar_completa_los_marcadores():
+    respuesta = motor_dialogo.renderizar("dia_completo", {"alternativa": "el 20/10/2026 a las 09:00"})
+    assert "el 20/10/2026 a las 09:00" in respuesta
+    assert "[" not in respuesta
+
+
+def test_renderizar_sin_valores_usa_variantes_sin_marcadores():
+    for _ in range(20):
+        assert "[" not in motor_dialogo.renderizar("confirmar_perfil")
+
+
+def test_renderizar_con_pregunta():
+    for _ in range(20):
+        assert motor_dialogo.renderizar("cobertura_no_aceptada", {"precio": "1000", "cobertura": "X"}, con_pregunta=True).endswith("?")
+
+
+def test_dia_cerrado_no_se_anuncia_como_completo(monkeypatch):
+    asistente = crear_asistente(especialidad="cardiologia", fecha_preferida="mañana")
+    asistente.obtener_turnos_disponibles = lambda cuando, especialidad: {
+        "fecha": "18/10/2026", "disponibles": [], "abierto": False, "atiende": False
+    }
+    asistente.proximos_turnos = lambda especialidad, cantidad: [
+        {"fecha": "19/10/2026", "hora": "09:00", "medico": "Dr. X"}
+    ]
+    monkeypatch.setattr(prompts, "EJEMPLOS_RESPUESTAS", {
+        **prompts.EJEMPLOS_RESPUESTAS, "dia_cerrado": ["CERRADO [alternativa]"], "dia_completo": ["COMPLETO"]
+    })
+    assert motor_dialogo._ofrecer_turnos(asistente, "mañana") == "CERRADO el 19/10/2026 a las 09:00"